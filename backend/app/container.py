@@ -0,0 +1,253 @@
+"""
+进程级依赖容器：repo / service / 快照及其派生索引，全部第一次用到时才构建，所有 router 共享一份。
+
+路由里通过 FastAPI 依赖取用：
+
+    async def handler(svc: IncidentsService = Depends(incidents_service)): ...
+
+存储后端按 STORAGE_BACKEND 选（dynamodb | memory | sqlite，见 app/storage）。
+lifespan 负责 startup()/shutdown()（快照后台刷新、各连接池的创建和关闭）。
+"""
+from __future__ import annotations
+
+from functools import cached_property
+from typing import Optional
+
+from fastapi import Request
+
+from app.shared.config import settings
+from app.shared.ddb import DynamoDB, get_dynamodb
+from app.shared.text_safety import moderation_stats
+from app.storage import (
+    CommentsRepository,
+    IncidentsRepository,
+    MemoryCommentsRepo,
+    MemoryIncidentsRepo,
+    SqliteCommentsRepo,
+    SqliteDB,
+    SqliteIncidentsRepo,
+)
+from app.modules.auth.douyin_client import DouyinClient
+from app.modules.auth.jwt_service import token_cache_stats
+from app.modules.comments.repo import CommentsRepo
+from app.modules.comments.search import CommentSearchIndex
+from app.modules.comments.service import CommentsService
+from app.modules.comments.stats import CommentStatsReconciler
+from app.modules.incidents.clusters import ClusterIndex
+from app.modules.incidents.columns import IncidentColumns, np
+from app.modules.incidents.repo import IncidentsRepo
+from app.modules.incidents.search import TitleIndex
+from app.modules.incidents.service import IncidentsService
+from app.modules.incidents.snapshot import IncidentsSnapshot
+from app.modules.incidents.tiles import TileCache
+
+
+STORAGE_BACKENDS = ("dynamodb", "memory", "sqlite")
+
+
+class Container:
+    def __init__(self, ddb: Optional[DynamoDB] = None, backend: Optional[str] = None) -> None:
+        self._ddb_override = ddb
+        self.backend = (backend or settings.storage_backend).strip().lower()
+        if self.backend not in STORAGE_BACKENDS:
+            raise ValueError(f"STORAGE_BACKEND must be one of {', '.join(STORAGE_BACKENDS)}")
+
+    @cached_property
+    def ddb(self) -> DynamoDB:
+        return self._ddb_override or get_dynamodb()
+
+    @cached_property
+    def sqlite(self) -> SqliteDB:
+        return SqliteDB(settings.sqlite_path)
+
+    # ---------- incidents ----------
+
+    @cached_property
+    def incidents_repo(self) -> IncidentsRepository:
+        if self.backend == "memory":
+            return MemoryIncidentsRepo()
+        if self.backend == "sqlite":
+            return SqliteIncidentsRepo(self.sqlite)
+        return IncidentsRepo(self.ddb)
+
+    @cached_property
+    def incidents_snapshot(self) -> IncidentsSnapshot:
+        return IncidentsSnapshot(self.incidents_repo, refresh_seconds=settings.incidents_snapshot_refresh_seconds)
+
+    @cached_property
+    def incidents_service(self) -> IncidentsService:
+        return IncidentsService(
+            self.incidents_repo,
+            snapshot=self.incidents_snapshot,
+            titles=self.incident_titles,
+            columns=self.incident_columns,
+        )
+
+    @cached_property
+    def incident_clusters(self) -> ClusterIndex:
+        index = ClusterIndex()
+        self.incidents_snapshot.subscribe(index.apply)
+        return index
+
+    @cached_property
+    def incident_titles(self) -> Optional[TitleIndex]:
+        # 列式副本自带按行号的标题倒排，不再重复建一份
+        if self.incident_columns is not None:
+            return None
+        index = TitleIndex()
+        self.incidents_snapshot.subscribe(index.apply)
+        return index
+
+    @cached_property
+    def incident_columns(self) -> Optional[IncidentColumns]:
+        if np is None:  # numpy 没装：控制台列表逐条过滤
+            return None
+        cols = IncidentColumns()
+        self.incidents_snapshot.subscribe(cols.apply)
+        return cols
+
+    @cached_property
+    def incident_tiles(self) -> TileCache:
+        cache = TileCache(maxsize=settings.incidents_tile_cache_size)
+        self.incidents_snapshot.subscribe(cache.apply)
+        return cache
+
+    # ---------- comments ----------
+
+    @cached_property
+    def comments_repo(self) -> CommentsRepository:
+        if self.backend == "memory":
+            return MemoryCommentsRepo()
+        if self.backend == "sqlite":
+            return SqliteCommentsRepo(self.sqlite)
+        return CommentsRepo(self.ddb)
+
+    @cached_property
+    def comment_search(self) -> CommentSearchIndex:
+        return CommentSearchIndex(
+            self.comments_repo,
+            refresh_seconds=settings.comments_search_refresh_seconds,
+            max_docs=settings.comments_search_max_docs,
+        )
+
+    @cached_property
+    def comments_service(self) -> CommentsService:
+        return CommentsService(self.comments_repo, incidents=self.incidents_service, search=self.comment_search)
+
+    @cached_property
+    def comment_stats(self) -> CommentStatsReconciler:
+        return CommentStatsReconciler(
+            self.incidents_service,
+            self.comments_repo,
+            interval_seconds=settings.comment_stats_reconcile_seconds,
+        )
+
+    # ---------- auth ----------
+
+    @cached_property
+    def douyin(self) -> DouyinClient:
+        return DouyinClient()
+
+    def storage_calls(self) -> int:
+        """累计的存储调用次数（DynamoDB 请求 / SQLite 语句 / 内存 repo 方法调用），压测用。"""
+        built = self.__dict__
+        if self.backend == "dynamodb":
+            return self.ddb.calls if "ddb" in built else 0
+        if self.backend == "sqlite":
+            return self.sqlite.calls if "sqlite" in built else 0
+        return sum(built[k].calls for k in ("incidents_repo", "comments_repo") if k in built)
+
+    def coalesced(self) -> int:
+        """被 single-flight 合并掉（没有打到存储）的读请求数。"""
+        built = self.__dict__
+        return sum(built[k].flight.coalesced for k in ("incidents_service", "comments_service") if k in built)
+
+    def stats(self) -> dict:
+        """运行时计数（GET /console/stats）：只读已经建好的组件，不会为了统计去初始化什么。"""
+        built = self.__dict__
+        out: dict = {
+            "storage": {"backend": self.backend, "calls": self.storage_calls(), "coalesced": self.coalesced()},
+            "token_cache": dict(token_cache_stats),
+            "moderation": dict(moderation_stats),
+        }
+        if "ddb" in built:
+            out["storage"]["dynamodb_mode"] = self.ddb.mode
+        if "incidents_snapshot" in built:
+            snap = self.incidents_snapshot
+            out["snapshot"] = {
+                "ready": snap.ready,
+                "items": len(snap),
+                "version": snap.version,
+                "geometry_version": snap.geometry_version,
+            }
+        if "incident_tiles" in built:
+            out["tile_cache"] = {"size": len(self.incident_tiles)}
+        if "comment_search" in built:
+            search = self.comment_search
+            out["comment_search"] = {"ready": search.ready, "size": len(search), "over_capacity": search.over_capacity}
+        return out
+
+    # ---------- lifecycle ----------
+
+    async def startup(self) -> None:
+        # 派生索引跟快照一起建好，第一个请求不用等
+        self.incident_clusters
+        self.incident_tiles
+        self.incident_titles
+        self.incident_columns
+        self.incidents_snapshot.start()
+        self.comment_search.start()
+        self.comment_stats.start()
+        # 连接池跟着进程走，登录请求复用 keep-alive 连接
+        self.douyin.http
+
+    async def shutdown(self) -> None:
+        if "comments_service" in self.__dict__:
+            await self.comments_service.drain()
+        if "comment_stats" in self.__dict__:
+            await self.comment_stats.stop()
+        if "comment_search" in self.__dict__:
+            await self.comment_search.stop()
+        if "incidents_snapshot" in self.__dict__:
+            await self.incidents_snapshot.stop()
+        if "douyin" in self.__dict__:
+            await self.douyin.aclose()
+        if "ddb" in self.__dict__:
+            await self.ddb.aclose()
+        if "sqlite" in self.__dict__:
+            await self.sqlite.aclose()
+
+
+def get_container(request: Request) -> Container:
+    return request.app.state.container
+
+
+# ---------- FastAPI dependencies ----------
+
+
+def incidents_service(request: Request) -> IncidentsService:
+    return get_container(request).incidents_service
+
+
+def incidents_snapshot(request: Request) -> IncidentsSnapshot:
+    return get_container(request).incidents_snapshot
+
+
+def incident_clusters(request: Request) -> ClusterIndex:
+    return get_container(request).incident_clusters
+
+
+def incident_tiles(request: Request) -> TileCache:
+    return get_container(request).incident_tiles
+
+
+def incidents_repo(request: Request) -> IncidentsRepository:
+    return get_container(request).incidents_repo
+
+
+def comments_service(request: Request) -> CommentsService:
+    return get_container(request).comments_service
+
+
+def douyin_client(request: Request) -> DouyinClient:
+    return get_container(request).douyin
@@ -1,15 +1,30 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.routing import APIRoute
 from fastapi import Request, Response
 
 from app.api.router import router
+from app.container import Container
+from app.shared.compression import CompressionMiddleware
 from app.shared.config import settings
 
 from app.shared.types import IncidentCreateIn, IncidentCreateOut, Incident
 from uuid import uuid4
 
-app = FastAPI(title="Pet Poison Map API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    container: Container = app.state.container
+    await container.startup()
+    yield
+    await container.shutdown()
+
+
+app = FastAPI(title="Pet Poison Map API", version="0.1.0", lifespan=lifespan)
+# repo/service 懒加载，所有 router 共享
+app.state.container = Container()
 
 from fastapi import APIRouter
 
@@ -68,6 +83,10 @@ else:
 
 app.include_router(router)
 
+# 最后添加 = 最外层：所有路由的响应都经过它（已带 Content-Encoding 的预压缩响应原样透传）
+if settings.compress_min_bytes > 0:
+    app.add_middleware(CompressionMiddleware, min_size=settings.compress_min_bytes)
+
 
 @app.api_route("/health", methods=["GET", "HEAD"])
 def health(request: Request):
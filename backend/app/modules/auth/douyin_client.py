@@ -1,33 +1,92 @@
+"""
+抖音 OAuth 客户端：进程内一个连接池（keep-alive，装了 h2 就走 HTTP/2），
+lifespan 里创建、关闭（见 app/container.py）。userinfo 按 open_id 短时缓存。
+"""
+from __future__ import annotations
+
+import time
+from typing import Optional
+
 import httpx
+
 from app.shared.config import settings
 from app.shared.http import bad_request
+from app.shared.lru import LRUCache
 
+EXCHANGE_PATH = "/oauth/access_token/"
+USERINFO_PATH = "/oauth/userinfo/"
+USERINFO_CACHE_SIZE = 4096
 
-DOUYIN_EXCHANGE_URL = "https://open.douyin.com/oauth/access_token/"
-DOUYIN_USERINFO_URL = "https://open.douyin.com/oauth/userinfo/"
+try:  # HTTP/2 需要 httpx[http2]（h2 包），没装就用 HTTP/1.1 keep-alive
+    import h2  # noqa: F401
 
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
 
-async def exchange_code(code: str) -> dict:
-    if not settings.douyin_client_key or not settings.douyin_client_secret:
-        bad_request("douyin config missing")
 
-    params = {
-        "client_key": settings.douyin_client_key,
-        "client_secret": settings.douyin_client_secret,
-        "code": code,
-        "grant_type": "authorization_code",
-    }
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.get(DOUYIN_EXCHANGE_URL, params=params)
-        r.raise_for_status()
-        data = r.json()
-    return data.get("data") or data
+class DouyinClient:
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        userinfo_ttl_seconds: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.base_url = (base_url or settings.douyin_base_url).rstrip("/")
+        self.userinfo_ttl_seconds = (
+            settings.douyin_userinfo_ttl_seconds if userinfo_ttl_seconds is None else userinfo_ttl_seconds
+        )
+        self._transport = transport
+        self._http: Optional[httpx.AsyncClient] = None
+        self._userinfo: LRUCache[str, tuple[float, dict]] = LRUCache(USERINFO_CACHE_SIZE)
 
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=HTTP2 and self._transport is None,
+                transport=self._transport,
+                timeout=httpx.Timeout(
+                    settings.douyin_read_timeout,
+                    connect=settings.douyin_connect_timeout,
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.douyin_max_connections,
+                    max_keepalive_connections=settings.douyin_max_connections,
+                ),
+            )
+        return self._http
 
-async def get_userinfo(access_token: str, open_id: str) -> dict:
-    params = {"access_token": access_token, "open_id": open_id}
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.get(DOUYIN_USERINFO_URL, params=params)
+    async def _get(self, path: str, params: dict) -> dict:
+        r = await self.http.get(path, params=params)
         r.raise_for_status()
         data = r.json()
-    return data.get("data") or data
+        return data.get("data") or data
+
+    async def exchange_code(self, code: str) -> dict:
+        if not settings.douyin_client_key or not settings.douyin_client_secret:
+            bad_request("douyin config missing")
+
+        params = {
+            "client_key": settings.douyin_client_key,
+            "client_secret": settings.douyin_client_secret,
+            "code": code,
+            "grant_type": "authorization_code",
+        }
+        return await self._get(EXCHANGE_PATH, params)
+
+    async def get_userinfo(self, access_token: str, open_id: str) -> dict:
+        cached = self._userinfo.get(open_id)
+        if cached is not None and time.monotonic() < cached[0]:
+            return dict(cached[1])
+
+        data = await self._get(USERINFO_PATH, {"access_token": access_token, "open_id": open_id})
+        if self.userinfo_ttl_seconds > 0:
+            self._userinfo.set(open_id, (time.monotonic() + self.userinfo_ttl_seconds, data))
+        return dict(data)
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
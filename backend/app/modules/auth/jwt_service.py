@@ -1,7 +1,22 @@
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
 import jwt
 from app.shared.config import settings
 from app.shared.http import unauthorized
+from app.shared.lru import LRUCache
+
+# 已验签的 claims，按 token 的 sha256 缓存（不在内存里留原文）。
+# 过期时间 = min(token exp, 缓存时刻 + APP_JWT_CACHE_TTL_SECONDS)；只在本进程有效。
+_verified: LRUCache[bytes, tuple[float, dict]] = LRUCache(settings.app_jwt_cache_size)
+# 吊销的 token：digest -> exp（过了 exp 本来也验不过，届时清掉）
+_revoked: dict[bytes, float] = {}
+
+token_cache_stats = {"hits": 0, "misses": 0, "revoked": 0}
+
+
+def _digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
 
 
 def sign_app_token(payload: dict) -> str:
@@ -12,7 +27,51 @@ def sign_app_token(payload: dict) -> str:
 
 
 def verify_app_token(token: str) -> dict:
+    key = _digest(token)
+    now = time.time()
+    if _revoked and key in _revoked:
+        token_cache_stats["revoked"] += 1
+        unauthorized("invalid or expired token")
+
+    cached = _verified.get(key)
+    if cached is not None:
+        expires_at, claims = cached
+        if now < expires_at:
+            token_cache_stats["hits"] += 1
+            return dict(claims)
+        _verified.pop(key)
+    token_cache_stats["misses"] += 1
+
     try:
-        return jwt.decode(token, settings.app_jwt_secret, algorithms=["HS256"])
+        claims = jwt.decode(token, settings.app_jwt_secret, algorithms=["HS256"])
     except Exception:
         unauthorized("invalid or expired token")
+
+    expires_at = now + settings.app_jwt_cache_ttl_seconds
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)):
+        expires_at = min(expires_at, float(exp))
+    if expires_at > now:
+        _verified.set(key, (expires_at, claims))
+    return dict(claims)
+
+
+def revoke_app_token(token: str) -> None:
+    """吊销钩子：登出 / 封号时调用。从缓存里去掉，并在 token 过期前一直拒绝它（仅本进程）。"""
+    key = _digest(token)
+    _verified.pop(key)
+    try:
+        claims = jwt.decode(token, settings.app_jwt_secret, algorithms=["HS256"], options={"verify_exp": False})
+        exp = float(claims.get("exp") or 0)
+    except Exception:
+        return  # 本来就验不过，不用记
+    now = time.time()
+    for k in [k for k, t in _revoked.items() if t <= now]:
+        del _revoked[k]
+    if exp > now:
+        _revoked[key] = exp
+
+
+def clear_token_cache() -> None:
+    """换密钥后调用：已缓存的 claims 全部作废。"""
+    _verified.clear()
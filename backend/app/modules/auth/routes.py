@@ -1,6 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from app.container import douyin_client
 from app.shared.types import AuthCallbackIn, AuthCallbackOut
-from .douyin_client import exchange_code, get_userinfo
+from .douyin_client import DouyinClient
 from .jwt_service import sign_app_token
 from app.shared.http import bad_request
 
@@ -8,17 +9,17 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/douyin/callback", response_model=AuthCallbackOut)
-async def douyin_callback(inp: AuthCallbackIn):
+async def douyin_callback(inp: AuthCallbackIn, douyin: DouyinClient = Depends(douyin_client)):
     if not inp.code:
         bad_request("missing code")
 
-    tk = await exchange_code(inp.code)
+    tk = await douyin.exchange_code(inp.code)
     access_token = tk.get("access_token")
     open_id = tk.get("open_id")
     if not access_token or not open_id:
         bad_request("douyin exchange failed")
 
-    profile = await get_userinfo(access_token, open_id)
+    profile = await douyin.get_userinfo(access_token, open_id)
 
     app_token = sign_app_token(
         {
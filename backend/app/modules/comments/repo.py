@@ -1,39 +1,20 @@
-## 本地测试：
-# from __future__ import annotations
-
-# import asyncio
-# from typing import Dict, List
-
-# from app.shared.types import Comment
-
-
-# class CommentsRepo:
-#     def __init__(self) -> None:
-#         self._lock = asyncio.Lock()
-#         # key: incident_id -> list[Comment]
-#         self._by_incident: Dict[str, List[Comment]] = {}
-
-#     async def list_by_incident(self, incident_id: str) -> List[Comment]:
-#         async with self._lock:
-#             return list(self._by_incident.get(incident_id, []))
-
-#     async def add(self, comment: Comment) -> Comment:
-#         async with self._lock:
-#             self._by_incident.setdefault(comment.incident_id, []).append(comment)
-#             return comment
-
 from __future__ import annotations
 
-import os
 import asyncio
+import os
+from datetime import datetime
 from decimal import Decimal
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Callable, Iterable, Optional
+
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
 
-import boto3
-from botocore.config import Config
-from boto3.dynamodb.conditions import Key
+from app.shared.ddb import DynamoDB, get_dynamodb
+from app.shared.timeindex import query_time_index, stale_bucket_cond, time_bucket
+from app.shared.types import Comment, CommentFeedItem, Incident
 
-from app.shared.types import Comment
+# 改名时同步留言冗余标题的并发 UpdateItem 数
+TITLE_SYNC_CONCURRENCY = 8
 
 
 def _to_dynamodb(value: Any) -> Any:
@@ -60,40 +41,43 @@ def _from_dynamodb(value: Any) -> Any:
     return value
 
 
+def _index_attrs(created_at: str, incident: Optional[Incident]) -> dict[str, Any]:
+    attrs: dict[str, Any] = {"ts_bucket": time_bucket(created_at)}
+    if incident is not None:
+        attrs.update(incident_lng=incident.lng, incident_lat=incident.lat, incident_title=incident.title)
+    return attrs
+
+
 class CommentsRepo:
     """
     Best-practice DynamoDB repo:
     - PK: incident_id (String)
     - SK: created_at (String, ISO8601, sortable)
     This enables efficient Query by incident_id and time order.
+    - GSI (DDB_COMMENTS_TIME_INDEX): ts_bucket ("YYYY-MM") + created_at, projection ALL,
+      for the console feed. Items also carry incident_lng/lat/title (denormalized)
+      so the feed needs no join.
     """
 
-    def __init__(self) -> None:
-        region = os.getenv("AWS_REGION", "ap-northeast-2")
+    def __init__(self, ddb: Optional[DynamoDB] = None) -> None:
         table_name = os.getenv("DDB_COMMENTS_TABLE", "FriendlyPetMapComments")
 
-        cfg = Config(
-            region_name=region,
-            retries={"max_attempts": 10, "mode": "standard"},
-        )
-        self._ddb = boto3.resource("dynamodb", config=cfg)
-        self._table = self._ddb.Table(table_name)
+        # 共享连接池：所有 repo 用同一个引擎
+        self._table = (ddb or get_dynamodb()).table(table_name)
+        self._time_index = os.getenv("DDB_COMMENTS_TIME_INDEX", "created-index")
 
-    async def add(self, comment: Comment) -> Comment:
-        item = _to_dynamodb(comment.model_dump())
+    async def add(self, comment: Comment, incident: Optional[Incident] = None) -> Comment:
+        item = _to_dynamodb({**comment.model_dump(), **_index_attrs(comment.created_at, incident)})
 
         # Best practice: ensure SK exists (created_at) and PK exists (incident_id)
         if not item.get("incident_id") or not item.get("created_at"):
             raise ValueError("Comment must include incident_id and created_at for DynamoDB keys.")
 
-        def _put():
-            # prevent overwriting same (incident_id, created_at)
-            return self._table.put_item(
-                Item=item,
-                ConditionExpression="attribute_not_exists(incident_id) AND attribute_not_exists(created_at)",
-            )
-
-        await asyncio.to_thread(_put)
+        # prevent overwriting same (incident_id, created_at)
+        await self._table.put_item(
+            Item=item,
+            ConditionExpression="attribute_not_exists(incident_id) AND attribute_not_exists(created_at)",
+        )
         return comment
 
     async def list_by_incident(
@@ -107,19 +91,29 @@ class CommentsRepo:
         Efficient Query. For pagination, pass back `LastEvaluatedKey` (start_key).
         If you don't need pagination yet, just call with incident_id only.
         """
-        def _query():
-            kwargs: dict[str, Any] = {
-                "KeyConditionExpression": Key("incident_id").eq(incident_id),
-                "Limit": limit,
-                "ScanIndexForward": not newest_first,  # True=oldest->newest
-            }
-            if start_key:
-                kwargs["ExclusiveStartKey"] = start_key
-            return self._table.query(**kwargs)
+        items, _ = await self.list_page_by_incident(
+            incident_id, limit=limit, start_key=start_key, newest_first=newest_first
+        )
+        return items
 
-        resp = await asyncio.to_thread(_query)
+    async def list_page_by_incident(
+        self,
+        incident_id: str,
+        limit: int = 200,
+        start_key: Optional[dict[str, Any]] = None,
+        newest_first: bool = False,
+    ) -> tuple[list[Comment], Optional[dict[str, Any]]]:
+        """Same as list_by_incident, also returning `LastEvaluatedKey`."""
+        kwargs: dict[str, Any] = {
+            "KeyConditionExpression": Key("incident_id").eq(incident_id),
+            "Limit": limit,
+            "ScanIndexForward": not newest_first,  # True=oldest->newest
+        }
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        resp = await self._table.query(**kwargs)
         raw = resp.get("Items", [])
-        return [Comment(**_from_dynamodb(it)) for it in raw]
+        return [Comment(**_from_dynamodb(it)) for it in raw], resp.get("LastEvaluatedKey")
 
     async def scan_comments(
         self,
@@ -128,30 +122,113 @@ class CommentsRepo:
     ) -> tuple[list[Comment], Optional[dict[str, Any]]]:
         """Full table scan for admin console. Returns (items, last_evaluated_key)."""
 
-        def _scan():
-            kwargs: dict[str, Any] = {"Limit": limit}
-            if start_key:
-                kwargs["ExclusiveStartKey"] = start_key
-            return self._table.scan(**kwargs)
-
-        resp = await asyncio.to_thread(_scan)
+        kwargs: dict[str, Any] = {"Limit": limit}
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        resp = await self._table.scan(**kwargs)
         raw = resp.get("Items", [])
         items = [Comment(**_from_dynamodb(it)) for it in raw]
         return items, resp.get("LastEvaluatedKey")
 
-    async def update_content(self, incident_id: str, created_at: str, content: str) -> None:
-        def _update():
-            return self._table.update_item(
-                Key={"incident_id": incident_id, "created_at": created_at},
-                UpdateExpression="SET #c = :c",
-                ExpressionAttributeNames={"#c": "content"},
-                ExpressionAttributeValues={":c": content},
-            )
+    async def iter_comments(self, page_size: int = 500) -> AsyncIterator[list[Comment]]:
+        """整表按页产出（并行分段 Scan，页之间无序）。"""
+        async for raw in self._table.parallel_scan(Limit=page_size):
+            yield [Comment(**_from_dynamodb(it)) for it in raw]
+
+    async def query_by_created(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 20,
+        start_key: Optional[dict[str, Any]] = None,
+        predicate: Optional[Callable[[CommentFeedItem], bool]] = None,
+    ) -> tuple[list[CommentFeedItem], Optional[dict[str, Any]]]:
+        """Console feed, newest first, via the time index. See query_time_index."""
+        return await query_time_index(
+            self._table,
+            self._time_index,
+            key_attrs=("incident_id", "created_at"),
+            convert=lambda raw: CommentFeedItem(**_from_dynamodb(raw)),
+            start=start,
+            end=end,
+            limit=limit,
+            start_key=start_key,
+            predicate=predicate,
+        )
 
-        await asyncio.to_thread(_update)
+    async def set_incident_title(self, incident_id: str, title: str) -> int:
+        """点位改标题后同步冗余的 incident_title（按页并发更新，最多 TITLE_SYNC_CONCURRENCY 个在途）。返回更新条数。"""
+        sem = asyncio.Semaphore(TITLE_SYNC_CONCURRENCY)
+
+        async def one(created_at: str) -> int:
+            async with sem:
+                try:
+                    # 留言在同步期间被删了：不能被 UpdateItem 建回一条残缺行
+                    await self._table.update_item(
+                        Key={"incident_id": incident_id, "created_at": created_at},
+                        UpdateExpression="SET incident_title = :t",
+                        ConditionExpression="attribute_exists(incident_id)",
+                        ExpressionAttributeValues={":t": title},
+                    )
+                except ClientError as e:
+                    if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                        return 0
+                    raise
+                return 1
+
+        updated = 0
+        last_key: Optional[dict[str, Any]] = None
+        while True:
+            kwargs: dict[str, Any] = {
+                "KeyConditionExpression": Key("incident_id").eq(incident_id),
+                # 已经是新标题的（连续改名 / 重试）不再写
+                "FilterExpression": Attr("incident_title").ne(title),
+                "ProjectionExpression": "incident_id, created_at",
+            }
+            if last_key:
+                kwargs["ExclusiveStartKey"] = last_key
+            resp = await self._table.query(**kwargs)
+            updated += sum(await asyncio.gather(*(one(it["created_at"]) for it in resp.get("Items", []))))
+
+            last_key = resp.get("LastEvaluatedKey")
+            if not last_key:
+                return updated
+
+    async def backfill_index_attrs(self, lookup: Callable[[str], Optional[Incident]]) -> int:
+        """给旧留言补 ts_bucket 和冗余点位字段，分错桶的重新分桶（幂等）。lookup: incident_id -> Incident。"""
+        updated = 0
+        cond = Attr("ts_bucket").not_exists() | Attr("incident_lat").not_exists() | stale_bucket_cond()
+        async for page in self._table.parallel_scan(FilterExpression=cond):
+            for raw in page:
+                attrs = _to_dynamodb(_index_attrs(raw["created_at"], lookup(raw["incident_id"])))
+                await self._table.update_item(
+                    Key={"incident_id": raw["incident_id"], "created_at": raw["created_at"]},
+                    UpdateExpression="SET " + ", ".join(f"{k} = :{k}" for k in attrs),
+                    ExpressionAttributeValues={f":{k}": v for k, v in attrs.items()},
+                )
+                updated += 1
+        return updated
+
+    async def bulk_load(self, rows: Iterable[tuple[Comment, Optional[Incident]]]) -> int:
+        """批量导入（压测造数据用）：BatchWriteItem（不带防覆盖条件），写不进去的直接报错。"""
+        items = [_to_dynamodb({**c.model_dump(), **_index_attrs(c.created_at, inc)}) for c, inc in rows]
+        failed = await self._table.batch_put(items)
+        if failed:
+            raise RuntimeError(f"bulk_load: {len(failed)} comments not written")
+        return len(items)
 
-    async def delete(self, incident_id: str, created_at: str) -> None:
-        def _del():
-            return self._table.delete_item(Key={"incident_id": incident_id, "created_at": created_at})
+    async def update_content(self, incident_id: str, created_at: str, content: str) -> None:
+        await self._table.update_item(
+            Key={"incident_id": incident_id, "created_at": created_at},
+            UpdateExpression="SET #c = :c",
+            ExpressionAttributeNames={"#c": "content"},
+            ExpressionAttributeValues={":c": content},
+        )
 
-        await asyncio.to_thread(_del)
\ No newline at end of file
+    async def delete(self, incident_id: str, created_at: str) -> bool:
+        """Returns whether the comment existed (so counters are only decremented once)."""
+        resp = await self._table.delete_item(
+            Key={"incident_id": incident_id, "created_at": created_at},
+            ReturnValues="ALL_OLD",
+        )
+        return bool(resp.get("Attributes"))
\ No newline at end of file
@@ -1,24 +1,80 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 
+from app.container import comments_service
+from app.shared.config import settings
+from app.shared.cursor import decode_cursor, encode_cursor
+from app.shared.http import bad_request, json_response
 from app.shared.text_safety import validate_text
-from app.shared.types import CommentCreateIn, CommentCreateOut, CommentListOut
-from .repo import CommentsRepo
+from app.shared.types import CommentCreateIn, CommentCreateOut, CommentListOut, CommentMultiListOut
 from .service import CommentsService
 
 router = APIRouter(prefix="", tags=["comments"])
 
-_repo = CommentsRepo()
-_svc = CommentsService(_repo)
 
+@router.get("/comments", response_model=CommentListOut | CommentMultiListOut)
+async def list_comments(
+    incident_id: str | None = Query(None, min_length=1),
+    incident_ids: str | None = Query(None, description="逗号分隔，一次取多个点位的留言（按点位分组返回）"),
+    limit: int = Query(200, ge=1, le=200),
+    limit_per: int = Query(20, ge=1, le=200),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cursor: str | None = None,
+    svc: CommentsService = Depends(comments_service),
+):
+    if (incident_id is None) == (incident_ids is None):
+        bad_request("exactly one of incident_id / incident_ids is required")
+    if incident_ids is not None:
+        return await _list_comments_many(incident_ids, limit_per, order, cursor, svc)
 
-@router.get("/comments", response_model=CommentListOut)
-async def list_comments(incident_id: str = Query(..., min_length=1)):
-    items = await _svc.list_comments(incident_id)
-    return CommentListOut(incident_id=incident_id, items=items)
+    start_key = None
+    if cursor:
+        try:
+            data = decode_cursor(cursor)
+        except ValueError as e:
+            bad_request(str(e))
+        # cursor 绑定 incident_id + order，防止拿去翻别的列表
+        if data.get("i") != incident_id or data.get("o") != order:
+            bad_request("cursor does not match query")
+        start_key = data.get("k")
+
+    items, last_key = await svc.list_comments_page(
+        incident_id, limit=limit, start_key=start_key, newest_first=order == "desc"
+    )
+    next_cursor = encode_cursor({"i": incident_id, "o": order, "k": last_key}) if last_key else None
+    return json_response(CommentListOut(incident_id=incident_id, items=items, next_cursor=next_cursor))
+
+
+async def _list_comments_many(
+    incident_ids: str, limit_per: int, order: str, cursor: str | None, svc: CommentsService
+):
+    if cursor:
+        bad_request("cursor is only supported with incident_id")
+    # 去重，保持顺序
+    ids = list(dict.fromkeys(i.strip() for i in incident_ids.split(",") if i.strip()))
+    if not ids:
+        bad_request("incident_ids is empty")
+    if len(ids) > settings.comments_multi_max_ids:
+        bad_request(f"at most {settings.comments_multi_max_ids} incident_ids per request")
+
+    rows = await svc.list_comments_many(
+        ids, limit_per=limit_per, newest_first=order == "desc", concurrency=settings.comments_multi_concurrency
+    )
+    return json_response(
+        CommentMultiListOut(
+            groups=[
+                CommentListOut(
+                    incident_id=i,
+                    items=items,
+                    next_cursor=encode_cursor({"i": i, "o": order, "k": last_key}) if last_key else None,
+                )
+                for i, items, last_key in rows
+            ]
+        )
+    )
 
 
 @router.post("/comments", response_model=CommentCreateOut)
-async def create_comment(body: CommentCreateIn):
+async def create_comment(body: CommentCreateIn, svc: CommentsService = Depends(comments_service)):
     res = validate_text(
         body.content,
         min_len=1,
@@ -32,5 +88,5 @@ async def create_comment(body: CommentCreateIn):
             detail={"code": res.reason, "message": "留言不符合规范"},
         )
 
-    c = await _svc.create_comment(body.incident_id, res.cleaned)
+    c = await svc.create_comment(body.incident_id, res.cleaned)
     return CommentCreateOut(comment=c)
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.shared.textsearch import NgramIndex
+from app.shared.timeindex import parse_iso, to_utc
+from app.shared.types import Comment
+from app.storage.base import CommentsRepository
+
+log = logging.getLogger(__name__)
+
+REBUILD_PAGE_SIZE = 1000
+CATCH_UP_PAGE_SIZE = 200
+# 追增量时往回多看一段：其它副本的时钟可能比本机慢一点，created_at 略早于水位线的新留言也要捞到
+CATCH_UP_OVERLAP = timedelta(minutes=5)
+
+# 留言主键
+_Key = tuple[str, str]
+
+
+class CommentSearchIndex:
+    """
+    留言内容的倒排索引（控制台 q= 搜索）。只存主键 -> comment_id 和内容字符串本身，不存 Comment 对象。
+    - 启动时全表 scan 建一次；之后只做增量：
+      本进程的写入由 CommentsService 调 add/update/remove 就地更新，
+      其它副本新写的留言每 refresh_seconds 从时间索引按水位线追一次（只读新增的那一段）
+    - 其它副本的改/删不会追到，靠 reconcile()（POST /console/comments/search/reconcile）显式全量重建
+    - 条数超过 max_docs 时整个索引停用并释放（ready=False），调用方退回时间索引逐条过滤
+    - 第一次建完之前 ready=False，调用方同样退回
+    """
+
+    def __init__(
+        self, repo: CommentsRepository, refresh_seconds: float = 60.0, max_docs: int = 200_000
+    ) -> None:
+        self.repo = repo
+        self.refresh_seconds = refresh_seconds
+        self.max_docs = max_docs
+        self.ready = False
+        self.over_capacity = False
+
+        self._index = NgramIndex()
+        self._ids: dict[_Key, str] = {}
+        # 已经见过的最新 created_at（追增量的起点）
+        self._watermark = ""
+        # rebuild 期间本进程的写入（None = 删除）；scan 完成后重放，避免被旧数据冲掉
+        self._writes: Optional[dict[_Key, Optional[Comment]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._rebuilding: Optional[asyncio.Future] = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ---------- reads ----------
+
+    def search(self, q: str) -> list[Comment]:
+        """内容包含 q（忽略大小写）的留言，顺序不固定（只给命中的组装 Comment）。"""
+        index, ids = self._index, self._ids
+        return [
+            Comment(comment_id=ids[key], incident_id=key[0], created_at=key[1], content=index.text(key))
+            for key in index.search(q)
+        ]
+
+    # ---------- writes ----------
+
+    def add(self, comment: Comment) -> None:
+        self._put(self._index, self._ids, comment)
+        if self._writes is not None:
+            self._writes[(comment.incident_id, comment.created_at)] = comment
+        self._check_capacity()
+
+    def update(self, incident_id: str, created_at: str, content: str) -> None:
+        key = (incident_id, created_at)
+        if key in self._ids:
+            self._index.add(key, content)
+        if self._writes is not None:
+            # 索引里还没有（rebuild 前写的）时只记内容，重放时套到 scan 读到的那条上
+            self._writes[key] = Comment(comment_id="", incident_id=incident_id, content=content, created_at=created_at)
+
+    def remove(self, incident_id: str, created_at: str) -> None:
+        key = (incident_id, created_at)
+        self._index.remove(key)
+        self._ids.pop(key, None)
+        if self._writes is not None:
+            self._writes[key] = None
+
+    def _put(self, index: NgramIndex, ids: dict[_Key, str], comment: Comment) -> None:
+        key = (comment.incident_id, comment.created_at)
+        ids[key] = comment.comment_id
+        index.add(key, comment.content)
+        if comment.created_at > self._watermark:
+            self._watermark = comment.created_at
+
+    def _check_capacity(self) -> bool:
+        if len(self._ids) <= self.max_docs:
+            return True
+        if not self.over_capacity:
+            log.warning("comment search index over capacity (%d > %d), disabled", len(self._ids), self.max_docs)
+        self.over_capacity = True
+        self.ready = False
+        self._index, self._ids = NgramIndex(), {}
+        return False
+
+    # ---------- full rebuild（启动 / 显式 reconcile） ----------
+
+    async def rebuild(self) -> None:
+        # 表是空的 / 都是旧留言时，追增量从本次建索引开始的时刻算
+        started = datetime.now(timezone.utc).isoformat()
+        self._writes = {}
+        try:
+            index, ids = NgramIndex(), {}
+            async for page in self.repo.iter_comments(REBUILD_PAGE_SIZE):
+                for c in page:
+                    self._put(index, ids, c)
+                if len(ids) > self.max_docs:
+                    self._index, self._ids = index, ids
+                    self._check_capacity()
+                    return
+                # 大表建索引是纯 CPU，按页让出事件循环
+                await asyncio.sleep(0)
+            for key, c in self._writes.items():
+                if c is None:
+                    index.remove(key)
+                    ids.pop(key, None)
+                    continue
+                if not c.comment_id:  # 只改了内容
+                    if key in ids:
+                        index.add(key, c.content)
+                    continue
+                self._put(index, ids, c)
+        finally:
+            self._writes = None
+        self._index, self._ids = index, ids
+        self._watermark = max(self._watermark, started)
+        self.over_capacity = False
+        self.ready = self._check_capacity()
+
+    async def reconcile(self) -> None:
+        """显式全量重建（同步其它副本的改/删）；同时只跑一次，并发调用等同一次的结果。"""
+        if self._rebuilding is not None:
+            return await asyncio.shield(self._rebuilding)
+        self._rebuilding = asyncio.ensure_future(self.rebuild())
+        try:
+            await asyncio.shield(self._rebuilding)
+        finally:
+            self._rebuilding = None
+
+    # ---------- 增量 ----------
+
+    async def catch_up(self) -> int:
+        """从时间索引读水位线之后的新留言（其它副本写的），返回新加入的条数。"""
+        if not self.ready:
+            return 0
+        since = to_utc(parse_iso(self._watermark)) - CATCH_UP_OVERLAP
+        added = 0
+        start_key = None
+        while True:
+            page, start_key = await self.repo.query_by_created(
+                start=since, limit=CATCH_UP_PAGE_SIZE, start_key=start_key
+            )
+            for c in page:
+                if (c.incident_id, c.created_at) not in self._ids:
+                    self.add(
+                        Comment(
+                            comment_id=c.comment_id,
+                            incident_id=c.incident_id,
+                            content=c.content,
+                            created_at=c.created_at,
+                        )
+                    )
+                    added += 1
+            if not start_key or not self.ready:
+                return added
+
+    async def _run(self) -> None:
+        while not self.ready and not self.over_capacity:
+            try:
+                await self.reconcile()
+            except Exception:
+                log.exception("comment search index build failed")
+                await asyncio.sleep(self.refresh_seconds)
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.catch_up()
+            except Exception:
+                log.exception("comment search index catch-up failed")
+
+    def start(self) -> None:
+        if self.refresh_seconds <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -1,18 +1,75 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 from uuid import uuid4
 from datetime import datetime, timezone
+from typing import Optional
 
+from app.modules.comments.search import CommentSearchIndex
+from app.modules.incidents.service import IncidentsService
+from app.shared.singleflight import SingleFlight
 from app.shared.types import Comment
-from .repo import CommentsRepo
+from app.storage.base import CommentsRepository
+
+log = logging.getLogger(__name__)
 
 
 class CommentsService:
-    def __init__(self, repo: CommentsRepo) -> None:
+    def __init__(
+        self,
+        repo: CommentsRepository,
+        incidents: Optional[IncidentsService] = None,
+        search: Optional[CommentSearchIndex] = None,
+    ) -> None:
         self.repo = repo
+        # 用来把点位坐标/标题冗余到留言上（控制台按区域筛留言不用再 join）
+        self.incidents = incidents
+        # 控制台内容搜索的倒排索引，写路径顺带维护
+        self.search = search
+        # 同一点位的并发相同查询合并成一次
+        self.flight: SingleFlight = SingleFlight()
+        # 后台同步留言冗余标题：incident_id -> 最新标题；进行中的任务
+        self._title_syncs: dict[str, str] = {}
+        self._tasks: set[asyncio.Task] = set()
 
     async def list_comments(self, incident_id: str):
-        return await self.repo.list_by_incident(incident_id)
+        items, _ = await self.list_comments_page(incident_id)
+        return items
+
+    async def list_comments_page(
+        self,
+        incident_id: str,
+        limit: int = 200,
+        start_key=None,
+        newest_first: bool = False,
+    ):
+        key = (incident_id, limit, newest_first, tuple(sorted(start_key.items())) if start_key else None)
+        return await self.flight.do(
+            key,
+            lambda: self.repo.list_page_by_incident(
+                incident_id, limit=limit, start_key=start_key, newest_first=newest_first
+            ),
+        )
+
+    async def list_comments_many(
+        self,
+        incident_ids: list[str],
+        limit_per: int = 20,
+        newest_first: bool = False,
+        concurrency: int = 8,
+    ) -> list[tuple[str, list[Comment], Optional[dict]]]:
+        """多个点位的留言：每个点位一次查询，并发执行（最多 concurrency 个同时在途），结果按输入顺序返回。"""
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(incident_id: str):
+            async with sem:
+                items, last_key = await self.list_comments_page(
+                    incident_id, limit=limit_per, newest_first=newest_first
+                )
+            return incident_id, items, last_key
+
+        return list(await asyncio.gather(*(one(i) for i in incident_ids)))
 
     async def create_comment(self, incident_id: str, content: str) -> Comment:
         now = datetime.now(timezone.utc).isoformat()
@@ -22,13 +79,85 @@ class CommentsService:
             content=content,
             created_at=now,
         )
-        return await self.repo.add(c)
+        incident = await self.incidents.get_incident(incident_id) if self.incidents else None
+        c = await self.repo.add(c, incident)
+        if self.search is not None:
+            self.search.add(c)
+        if self.incidents is not None:
+            await self.incidents.add_comment_count(incident_id, 1, last_comment_at=c.created_at)
+        return c
 
     async def update_comment(self, incident_id: str, created_at: str, content: str) -> None:
         await self.repo.update_content(incident_id, created_at, content)
+        if self.search is not None:
+            self.search.update(incident_id, created_at, content)
 
     async def delete_comment(self, incident_id: str, created_at: str) -> None:
-        await self.repo.delete(incident_id, created_at)
+        deleted = await self.repo.delete(incident_id, created_at)
+        if self.search is not None:
+            self.search.remove(incident_id, created_at)
+        if not deleted or self.incidents is None:
+            return
+        incident = await self.incidents.add_comment_count(incident_id, -1)
+        if incident is not None and incident.last_comment_at == created_at:
+            # 删的是最新一条：last_comment_at 回退到剩下的最新留言
+            newest = await self.repo.list_by_incident(incident_id, limit=1, newest_first=True)
+            await self.incidents.set_comment_stats(
+                incident_id,
+                incident.comment_count,
+                newest[0].created_at if newest else None,
+                expected_count=incident.comment_count,
+            )
+
+    def iter_comments(self, page_size: int = 500):
+        return self.repo.iter_comments(page_size)
+
+    def search_comments(self, q: str) -> Optional[list[Comment]]:
+        """内容包含 q 的全部留言（倒排索引）；索引没就绪返回 None，调用方自己扫表。"""
+        if self.search is None or not self.search.ready:
+            return None
+        return self.search.search(q)
+
+    async def reconcile_search(self) -> Optional[int]:
+        """全量重建留言搜索索引，返回收录条数（超过容量停用时为 None）。"""
+        if self.search is None:
+            return None
+        await self.search.reconcile()
+        return len(self.search) if self.search.ready else None
+
+    async def feed(self, start=None, end=None, limit: int = 20, start_key=None, predicate=None):
+        return await self.repo.query_by_created(
+            start=start, end=end, limit=limit, start_key=start_key, predicate=predicate
+        )
+
+    def sync_incident_title(self, incident_id: str, title: str) -> None:
+        """
+        点位改名后把留言上冗余的 incident_title 改过来（留言多时是 O(留言数) 次写）。
+        在后台跑，改名请求不等它；同一点位正在同步时只记下最新标题，跑完再补一轮。
+        """
+        running = incident_id in self._title_syncs
+        self._title_syncs[incident_id] = title
+        if running:
+            return
+        task = asyncio.create_task(self._sync_title(incident_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _sync_title(self, incident_id: str) -> None:
+        try:
+            while True:
+                title = self._title_syncs[incident_id]
+                try:
+                    await self.repo.set_incident_title(incident_id, title)
+                except Exception:
+                    # 控制台读留言时优先用快照里的标题，冗余字段晚一点对上问题不大
+                    log.exception("sync incident title failed: %s", incident_id)
+                if self._title_syncs[incident_id] == title:
+                    return
+        finally:
+            self._title_syncs.pop(incident_id, None)
 
-    async def scan_comments(self, limit: int = 500, start_key=None):
-        return await self.repo.scan_comments(limit=limit, start_key=start_key)
\ No newline at end of file
+    async def drain(self) -> None:
+        """等后台同步跑完（关闭时调用）。"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,99 @@
+"""
+点位的留言统计（comment_count / last_comment_at）对账。
+
+留言写入/删除时已经原子地加减计数，这里定时全量核一遍，修正漂移
+（写留言成功但加计数失败、旧数据没有计数等）。每个副本各跑各的，结果幂等。
+
+    cd backend && python -m app.modules.comments.stats     # 手动跑一次（上线后给旧数据补计数）
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Optional
+
+from app.modules.incidents.service import IncidentsService
+from app.storage.base import CommentsRepository
+
+log = logging.getLogger(__name__)
+
+SCAN_PAGE_SIZE = 1000
+
+
+async def reconcile_comment_stats(incidents: IncidentsService, comments: CommentsRepository) -> int:
+    """按留言表重算每个点位的统计，和点位上存的不一致就改。返回修正的点位数。"""
+    # 先读点位、再扫留言：期间有新留言的话，点位上的计数已经变了，
+    # 下面带 expected_count 的写入会失败并跳过，下一轮再核
+    seen = {it.incident_id: it for it in await incidents.repo.list_incidents()}
+
+    counts: dict[str, int] = {}
+    last: dict[str, str] = {}
+    async for page in comments.iter_comments(SCAN_PAGE_SIZE):
+        for c in page:
+            counts[c.incident_id] = counts.get(c.incident_id, 0) + 1
+            if c.created_at > last.get(c.incident_id, ""):
+                last[c.incident_id] = c.created_at
+
+    fixed = 0
+    for incident_id, it in seen.items():
+        want = (counts.get(incident_id, 0), last.get(incident_id))
+        if (it.comment_count, it.last_comment_at) == want:
+            continue
+        if await incidents.set_comment_stats(incident_id, *want, expected_count=it.comment_count) is not None:
+            fixed += 1
+    return fixed
+
+
+class CommentStatsReconciler:
+    """后台定时对账（启动时不跑，避免每次发版所有副本同时全表扫描）。"""
+
+    def __init__(
+        self, incidents: IncidentsService, comments: CommentsRepository, interval_seconds: float = 3600
+    ) -> None:
+        self.incidents = incidents
+        self.comments = comments
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        fixed = await reconcile_comment_stats(self.incidents, self.comments)
+        if fixed:
+            log.info("comment stats reconciled: %d incidents fixed", fixed)
+        return fixed
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.run_once()
+            except Exception:
+                log.exception("comment stats reconcile failed")
+
+    def start(self) -> None:
+        if self.interval_seconds <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+async def main() -> None:
+    from app.container import Container
+
+    c = Container()
+    try:
+        print(f"fixed {await c.comment_stats.run_once()} incidents")
+    finally:
+        await c.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
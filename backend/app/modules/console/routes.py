@@ -1,36 +1,65 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Optional
-
-from fastapi import APIRouter, Depends, HTTPException, Query
-
+import csv
+import heapq
+import io
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Iterable, Optional, TypeVar
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.container import Container, comments_service, get_container, incidents_service
+from app.shared.cursor import decode_cursor, encode_cursor
+from app.shared.http import bad_request, encode_json, json_response
 from app.shared.security import require_console_token
 from app.shared.text_safety import validate_text
+from app.shared.timeindex import (
+    LEGACY_BUCKET,
+    TIME_BUCKET_START,
+    UNTIMED_BUCKET,
+    parse_iso,
+    time_bucket,
+    to_utc,
+)
 from app.shared.types import (
+    Comment,
+    CommentFeedItem,
     CommentUpdateIn,
     ConsoleCommentRow,
     ConsolePaged,
     Incident,
     IncidentUpdateIn,
 )
-from app.modules.incidents.repo import IncidentsRepo
 from app.modules.incidents.service import IncidentsService
-from app.modules.comments.repo import CommentsRepo
 from app.modules.comments.service import CommentsService
 
 router = APIRouter(prefix="/console", tags=["console"])
 
-_inc_repo = IncidentsRepo()
-_inc_svc = IncidentsService(_inc_repo)
+_DT_MIN = datetime.min.replace(tzinfo=timezone.utc)
 
-_c_repo = CommentsRepo()
-_c_svc = CommentsService(_c_repo)
+T = TypeVar("T")
 
 
 def _parse_iso(s: str) -> datetime:
-    s2 = s.strip().replace("Z", "+00:00")
-    return datetime.fromisoformat(s2)
+    return to_utc(parse_iso(s))
+
+
+def _parse_range(start: Optional[str], end: Optional[str]) -> tuple[Optional[datetime], Optional[datetime]]:
+    try:
+        return (_parse_iso(start) if start else None, _parse_iso(end) if end else None)
+    except ValueError:
+        bad_request("start/end must be ISO8601")
+
+
+def _decode_cursor(cursor: str) -> Optional[dict]:
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        bad_request(str(e))
 
 
 def _in_range(v: float, lo: Optional[float], hi: Optional[float]) -> bool:
@@ -41,6 +70,72 @@ def _in_range(v: float, lo: Optional[float], hi: Optional[float]) -> bool:
     return True
 
 
+# ---------- 内存里的游标分页（倒排索引 / 列式副本命中后用） ----------
+# 顺序与存储的时间索引一致：(created_at, id) 倒序，没有 created_at 的（记为 ""）排在最后。
+# 游标和存储游标同形（ts_bucket + created_at + id），索引没就绪时可以直接交给存储继续翻。
+_Pos = tuple[str, str]
+
+
+def _cursor_pos(start_key: Optional[dict], id_attr: str = "incident_id") -> Optional[_Pos]:
+    """游标 -> 从哪个 (created_at, id) 之后（不含）继续；None = 第一页。"""
+    if not start_key:
+        return None
+    bucket = start_key.get("ts_bucket")
+    if "created_at" in start_key or bucket == UNTIMED_BUCKET:
+        return (start_key.get("created_at") or "", str(start_key.get(id_attr, "")))
+    # 只有 ts_bucket：从该桶开头继续 = created_at 早于下一个桶的开头
+    if bucket == LEGACY_BUCKET:
+        return (TIME_BUCKET_START, "")
+    y, m = int(bucket[:4]), int(bucket[5:7])
+    return (f"{y + m // 12:04d}-{m % 12 + 1:02d}", "")
+
+
+def _cursor_at(pos: _Pos, id_attr: str = "incident_id") -> str:
+    created_at, id_ = pos
+    try:
+        bucket = time_bucket(created_at) if created_at else UNTIMED_BUCKET
+    except ValueError:
+        bucket = UNTIMED_BUCKET
+    return encode_cursor({"ts_bucket": bucket, "created_at": created_at, id_attr: id_})
+
+
+def _keyset_page(items: Iterable[T], pos_of: Callable[[T], _Pos], after: Optional[_Pos], limit: int):
+    """items 里排在 after 之后的前 limit 条（倒序），以及下一页的位置（没有更多时为 None）。"""
+    if after is not None:
+        items = [it for it in items if pos_of(it) < after]
+    top = heapq.nlargest(limit + 1, items, key=pos_of)
+    page = top[:limit]
+    return page, (pos_of(page[-1]) if len(top) > limit else None)
+
+
+def _in_time(created_at: Optional[str], start_dt: Optional[datetime], end_dt: Optional[datetime]) -> bool:
+    if not start_dt and not end_dt:
+        return True
+    if not created_at:
+        return False
+    try:
+        dt = _parse_iso(created_at)
+    except Exception:
+        return False
+    if start_dt and dt < start_dt:
+        return False
+    if end_dt and dt > end_dt:
+        return False
+    return True
+
+
+def _comment_row(c: Comment, inc: Incident) -> ConsoleCommentRow:
+    return ConsoleCommentRow(
+        comment_id=c.comment_id,
+        incident_id=c.incident_id,
+        content=c.content,
+        created_at=c.created_at,
+        incident_lng=inc.lng,
+        incident_lat=inc.lat,
+        incident_title=inc.title,
+    )
+
+
 @router.get("/incidents", dependencies=[Depends(require_console_token)], response_model=ConsolePaged)
 async def console_list_incidents(
     lat_min: float | None = None,
@@ -52,14 +147,13 @@ async def console_list_incidents(
     q: str | None = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=200),
+    cursor: str | None = Query(None, description="游标分页：首页传空字符串，之后传上一页的 next_cursor"),
+    inc_svc: IncidentsService = Depends(incidents_service),
 ):
-    items = await _inc_repo.list_incidents(limit=5000)
-
     qn = (q or "").strip().lower()
-    start_dt = _parse_iso(start) if start else None
-    end_dt = _parse_iso(end) if end else None
+    start_dt, end_dt = _parse_range(start, end)
 
-    def ok(it: Incident) -> bool:
+    def ok_place(it: Incident) -> bool:
         if not _in_range(it.lat, lat_min, lat_max):
             return False
         if not _in_range(it.lng, lng_min, lng_max):
@@ -67,43 +161,98 @@ async def console_list_incidents(
 
         if qn and qn not in (it.title or "").lower():
             return False
+        return True
 
-        if start_dt or end_dt:
-            if not it.created_at:
-                return False
-            try:
-                dt = _parse_iso(it.created_at)
-            except Exception:
-                return False
-            if start_dt and dt < start_dt:
-                return False
-            if end_dt and dt > end_dt:
-                return False
+    if cursor is not None:
+        # 快照就绪时从列式副本翻页（含首页）：向量化筛选 + 按 (created_at, id) 的位置游标，不打存储
+        start_key = _decode_cursor(cursor)
+        after = _cursor_pos(start_key)
+        found = inc_svc.page_incidents(
+            lat_min, lat_max, lng_min, lng_max, start_dt, end_dt, q=qn, after=after, limit=page_size
+        )
+        if found is not None:
+            page_items, more = found
+            next_pos = (page_items[-1].created_at or "", page_items[-1].incident_id) if more else None
+        elif qn and (hits := inc_svc.search_titles(qn)) is not None:
+            # 没有列式副本（没装 numpy）：标题倒排索引拿到全部命中，在内存里筛选 + 按时间翻页
+            page_items, next_pos = _keyset_page(
+                (it for it in hits if ok_place(it) and _in_time(it.created_at, start_dt, end_dt)),
+                lambda it: (it.created_at or "", it.incident_id),
+                after,
+                page_size,
+            )
+        else:
+            page_items = None
+        if page_items is not None:
+            return json_response(
+                ConsolePaged(
+                    page=page,
+                    page_size=page_size,
+                    items=page_items,
+                    next_cursor=_cursor_at(next_pos) if next_pos else None,
+                )
+            )
 
-        return True
+        # 快照没就绪：存储的时间索引，日期范围下推到 KeyCondition，一页通常只要一次 Query
+        has_filter = qn or any(v is not None for v in (lat_min, lat_max, lng_min, lng_max))
+        page_items, next_key = await inc_svc.repo.query_by_created(
+            start_dt,
+            end_dt,
+            limit=page_size,
+            start_key=start_key,
+            predicate=ok_place if has_filter else None,
+        )
+        return json_response(
+            ConsolePaged(
+                page=page,
+                page_size=page_size,
+                items=page_items,
+                next_cursor=encode_cursor(next_key) if next_key else None,
+            )
+        )
+
+    start_i = (page - 1) * page_size
+    found = inc_svc.filter_incidents(
+        lat_min, lat_max, lng_min, lng_max, start_dt, end_dt, q=qn, offset=start_i, limit=page_size
+    )
+    if found is not None:
+        total, page_items = found
+        return json_response(ConsolePaged(page=page, page_size=page_size, total=total, items=page_items))
+
+    # 列式副本不可用（快照没就绪 / 没装 numpy）：逐条过滤；有关键词时先查标题倒排索引缩小范围
+    items = inc_svc.search_titles(qn) if qn else None
+    if items is None:
+        items = await inc_svc.repo.list_incidents(limit=5000)
+
+    def ok(it: Incident) -> bool:
+        return ok_place(it) and _in_time(it.created_at, start_dt, end_dt)
 
     filtered = [it for it in items if ok(it)]
 
     def sort_key(it: Incident):
         if not it.created_at:
-            return datetime.min
+            return _DT_MIN
         try:
             return _parse_iso(it.created_at)
         except Exception:
-            return datetime.min
+            return _DT_MIN
 
     filtered.sort(key=sort_key, reverse=True)
 
     total = len(filtered)
-    start_i = (page - 1) * page_size
     end_i = start_i + page_size
     page_items = filtered[start_i:end_i]
 
-    return ConsolePaged(page=page, page_size=page_size, total=total, items=[x.model_dump() for x in page_items])
+    return json_response(ConsolePaged(page=page, page_size=page_size, total=total, items=page_items))
 
 
 @router.put("/incidents/{incident_id}", dependencies=[Depends(require_console_token)])
-async def console_update_incident(incident_id: str, body: IncidentUpdateIn):
+async def console_update_incident(
+    incident_id: str,
+    body: IncidentUpdateIn,
+    inc_svc: IncidentsService = Depends(incidents_service),
+    c_svc: CommentsService = Depends(comments_service),
+):
     res = validate_text(
         body.title,
         min_len=1,
@@ -115,16 +264,19 @@ async def console_update_incident(incident_id: str, body: IncidentUpdateIn):
         raise HTTPException(status_code=400, detail={"code": res.reason, "message": "标题不符合规范"})
 
     try:
-        it = await _inc_svc.update_incident_title(incident_id, res.cleaned)
+        it = await inc_svc.update_incident_title(incident_id, res.cleaned)
     except KeyError:
         raise HTTPException(status_code=404, detail="incident not found")
 
-    return {"ok": True, "incident": it.model_dump()}
+    # 留言上冗余的点位标题也要跟着改（后台执行，不阻塞本次请求）
+    c_svc.sync_incident_title(incident_id, it.title)
+
+    return json_response({"ok": True, "incident": it})
 
 
 @router.delete("/incidents/{incident_id}", dependencies=[Depends(require_console_token)])
-async def console_delete_incident(incident_id: str):
-    await _inc_svc.delete_incident(incident_id)
+async def console_delete_incident(incident_id: str, inc_svc: IncidentsService = Depends(incidents_service)):
+    await inc_svc.delete_incident(incident_id)
     return {"ok": True}
 
 
@@ -139,77 +291,92 @@ async def console_list_comments(
     q: str | None = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=200),
+    cursor: str | None = Query(None, description="游标分页：首页传空字符串，之后传上一页的 next_cursor"),
+    inc_svc: IncidentsService = Depends(incidents_service),
+    c_svc: CommentsService = Depends(comments_service),
 ):
-    incidents = await _inc_repo.list_incidents(limit=5000)
-    by_id = {it.incident_id: it for it in incidents}
-
     qn = (q or "").strip().lower()
-    start_dt = _parse_iso(start) if start else None
-    end_dt = _parse_iso(end) if end else None
-
-    all_comments = []
-    last = None
-    for _ in range(50):  # guardrail
-        batch, last = await _c_svc.scan_comments(limit=200, start_key=last)
-        all_comments.extend(batch)
-        if not last:
-            break
-
-    rows: list[ConsoleCommentRow] = []
-
-    for c in all_comments:
-        inc = by_id.get(c.incident_id)
-        if not inc:
-            continue
-
-        if not _in_range(inc.lat, lat_min, lat_max):
-            continue
-        if not _in_range(inc.lng, lng_min, lng_max):
-            continue
-
-        if qn and qn not in (c.content or "").lower():
-            continue
-
-        if start_dt or end_dt:
-            try:
-                dt = _parse_iso(c.created_at)
-            except Exception:
-                continue
-            if start_dt and dt < start_dt:
-                continue
-            if end_dt and dt > end_dt:
-                continue
-
-        rows.append(
-            ConsoleCommentRow(
-                comment_id=c.comment_id,
-                incident_id=c.incident_id,
-                content=c.content,
-                created_at=c.created_at,
-                incident_lng=inc.lng,
-                incident_lat=inc.lat,
-                incident_title=inc.title,
+    start_dt, end_dt = _parse_range(start, end)
+    # 页码模式（旧接口，控制台前端已经只用游标）也走同一条路：从头按时间取到第 page 页再截出来，
+    # 不再整表扫描 + join + 排序；深翻页请用游标
+    skip = 0 if cursor is not None else (page - 1) * page_size
+    start_key = _decode_cursor(cursor) if cursor else None
+
+    hits = c_svc.search_comments(qn) if qn and inc_svc.snapshot_ready else None
+    if hits is not None:
+        # 关键词：留言倒排索引拿到全部命中，点位字段查快照，在内存里筛选 + 按时间翻页
+        def matched() -> Iterable[tuple[Comment, Incident]]:
+            for c in hits:
+                inc = inc_svc.snapshot.get(c.incident_id)
+                if (
+                    inc is not None
+                    and _in_range(inc.lat, lat_min, lat_max)
+                    and _in_range(inc.lng, lng_min, lng_max)
+                    and _in_time(c.created_at, start_dt, end_dt)
+                ):
+                    yield c, inc
+
+        page_hits, next_pos = _keyset_page(
+            matched(),
+            lambda m: (m[0].created_at, m[0].incident_id),
+            _cursor_pos(start_key),
+            skip + page_size,
+        )
+        return json_response(
+            ConsolePaged(
+                page=page,
+                page_size=page_size,
+                items=[_comment_row(c, inc) for c, inc in page_hits[skip:]],
+                next_cursor=_cursor_at(next_pos) if next_pos else None,
             )
         )
 
-    def c_sort_key(r: ConsoleCommentRow):
-        try:
-            return _parse_iso(r.created_at)
-        except Exception:
-            return datetime.min
-
-    rows.sort(key=c_sort_key, reverse=True)
+    # 时间索引 + 留言上冗余的点位字段：不扫全表、不 join
+    def to_row(c: CommentFeedItem) -> Optional[ConsoleCommentRow]:
+        if inc_svc.snapshot_ready:
+            inc = inc_svc.snapshot.get(c.incident_id)
+            if inc is None:
+                return None  # 点位已删除
+            lng, lat, title = inc.lng, inc.lat, inc.title
+        else:
+            if c.incident_lat is None or c.incident_lng is None:
+                return None
+            lng, lat, title = c.incident_lng, c.incident_lat, c.incident_title or ""
+        return ConsoleCommentRow(
+            comment_id=c.comment_id,
+            incident_id=c.incident_id,
+            content=c.content,
+            created_at=c.created_at,
+            incident_lng=lng,
+            incident_lat=lat,
+            incident_title=title,
+        )
 
-    total = len(rows)
-    start_i = (page - 1) * page_size
-    end_i = start_i + page_size
-    page_items = rows[start_i:end_i]
+    def ok_row(c: CommentFeedItem) -> bool:
+        r = to_row(c)
+        if r is None:
+            return False
+        if not _in_range(r.incident_lat, lat_min, lat_max):
+            return False
+        if not _in_range(r.incident_lng, lng_min, lng_max):
+            return False
+        return not qn or qn in (r.content or "").lower()
 
-    return ConsolePaged(page=page, page_size=page_size, total=total, items=[x.model_dump() for x in page_items])
+    feed, next_key = await c_svc.feed(
+        start_dt, end_dt, limit=skip + page_size, start_key=start_key, predicate=ok_row
+    )
+    return json_response(
+        ConsolePaged(
+            page=page,
+            page_size=page_size,
+            items=[to_row(c) for c in feed[skip:]],
+            next_cursor=encode_cursor(next_key) if next_key else None,
+        )
+    )
 
 
 @router.put("/comments", dependencies=[Depends(require_console_token)])
-async def console_update_comment(body: CommentUpdateIn):
+async def console_update_comment(body: CommentUpdateIn, c_svc: CommentsService = Depends(comments_service)):
     res = validate_text(
         body.content,
         min_len=1,
@@ -220,7 +387,7 @@ async def console_update_comment(body: CommentUpdateIn):
     if not res.ok:
         raise HTTPException(status_code=400, detail={"code": res.reason, "message": "留言不符合规范"})
 
-    await _c_svc.update_comment(body.incident_id, body.created_at, res.cleaned)
+    await c_svc.update_comment(body.incident_id, body.created_at, res.cleaned)
     return {"ok": True}
 
 
@@ -228,6 +395,149 @@ async def console_update_comment(body: CommentUpdateIn):
 async def console_delete_comment(
     incident_id: str = Query(..., min_length=1),
     created_at: str = Query(..., min_length=1),
+    c_svc: CommentsService = Depends(comments_service),
 ):
-    await _c_svc.delete_comment(incident_id, created_at)
-    return {"ok": True}
\ No newline at end of file
+    await c_svc.delete_comment(incident_id, created_at)
+    return {"ok": True}
+
+
+# ---------- export ----------
+
+EXPORT_PAGE_SIZE = 500
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+async def _export_incidents(inc_svc: IncidentsService, keep: Callable[[Incident], bool]) -> AsyncIterator[Incident]:
+    async for page in inc_svc.repo.iter_incidents(EXPORT_PAGE_SIZE):
+        for it in page:
+            if keep(it):
+                yield it
+
+
+async def _export_comments(
+    c_svc: CommentsService,
+    lookup: Callable[[str], Optional[Incident]],
+    keep: Callable[[ConsoleCommentRow], bool],
+) -> AsyncIterator[ConsoleCommentRow]:
+    async for page in c_svc.iter_comments(EXPORT_PAGE_SIZE):
+        for c in page:
+            inc = lookup(c.incident_id)
+            if inc is None:
+                continue  # 点位已删除，和列表接口一致
+            row = ConsoleCommentRow(
+                comment_id=c.comment_id,
+                incident_id=c.incident_id,
+                content=c.content,
+                created_at=c.created_at,
+                incident_lng=inc.lng,
+                incident_lat=inc.lat,
+                incident_title=inc.title,
+            )
+            if keep(row):
+                yield row
+
+
+async def _ndjson(rows: AsyncIterator[BaseModel]) -> AsyncIterator[bytes]:
+    buf = bytearray()
+    async for r in rows:
+        buf += encode_json(r)
+        buf += b"\n"
+        if len(buf) >= EXPORT_CHUNK_BYTES:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
+
+def _csv_cell(v: Any) -> Any:
+    # 防 CSV 公式注入：用户内容以 = + - @ 开头时 Excel 会当公式执行
+    if isinstance(v, str) and v[:1] in ("=", "+", "-", "@", "\t", "\r"):
+        return "'" + v
+    return v
+
+
+async def _csv(rows: AsyncIterator[BaseModel], fields: list[str]) -> AsyncIterator[bytes]:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    buf.write("\ufeff")  # BOM：Excel 直接打开中文不乱码
+    w.writerow(fields)
+    async for r in rows:
+        w.writerow([_csv_cell(getattr(r, f)) for f in fields])
+        if buf.tell() >= EXPORT_CHUNK_BYTES:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+@router.get("/export/{kind}", dependencies=[Depends(require_console_token)])
+async def console_export(
+    kind: str = Path(..., pattern="^(incidents|comments)$"),
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    lat_min: float | None = None,
+    lat_max: float | None = None,
+    lng_min: float | None = None,
+    lng_max: float | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    q: str | None = None,
+    inc_svc: IncidentsService = Depends(incidents_service),
+    c_svc: CommentsService = Depends(comments_service),
+):
+    """
+    全量导出（筛选参数同列表接口）。按存储的 scan 分页边读边写（DynamoDB 上是并行分段 Scan，行序不固定），内存占用与数据量无关，整表只扫一遍。
+    """
+    qn = (q or "").strip().lower()
+    start_dt, end_dt = _parse_range(start, end)
+
+    if kind == "incidents":
+
+        def keep_incident(it: Incident) -> bool:
+            return (
+                _in_range(it.lat, lat_min, lat_max)
+                and _in_range(it.lng, lng_min, lng_max)
+                and (not qn or qn in (it.title or "").lower())
+                and _in_time(it.created_at, start_dt, end_dt)
+            )
+
+        rows: AsyncIterator[BaseModel] = _export_incidents(inc_svc, keep_incident)
+        fields = list(Incident.model_fields)
+    else:
+
+        def keep_comment(r: ConsoleCommentRow) -> bool:
+            return (
+                _in_range(r.incident_lat, lat_min, lat_max)
+                and _in_range(r.incident_lng, lng_min, lng_max)
+                and (not qn or qn in (r.content or "").lower())
+                and _in_time(r.created_at, start_dt, end_dt)
+            )
+
+        # 点位坐标/标题取当前值：快照就绪直接查快照，否则先读一遍点位（点位数远小于留言数）
+        if inc_svc.snapshot_ready:
+            lookup = inc_svc.snapshot.get
+        else:
+            lookup = {it.incident_id: it for it in await inc_svc.repo.list_incidents()}.get
+        rows = _export_comments(c_svc, lookup, keep_comment)
+        fields = list(ConsoleCommentRow.model_fields)
+
+    body = _ndjson(rows) if fmt == "ndjson" else _csv(rows, fields)
+    filename = f"{kind}-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{fmt}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
+
+
+@router.post("/comments/search/reconcile", dependencies=[Depends(require_console_token)])
+async def console_reconcile_comment_search(c_svc: CommentsService = Depends(comments_service)):
+    """全量重建留言搜索索引：平时只追新增，其它副本的改/删要靠这个对齐。"""
+    size = await c_svc.reconcile_search()
+    return {"ok": size is not None, "size": size}
+
+
+@router.get("/stats", dependencies=[Depends(require_console_token)])
+async def console_stats(container: Container = Depends(get_container)):
+    """运行时计数：存储调用 / single-flight 合并数、token 验签缓存、文本审核耗时、快照和各索引状态。"""
+    return json_response(container.stats())
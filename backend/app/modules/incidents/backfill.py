@@ -0,0 +1,26 @@
+"""
+一次性补齐旧数据的索引字段（点位 geohash/ts_bucket，留言 ts_bucket + 冗余点位字段），
+并把分到 DDB_TIME_BUCKET_START 之前的行挪进 LEGACY_BUCKET。改过起点后也要重跑一次。
+
+    cd backend && python -m app.modules.incidents.backfill
+"""
+import asyncio
+
+from app.container import Container
+
+
+async def main() -> None:
+    c = Container()
+    try:
+        n = await c.incidents_repo.backfill_index_attrs()
+        print(f"backfilled {n} incidents")
+
+        by_id = {it.incident_id: it for it in await c.incidents_repo.list_incidents()}
+        n = await c.comments_repo.backfill_index_attrs(by_id.get)
+        print(f"backfilled {n} comments")
+    finally:
+        await c.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
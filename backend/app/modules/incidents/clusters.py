@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import math
+from typing import Iterable, Optional
+
+from app.shared.geo import BBox, mercator_xy
+from app.shared.types import Incident, IncidentCluster
+
+# 网格聚合：每个 zoom 下按屏幕像素网格（CLUSTER_RADIUS_PX）把点位分桶
+MAX_CLUSTER_ZOOM = 16
+TILE_SIZE_PX = 256
+CLUSTER_RADIUS_PX = 60
+
+
+def _grid_size(zoom: int) -> int:
+    return max(1, int(TILE_SIZE_PX * (1 << zoom) / CLUSTER_RADIUS_PX))
+
+
+class _Cell:
+    __slots__ = ("ids", "sum_lat", "sum_lng", "bounds", "dirty")
+
+    def __init__(self) -> None:
+        self.ids: set[str] = set()
+        self.sum_lat = 0.0
+        self.sum_lng = 0.0
+        # (lng_min, lat_min, lng_max, lat_max)；删除后需要重算时 dirty=True
+        self.bounds: Optional[tuple[float, float, float, float]] = None
+        self.dirty = False
+
+
+class ClusterIndex:
+    """
+    每个 zoom 级别预先聚合好的网格聚类，随点位增删增量更新。
+    作为 IncidentsSnapshot 的监听器挂载（apply）。
+    """
+
+    def __init__(self, max_zoom: int = MAX_CLUSTER_ZOOM) -> None:
+        self.max_zoom = max_zoom
+        self._points: dict[str, tuple[float, float]] = {}
+        self._levels: list[dict[tuple[int, int], _Cell]] = [{} for _ in range(max_zoom + 1)]
+
+    @classmethod
+    def build(cls, incidents: Iterable[Incident]) -> "ClusterIndex":
+        idx = cls()
+        for it in incidents:
+            idx.apply(None, it)
+        return idx
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def apply(self, old: Optional[Incident], new: Optional[Incident]) -> None:
+        if old is not None and (new is None or (old.lat, old.lng) != (new.lat, new.lng)):
+            self._remove(old.incident_id)
+        if new is not None and new.incident_id not in self._points:
+            self._add(new.incident_id, new.lat, new.lng)
+
+    def _keys(self, lat: float, lng: float) -> Iterable[tuple[int, tuple[int, int]]]:
+        x, y = mercator_xy(lat, lng)
+        for z in range(self.max_zoom + 1):
+            n = _grid_size(z)
+            yield z, (int(x * n), int(y * n))
+
+    def _add(self, incident_id: str, lat: float, lng: float) -> None:
+        self._points[incident_id] = (lat, lng)
+        for z, key in self._keys(lat, lng):
+            cell = self._levels[z].get(key)
+            if cell is None:
+                cell = self._levels[z][key] = _Cell()
+            cell.ids.add(incident_id)
+            cell.sum_lat += lat
+            cell.sum_lng += lng
+            if not cell.dirty:
+                b = cell.bounds
+                cell.bounds = (
+                    (lng, lat, lng, lat)
+                    if b is None
+                    else (min(b[0], lng), min(b[1], lat), max(b[2], lng), max(b[3], lat))
+                )
+
+    def _remove(self, incident_id: str) -> None:
+        pt = self._points.pop(incident_id, None)
+        if pt is None:
+            return
+        lat, lng = pt
+        for z, key in self._keys(lat, lng):
+            cell = self._levels[z].get(key)
+            if cell is None:
+                continue
+            cell.ids.discard(incident_id)
+            if not cell.ids:
+                del self._levels[z][key]
+                continue
+            cell.sum_lat -= lat
+            cell.sum_lng -= lng
+            b = cell.bounds
+            if b is not None and (lng in (b[0], b[2]) or lat in (b[1], b[3])):
+                cell.dirty = True
+
+    def _bounds(self, cell: _Cell) -> tuple[float, float, float, float]:
+        if cell.dirty or cell.bounds is None:
+            pts = [self._points[i] for i in cell.ids]
+            lats = [p[0] for p in pts]
+            lngs = [p[1] for p in pts]
+            cell.bounds = (min(lngs), min(lats), max(lngs), max(lats))
+            cell.dirty = False
+        return cell.bounds
+
+    def query(self, zoom: int, bbox: Optional[BBox] = None) -> list[IncidentCluster]:
+        z = max(0, min(self.max_zoom, zoom))
+        level = self._levels[z]
+
+        cells: Iterable[tuple[tuple[int, int], _Cell]]
+        if bbox is None:
+            cells = level.items()
+        else:
+            n = _grid_size(z)
+            x0, y1 = mercator_xy(bbox.lat_min, bbox.lng_min)
+            x1, y0 = mercator_xy(bbox.lat_max, bbox.lng_max)
+            gx0, gx1 = int(x0 * n), int(x1 * n)
+            gy0, gy1 = int(y0 * n), int(y1 * n)
+            if (gx1 - gx0 + 1) * (gy1 - gy0 + 1) < len(level):
+                cells = (
+                    ((gx, gy), level[(gx, gy)])
+                    for gx in range(gx0, gx1 + 1)
+                    for gy in range(gy0, gy1 + 1)
+                    if (gx, gy) in level
+                )
+            else:
+                cells = (
+                    (k, c) for k, c in level.items() if gx0 <= k[0] <= gx1 and gy0 <= k[1] <= gy1
+                )
+
+        out: list[IncidentCluster] = []
+        for _, cell in cells:
+            count = len(cell.ids)
+            out.append(
+                IncidentCluster(
+                    count=count,
+                    lat=cell.sum_lat / count,
+                    lng=cell.sum_lng / count,
+                    bounds=list(self._bounds(cell)),
+                    incident_id=next(iter(cell.ids)) if count == 1 else None,
+                )
+            )
+        return out
+
+
+def _wrap_lng(lng: float) -> float:
+    if -180.0 <= lng <= 180.0:
+        return lng
+    return (lng + 180.0) % 360.0 - 180.0
+
+
+def parse_bbox_param(raw: str) -> list[BBox]:
+    """
+    'lng_min,lat_min,lng_max,lat_max' → BBox 列表（与地图 SDK 的 getBounds().toArray() 顺序一致）。
+    视野跨 180° 经线时 SDK 给的是 lng_min > lng_max 或超出 ±180 的经度：折回 [-180, 180] 后拆成东西两个框；
+    纬度截到 [-90, 90]。
+    """
+    parts = [float(x) for x in raw.split(",")]
+    if len(parts) != 4 or not all(math.isfinite(p) for p in parts):
+        raise ValueError("bbox must be lng_min,lat_min,lng_max,lat_max")
+    lng_min, lat_min, lng_max, lat_max = parts
+    if lat_min > lat_max:
+        raise ValueError("invalid bbox")
+    lat_min, lat_max = max(-90.0, lat_min), min(90.0, lat_max)
+    if lng_max - lng_min >= 360.0:
+        return [BBox(lat_min, lat_max, -180.0, 180.0)]
+    lng_min, lng_max = _wrap_lng(lng_min), _wrap_lng(lng_max)
+    if lng_min <= lng_max:
+        return [BBox(lat_min, lat_max, lng_min, lng_max)]
+    return [BBox(lat_min, lat_max, lng_min, 180.0), BBox(lat_min, lat_max, -180.0, lng_max)]
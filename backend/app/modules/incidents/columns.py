@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterable, Optional
+
+from app.shared.textsearch import NgramIndex
+from app.shared.timeindex import parse_iso, to_utc
+from app.shared.types import Incident
+
+try:  # 可选依赖：没装 numpy 时控制台退回逐条过滤
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# 没有 / 解析不了 created_at 的点位：排在最后，有时间筛选时不命中
+_NO_TS = float("-inf")
+
+
+def _epoch(created_at: Optional[str]) -> float:
+    if not created_at:
+        return _NO_TS
+    try:
+        return to_utc(parse_iso(created_at)).timestamp()
+    except Exception:
+        return _NO_TS
+
+
+class IncidentColumns:
+    """
+    点位的列式副本（控制台列表用）：lat / lng / created_at(epoch 秒) 三个 NumPy 列，
+    外加按行对齐的 incident_id -> 行号、Incident 对象，以及按行号建的标题倒排（搜索直接得到行号）。
+    作为 IncidentsSnapshot 的监听器挂载（apply），随写入增量更新；删除时用最后一行填洞，不搬整列。
+    bbox / 时间筛选是整列的向量化比较，排序是对预先算好的时间戳 argsort。
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        if np is None:
+            raise RuntimeError("IncidentColumns requires numpy")
+        self._n = 0
+        self._rows: dict[str, int] = {}
+        self._items: list[Incident] = []
+        self._titles = NgramIndex()
+        self._lat = np.empty(capacity, dtype=np.float64)
+        self._lng = np.empty(capacity, dtype=np.float64)
+        self._ts = np.empty(capacity, dtype=np.float64)
+
+    @classmethod
+    def build(cls, incidents: Iterable[Incident]) -> "IncidentColumns":
+        cols = cls()
+        for it in incidents:
+            cols.apply(None, it)
+        return cols
+
+    def __len__(self) -> int:
+        return self._n
+
+    # ---------- writes ----------
+
+    def apply(self, old: Optional[Incident], new: Optional[Incident]) -> None:
+        if new is None:
+            if old is not None:
+                self._remove(old.incident_id)
+            return
+        row = self._rows.get(new.incident_id)
+        if row is None:
+            row = self._append(new.incident_id)
+        self._titles.add(row, new.title or "")  # 标题没变时是空操作
+        if old is not None and (old.lat, old.lng, old.created_at) == (new.lat, new.lng, new.created_at):
+            # 只改了标题/留言数之类：列不用动
+            self._items[row] = new
+            return
+        self._items[row] = new
+        self._lat[row] = new.lat
+        self._lng[row] = new.lng
+        self._ts[row] = _epoch(new.created_at)
+
+    def _append(self, incident_id: str) -> int:
+        row = self._n
+        if row == len(self._lat):
+            cap = max(1024, row * 2)
+            self._lat = np.resize(self._lat, cap)
+            self._lng = np.resize(self._lng, cap)
+            self._ts = np.resize(self._ts, cap)
+        self._rows[incident_id] = row
+        self._items.append(None)  # type: ignore[arg-type]  # 调用方马上填
+        self._n += 1
+        return row
+
+    def _remove(self, incident_id: str) -> None:
+        row = self._rows.pop(incident_id, None)
+        if row is None:
+            return
+        last = self._n - 1
+        self._titles.remove(row)
+        if row != last:
+            moved = self._items[last]
+            self._items[row] = moved
+            self._rows[moved.incident_id] = row
+            self._titles.remove(last)
+            self._titles.add(row, moved.title or "")
+            self._lat[row] = self._lat[last]
+            self._lng[row] = self._lng[last]
+            self._ts[row] = self._ts[last]
+        self._items.pop()
+        self._n = last
+
+    # ---------- reads ----------
+
+    def select(
+        self,
+        lat_min: Optional[float] = None,
+        lat_max: Optional[float] = None,
+        lng_min: Optional[float] = None,
+        lng_max: Optional[float] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        q: str = "",
+    ) -> "np.ndarray":
+        """
+        满足 bbox（闭区间）、时间范围、标题包含 q（忽略大小写）的行号。
+        没有 created_at 的点位在有时间筛选时不命中，和逐条过滤的 _in_time 一致。
+        """
+        n = self._n
+        if not q:
+            rows = None
+            lat, lng, ts = self._lat[:n], self._lng[:n], self._ts[:n]
+        else:
+            hits = self._titles.search(q)
+            rows = np.fromiter(hits, dtype=np.intp, count=len(hits))
+            lat, lng, ts = self._lat[rows], self._lng[rows], self._ts[rows]
+
+        mask = np.ones(len(lat), dtype=bool)
+        if lat_min is not None:
+            mask &= lat >= lat_min
+        if lat_max is not None:
+            mask &= lat <= lat_max
+        if lng_min is not None:
+            mask &= lng >= lng_min
+        if lng_max is not None:
+            mask &= lng <= lng_max
+        if start is not None or end is not None:
+            mask &= ts > _NO_TS
+            if start is not None:
+                mask &= ts >= start.timestamp()
+            if end is not None:
+                mask &= ts <= end.timestamp()
+        return np.flatnonzero(mask) if rows is None else rows[mask]
+
+    def newest_first(self, rows: "np.ndarray", limit: Optional[int] = None) -> "np.ndarray":
+        """rows 按 created_at 倒序；limit 给了只排前 limit 行（argpartition，不做全量排序）。"""
+        keys = -self._ts[rows]
+        if limit is not None and limit < len(rows):
+            if limit <= 0:
+                return rows[:0]
+            top = np.argpartition(keys, limit - 1)[:limit]
+            return rows[top[np.argsort(keys[top], kind="stable")]]
+        return rows[np.argsort(keys, kind="stable")]
+
+    def page_after(
+        self, rows: "np.ndarray", after: Optional[tuple[str, str]], limit: int
+    ) -> list[int]:
+        """
+        游标翻页：rows 里排在 after=(created_at, incident_id) 之后（不含）的前 limit + 1 行，
+        按 (created_at, incident_id) 倒序（和存储的时间索引同序，多出的一行用来判断还有没有下一页）。
+        时间戳比较是整列的；只有和 after 同一时刻、或卡在第 limit 名上并列的行才逐行比 id。
+        """
+        ts = self._ts[rows]
+        if after is not None:
+            created_at, aid = after
+            if len(created_at) == 7:  # "YYYY-MM"：只带桶的存储游标，从该月开头往前
+                created_at += "-01"
+            at = _epoch(created_at)
+            keep = ts < at
+            tie = np.flatnonzero(ts == at)
+            if len(tie):
+                keep[tie] = [self._items[r].incident_id < aid for r in rows[tie]]
+            rows, ts = rows[keep], ts[keep]
+        if len(rows) > limit + 1:
+            # 第 limit + 1 大的时间戳及以上都留下：并列的要按 id 排，不能让 argpartition 随手截断
+            cut = -np.partition(-ts, limit)[limit]
+            rows = rows[ts >= cut]
+        order = sorted(rows.tolist(), key=lambda r: (self._ts[r], self._items[r].incident_id), reverse=True)
+        return order[: limit + 1]
+
+    def items(self, rows: Iterable[int]) -> list[Incident]:
+        return [self._items[r] for r in rows]
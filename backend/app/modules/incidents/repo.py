@@ -1,43 +1,27 @@
-## 本地测试：
-# from __future__ import annotations
-
-# import asyncio
-# from typing import List
-
-# from app.shared.types import Incident
-
-
-# class IncidentsRepo:
-#     def __init__(self) -> None:
-#         self._lock = asyncio.Lock()
-#         # MVP：内存数据（后端重启会重置）
-#         self._items: List[Incident] = [
-#             Incident(incident_id="test-1", lat=31.2304, lng=121.4737, title="测试点位（上海）"),
-#             Incident(incident_id="test-2", lat=39.9042, lng=116.4074, title="测试点位（北京）"),
-#         ]
-
-#     async def list_incidents(self) -> List[Incident]:
-#         async with self._lock:
-#             # 返回副本，避免外部误改
-#             return list(self._items)
-
-#     async def create_incident(self, incident: Incident) -> Incident:
-#         async with self._lock:
-#             self._items.append(incident)
-#             return incident
-
 from __future__ import annotations
 
 import os
 import asyncio
+from datetime import datetime
 from decimal import Decimal
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Callable, Iterable, Optional
 
-import boto3
-from botocore.config import Config
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
 
+from app.shared.ddb import DynamoDB, get_dynamodb
+from app.shared.geo import BBox, cover_bbox, geohash_encode
+from app.shared.timeindex import query_time_index, stale_bucket_cond, time_bucket
 from app.shared.types import Incident
 
+# geohash 索引：
+# - geohash: 完整精度（GSI 排序键）
+# - gh_cell: 前 GEO_PARTITION_PRECISION 位（GSI 分区键，约 156km x 156km）
+GEOHASH_PRECISION = 9
+GEO_PARTITION_PRECISION = 3
+GEO_MAX_PRECISION = 6
+GEO_MAX_CELLS = 24
+
 
 def _to_dynamodb(value: Any) -> Any:
     if isinstance(value, float):
@@ -59,34 +43,52 @@ def _from_dynamodb(value: Any) -> Any:
     return value
 
 
+def _index_attrs(lat: float, lng: float, created_at: Optional[str]) -> dict[str, str]:
+    gh = geohash_encode(lat, lng, GEOHASH_PRECISION)
+    attrs = {"geohash": gh, "gh_cell": gh[:GEO_PARTITION_PRECISION]}
+    if created_at:
+        attrs["ts_bucket"] = time_bucket(created_at)
+    return attrs
+
+
+def _needs_index_attrs(item: dict[str, Any]) -> bool:
+    if "geohash" not in item:
+        return True
+    created_at = item.get("created_at")
+    return bool(created_at) and item.get("ts_bucket") != time_bucket(created_at)
+
+
 class IncidentsRepo:
     """
     DynamoDB best-practice repo
     PK: incident_id (String)
+    GSI (DDB_INCIDENTS_GEO_INDEX): gh_cell (PK) + geohash (SK), projection ALL
+    GSI (DDB_INCIDENTS_TIME_INDEX): ts_bucket (PK, "YYYY-MM") + created_at (SK), projection ALL
     """
 
-    def __init__(self) -> None:
-        region = os.getenv("AWS_REGION", "ap-northeast-2")
+    def __init__(self, ddb: Optional[DynamoDB] = None) -> None:
         table_name = os.getenv("DDB_INCIDENTS_TABLE", "FriendlyPetMapIncidents")
 
-        cfg = Config(region_name=region, retries={"max_attempts": 10, "mode": "standard"})
-        self._ddb = boto3.resource("dynamodb", config=cfg)
-        self._table = self._ddb.Table(table_name)
+        # 共享连接池：所有 repo 用同一个引擎
+        self._table = (ddb or get_dynamodb()).table(table_name)
+        self._geo_index = os.getenv("DDB_INCIDENTS_GEO_INDEX", "geohash-index")
+        self._time_index = os.getenv("DDB_INCIDENTS_TIME_INDEX", "created-index")
+
+    async def list_incidents(self, limit: Optional[int] = None) -> list[Incident]:
+        """Full scan. `limit=None` reads the whole table (parallel segments, order not defined)."""
+        if limit is None:
+            return [it async for page in self.iter_incidents() for it in page]
 
-    async def list_incidents(self, limit: int = 500) -> list[Incident]:
         items: list[Incident] = []
         last_key: Optional[dict[str, Any]] = None
 
         while len(items) < limit:
             page_limit = min(200, limit - len(items))
 
-            def _scan():
-                kwargs: dict[str, Any] = {"Limit": page_limit}
-                if last_key:
-                    kwargs["ExclusiveStartKey"] = last_key
-                return self._table.scan(**kwargs)
-
-            resp = await asyncio.to_thread(_scan)
+            kwargs: dict[str, Any] = {"Limit": page_limit}
+            if last_key:
+                kwargs["ExclusiveStartKey"] = last_key
+            resp = await self._table.scan(**kwargs)
             raw = resp.get("Items", [])
             for it in raw:
                 items.append(Incident(**_from_dynamodb(it)))
@@ -97,37 +99,234 @@ class IncidentsRepo:
 
         return items
 
-    async def create_incident(self, incident: Incident) -> Incident:
-        item = _to_dynamodb(incident.model_dump())
+    async def scan_incidents(
+        self,
+        limit: int = 500,
+        start_key: Optional[dict[str, Any]] = None,
+    ) -> tuple[list[Incident], Optional[dict[str, Any]]]:
+        """One scan page (for streaming export). Returns (items, last_evaluated_key)."""
+        kwargs: dict[str, Any] = {"Limit": limit}
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        resp = await self._table.scan(**kwargs)
+        return [Incident(**_from_dynamodb(it)) for it in resp.get("Items", [])], resp.get("LastEvaluatedKey")
 
-        def _put():
-            # 防止覆盖同 id
-            return self._table.put_item(
-                Item=item,
-                ConditionExpression="attribute_not_exists(incident_id)",
-            )
+    async def iter_incidents(self, page_size: int = 500) -> AsyncIterator[list[Incident]]:
+        """整表按页产出（并行分段 Scan，页之间无序）。"""
+        async for raw in self._table.parallel_scan(Limit=page_size):
+            yield [Incident(**_from_dynamodb(it)) for it in raw]
+
+    async def list_in_bbox(self, bbox: BBox) -> list[Incident]:
+        """
+        Viewport query via the geohash GSI: one Query per covering cell.
+        Falls back to a full scan when the bbox is too large to cover cheaply.
+        """
+        cells = cover_bbox(bbox, GEO_PARTITION_PRECISION, GEO_MAX_PRECISION, GEO_MAX_CELLS)
+        if cells is None:
+            return [it for it in await self.list_incidents() if bbox.contains(it.lat, it.lng)]
+
+        pages = await asyncio.gather(*(self._query_cell(c) for c in cells))
+        out: list[Incident] = []
+        for page in pages:
+            for it in page:
+                if bbox.contains(it.lat, it.lng):
+                    out.append(it)
+        return out
+
+    async def _query_cell(self, cell: str) -> list[Incident]:
+        cond = Key("gh_cell").eq(cell[:GEO_PARTITION_PRECISION])
+        if len(cell) > GEO_PARTITION_PRECISION:
+            cond = cond & Key("geohash").begins_with(cell)
+
+        items: list[Incident] = []
+        last_key: Optional[dict[str, Any]] = None
+        while True:
 
-        await asyncio.to_thread(_put)
+            kwargs: dict[str, Any] = {"IndexName": self._geo_index, "KeyConditionExpression": cond}
+            if last_key:
+                kwargs["ExclusiveStartKey"] = last_key
+            resp = await self._table.query(**kwargs)
+            items.extend(Incident(**_from_dynamodb(it)) for it in resp.get("Items", []))
+            last_key = resp.get("LastEvaluatedKey")
+            if not last_key:
+                return items
+
+    async def query_by_created(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 20,
+        start_key: Optional[dict[str, Any]] = None,
+        predicate: Optional[Callable[[Incident], bool]] = None,
+    ) -> tuple[list[Incident], Optional[dict[str, Any]]]:
+        """
+        created_at 倒序分页（时间索引，按月分桶从新到旧逐桶 Query）。
+        start/end 下推到 KeyCondition；predicate 是额外的内存过滤（bbox/关键词）。
+        返回 (items, next_key)；next_key 为最后一条的索引键（或只有 ts_bucket，表示从该桶开头继续），
+        None 表示没有更多。没有时间筛选时，没有 created_at 的旧数据排在最后。
+        """
+        return await query_time_index(
+            self._table,
+            self._time_index,
+            key_attrs=("incident_id",),
+            convert=lambda raw: Incident(**_from_dynamodb(raw)),
+            start=start,
+            end=end,
+            limit=limit,
+            start_key=start_key,
+            predicate=predicate,
+            include_untimed=True,
+        )
+
+    async def backfill_index_attrs(self) -> int:
+        """给旧数据补 geohash/gh_cell/ts_bucket，分错桶的重新分桶（幂等）。返回更新条数。"""
+        updated = 0
+        cond = (
+            Attr("geohash").not_exists()
+            | (Attr("created_at").exists() & Attr("ts_bucket").not_exists())
+            | stale_bucket_cond()
+        )
+        async for page in self._table.parallel_scan(FilterExpression=cond):
+            for raw in page:
+                if await self._set_index_attrs(_from_dynamodb(raw)):
+                    updated += 1
+        return updated
+
+    async def _set_index_attrs(self, item: dict[str, Any]) -> bool:
+        """补索引字段。没有坐标的残缺行（不是正常写入产生的）跳过，返回 False。"""
+        if item.get("lat") is None or item.get("lng") is None:
+            return False
+        attrs = _index_attrs(float(item["lat"]), float(item["lng"]), item.get("created_at"))
+
+        await self._table.update_item(
+            Key={"incident_id": item["incident_id"]},
+            UpdateExpression="SET " + ", ".join(f"{k} = :{k}" for k in attrs),
+            ExpressionAttributeValues={f":{k}": v for k, v in attrs.items()},
+        )
+        return True
+
+    async def get(self, incident_id: str) -> Optional[Incident]:
+        resp = await self._table.get_item(Key={"incident_id": incident_id})
+        item = resp.get("Item")
+        return Incident(**_from_dynamodb(item)) if item else None
+
+    async def create_incident(self, incident: Incident) -> Incident:
+        # None 不能写进 GSI 键（created_at），直接省略
+        item = _to_dynamodb(incident.model_dump(exclude_none=True))
+        item.update(_index_attrs(incident.lat, incident.lng, incident.created_at))
+
+        # 防止覆盖同 id
+        await self._table.put_item(
+            Item=item,
+            ConditionExpression="attribute_not_exists(incident_id)",
+        )
         return incident
 
+    async def create_incidents(self, incidents: list[Incident]) -> list[Incident]:
+        """
+        批量写入（BatchWriteItem，未处理的条目自动重试）。返回实际写入的点位。
+        batch 写不支持 attribute_not_exists，靠调用方生成不重复的 incident_id。
+        """
+        items = []
+        for incident in incidents:
+            item = _to_dynamodb(incident.model_dump(exclude_none=True))
+            item.update(_index_attrs(incident.lat, incident.lng, incident.created_at))
+            items.append(item)
+
+        failed = {it["incident_id"] for it in await self._table.batch_put(items)}
+        return [it for it in incidents if it.incident_id not in failed]
+
+    async def bulk_load(self, incidents: Iterable[Incident]) -> int:
+        """批量导入（压测造数据用）：BatchWriteItem，写不进去的直接报错。"""
+        incidents = list(incidents)
+        written = await self.create_incidents(incidents)
+        if len(written) != len(incidents):
+            raise RuntimeError(f"bulk_load: {len(incidents) - len(written)} incidents not written")
+        return len(written)
+
     async def update_title(self, incident_id: str, title: str) -> Incident:
-        def _update():
-            return self._table.update_item(
+        try:
+            # 不存在的 id 不能被 UpdateItem 顺手建出一条只有 title 的残缺行
+            resp = await self._table.update_item(
                 Key={"incident_id": incident_id},
                 UpdateExpression="SET #t = :t",
+                ConditionExpression="attribute_exists(incident_id)",
                 ExpressionAttributeNames={"#t": "title"},
                 ExpressionAttributeValues={":t": _to_dynamodb(title)},
                 ReturnValues="ALL_NEW",
             )
-
-        resp = await asyncio.to_thread(_update)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                raise KeyError("incident not found") from e
+            raise
         item = resp.get("Attributes")
         if not item:
             raise KeyError("incident not found")
-        return Incident(**_from_dynamodb(item))
+        item = _from_dynamodb(item)
 
-    async def delete(self, incident_id: str) -> None:
-        def _del():
-            return self._table.delete_item(Key={"incident_id": incident_id})
+        # 旧数据顺手补上索引字段，避免 bbox / 时间查询漏点
+        if _needs_index_attrs(item):
+            await self._set_index_attrs(item)
+        return Incident(**item)
+
+    async def add_comment_count(
+        self, incident_id: str, delta: int, last_comment_at: Optional[str] = None
+    ) -> Optional[Incident]:
+        """
+        留言数原子加减（ADD），可顺带写 last_comment_at。
+        点位不存在、或会减成负数时不写，返回 None（计数漂移由定时对账修正）。
+        """
+        expr = "ADD comment_count :d"
+        values: dict[str, Any] = {":d": delta}
+        cond = "attribute_exists(incident_id)"
+        if last_comment_at is not None:
+            expr = "SET last_comment_at = :t " + expr
+            values[":t"] = last_comment_at
+        if delta < 0:
+            cond += " AND comment_count >= :n"
+            values[":n"] = -delta
+        return await self._update_stats(incident_id, expr, cond, values)
+
+    async def set_comment_stats(
+        self,
+        incident_id: str,
+        count: int,
+        last_comment_at: Optional[str],
+        expected_count: Optional[int] = None,
+    ) -> Optional[Incident]:
+        """
+        直接写留言统计（对账用）。expected_count 给了就是乐观锁：
+        计数已经被并发写改过则放弃，返回 None。
+        """
+        values: dict[str, Any] = {":c": count}
+        if last_comment_at is None:
+            expr = "SET comment_count = :c REMOVE last_comment_at"
+        else:
+            expr = "SET comment_count = :c, last_comment_at = :t"
+            values[":t"] = last_comment_at
+        cond = "attribute_exists(incident_id)"
+        if expected_count is not None:
+            values[":e"] = expected_count
+            missing = " OR attribute_not_exists(comment_count)" if expected_count == 0 else ""
+            cond += f" AND (comment_count = :e{missing})"
+        return await self._update_stats(incident_id, expr, cond, values)
 
-        await asyncio.to_thread(_del)
\ No newline at end of file
+    async def _update_stats(
+        self, incident_id: str, expr: str, cond: str, values: dict[str, Any]
+    ) -> Optional[Incident]:
+        try:
+            resp = await self._table.update_item(
+                Key={"incident_id": incident_id},
+                UpdateExpression=expr,
+                ConditionExpression=cond,
+                ExpressionAttributeValues=values,
+                ReturnValues="ALL_NEW",
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return None
+            raise
+        return Incident(**_from_dynamodb(resp["Attributes"]))
+
+    async def delete(self, incident_id: str) -> None:
+        await self._table.delete_item(Key={"incident_id": incident_id})
\ No newline at end of file
@@ -20,26 +20,160 @@
 #     incident = await _svc.create_incident(lng=body.lng, lat=body.lat, title=body.title)
 #     return IncidentCreateOut(incident=incident)
 
-from fastapi import APIRouter, HTTPException
-
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
+from pydantic import ValidationError
+
+from app.container import incident_clusters, incident_tiles, incidents_service
+from app.shared.compression import negotiate
+from app.shared.config import settings
+from app.shared.geo import BBox
+from app.shared.http import bad_request, encode_json, etag_response, json_response, not_modified, strong_etag
+from app.shared.security import require_console_token
 from app.shared.text_safety import validate_text
-from app.shared.types import Incident, IncidentCreateIn, IncidentCreateOut
-from .repo import IncidentsRepo
+from app.shared.types import (
+    Incident,
+    IncidentBatchIn,
+    IncidentBatchItemOut,
+    IncidentBatchOut,
+    IncidentClusterListOut,
+    IncidentCreateIn,
+    IncidentCreateOut,
+)
+from .clusters import MAX_CLUSTER_ZOOM, ClusterIndex, parse_bbox_param
 from .service import IncidentsService
+from .tiles import MAX_TILE_ZOOM, TILE_LAYER, TILE_MEDIA_TYPES, TileCache, render_tile, tile_bbox
 
 router = APIRouter(prefix="", tags=["incidents"])
 
-_repo = IncidentsRepo()
-_svc = IncidentsService(_repo)
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _parse_bbox(
+    lat_min: float | None,
+    lat_max: float | None,
+    lng_min: float | None,
+    lng_max: float | None,
+) -> BBox | None:
+    given = [v is not None for v in (lat_min, lat_max, lng_min, lng_max)]
+    if not any(given):
+        return None
+    if not all(given):
+        bad_request("lat_min/lat_max/lng_min/lng_max must be given together")
+    if lat_min > lat_max or lng_min > lng_max:
+        bad_request("invalid bbox")
+    return BBox(lat_min, lat_max, lng_min, lng_max)
 
 
 @router.get("/incidents", response_model=list[Incident])
-async def list_incidents():
-    return await _svc.list_incidents()
+async def list_incidents(
+    request: Request,
+    lat_min: float | None = Query(None, ge=-90, le=90),
+    lat_max: float | None = Query(None, ge=-90, le=90),
+    lng_min: float | None = Query(None, ge=-180, le=180),
+    lng_max: float | None = Query(None, ge=-180, le=180),
+    svc: IncidentsService = Depends(incidents_service),
+):
+    bbox = _parse_bbox(lat_min, lat_max, lng_min, lng_max)
+    if bbox is None and svc.snapshot_ready:
+        # 全量列表：压缩版本按数据版本缓存，不必每个请求都压；304 时不用压
+        encoding = negotiate(request.headers.get("accept-encoding"))
+        body, etag = svc.snapshot.payload()
+        if encoding and not not_modified(request, etag):
+            body, etag = await svc.snapshot.payload_encoded(encoding)
+        return etag_response(request, body, etag, encoding=encoding)
+
+    body = encode_json(await svc.list_incidents(bbox))
+    return etag_response(request, body, strong_etag(body))
+
+
+@router.get("/incidents/clusters", response_model=IncidentClusterListOut)
+async def list_incident_clusters(
+    zoom: int = Query(..., ge=0, le=24),
+    bbox: str | None = Query(None, description="lng_min,lat_min,lng_max,lat_max"),
+    svc: IncidentsService = Depends(incidents_service),
+    clusters: ClusterIndex = Depends(incident_clusters),
+):
+    try:
+        boxes = parse_bbox_param(bbox) if bbox else [None]
+    except ValueError as e:
+        bad_request(str(e))
+
+    if svc.snapshot_ready:
+        index = clusters
+    else:
+        # 快照还没就绪（或被关闭）时临时聚合
+        index = ClusterIndex.build([it for box in boxes for it in await svc.list_incidents(box)])
+    items = [c for box in boxes for c in index.query(zoom, box)]
+    return json_response(IncidentClusterListOut(zoom=min(zoom, MAX_CLUSTER_ZOOM), items=items))
+
+
+def _data_version(svc: IncidentsService) -> str | None:
+    """瓦片内容的版本号（位置/标题/创建时间的哈希，留言不影响），用作瓦片 URL 的 v 参数。"""
+    if not svc.snapshot_ready:
+        return None
+    return svc.snapshot.geometry_tag().strip('"')
+
+
+@router.get("/incidents/tiles.json")
+async def incident_tilejson(
+    request: Request,
+    fmt: str = Query("mvt", pattern="^(mvt|geojson)$"),
+    svc: IncidentsService = Depends(incidents_service),
+):
+    """TileJSON 3.0：瓦片 URL 里带上当前数据版本，版本不变 URL 就不变，可以被 CDN/浏览器长期缓存。"""
+    v = _data_version(svc)
+    url = str(request.url_for("get_incident_tile", z="{z}", x="{x}", y="{y}", fmt=fmt))
+    url = url.replace("%7B", "{").replace("%7D", "}")
+    if v:
+        url += f"?v={v}"
+    return {
+        "tilejson": "3.0.0",
+        "tiles": [url],
+        "minzoom": 0,
+        "maxzoom": MAX_TILE_ZOOM,
+        "vector_layers": [
+            {
+                "id": TILE_LAYER,
+                "fields": {
+                    "incident_id": "String",
+                    "title": "String",
+                    "created_at": "String",
+                },
+            }
+        ],
+    }
+
+
+@router.get("/incidents/tiles/{z}/{x}/{y}.{fmt}", name="get_incident_tile")
+async def get_incident_tile(
+    request: Request,
+    z: int = Path(..., ge=0, le=MAX_TILE_ZOOM),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    fmt: str = Path(..., pattern="^(mvt|geojson)$"),
+    v: str | None = None,
+    svc: IncidentsService = Depends(incidents_service),
+    tiles: TileCache = Depends(incident_tiles),
+):
+    if x >= (1 << z) or y >= (1 << z):
+        bad_request("tile out of range")
+
+    key = (z, x, y, fmt)
+    entry = tiles.get(key) if svc.snapshot_ready else None
+    if entry is None:
+        body = render_tile(z, x, y, fmt, await svc.list_incidents(tile_bbox(z, x, y)))
+        entry = tiles.put(key, body) if svc.snapshot_ready else (body, strong_etag(body))
+
+    current = _data_version(svc)
+    cache_control = IMMUTABLE if v and v == current else f"public, max-age={settings.incidents_tile_max_age}"
+    resp = etag_response(request, entry[0], entry[1], cache_control=cache_control)
+    if resp.status_code == 200:
+        resp.headers["content-type"] = TILE_MEDIA_TYPES[fmt]
+    return resp
 
 
 @router.post("/incidents", response_model=IncidentCreateOut)
-async def create_incident(body: IncidentCreateIn):
+async def create_incident(body: IncidentCreateIn, svc: IncidentsService = Depends(incidents_service)):
     res = validate_text(
         body.title,
         min_len=1,
@@ -53,6 +187,42 @@ async def create_incident(body: IncidentCreateIn):
             detail={"code": res.reason, "message": "标题不符合规范"},
         )
 
-    incident = await _svc.create_incident(lng=body.lng, lat=body.lat, title=res.cleaned)
+    incident = await svc.create_incident(lng=body.lng, lat=body.lat, title=res.cleaned)
     return IncidentCreateOut(incident=incident)
 
+
+
+@router.post("/incidents/batch", dependencies=[Depends(require_console_token)], response_model=IncidentBatchOut)
+async def create_incidents_batch(body: IncidentBatchIn, svc: IncidentsService = Depends(incidents_service)):
+    """
+    批量导入点位（控制台用）。每条单独校验、单独报告结果，不合法的不影响其它条；
+    合法的一次性批量写入（BatchWriteItem，25 条一批并发写，未处理的条目退避重试）。
+    """
+    if len(body.items) > settings.incidents_batch_max:
+        bad_request(f"at most {settings.incidents_batch_max} items per batch")
+
+    results: list[IncidentBatchItemOut] = []
+    accepted: list[tuple[int, tuple[float, float, str]]] = []
+    for i, raw in enumerate(body.items):
+        try:
+            item = IncidentCreateIn.model_validate(raw)
+        except ValidationError as e:
+            results.append(IncidentBatchItemOut(index=i, ok=False, code="INVALID", message=str(e.errors()[0]["msg"])))
+            continue
+        res = validate_text(item.title, min_len=1, max_len=30, check_contact=True, check_threat=True)
+        if not res.ok:
+            results.append(IncidentBatchItemOut(index=i, ok=False, code=res.reason, message="标题不符合规范"))
+            continue
+        accepted.append((i, (item.lng, item.lat, res.cleaned)))
+        results.append(IncidentBatchItemOut(index=i, ok=True))
+
+    if accepted:
+        created = await svc.create_incidents([args for _, args in accepted])
+        for (i, _), incident in zip(accepted, created):
+            if incident is None:
+                results[i] = IncidentBatchItemOut(index=i, ok=False, code="WRITE_FAILED", message="写入失败，请重试")
+            else:
+                results[i].incident = incident
+
+    ok = sum(1 for r in results if r.ok)
+    return IncidentBatchOut(created=ok, failed=len(results) - ok, items=results)
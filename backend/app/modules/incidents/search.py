@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from app.shared.textsearch import NgramIndex
+from app.shared.types import Incident
+
+
+class TitleIndex:
+    """
+    点位标题的倒排索引（控制台 q= 搜索），随点位增删改增量更新。
+    作为 IncidentsSnapshot 的监听器挂载（apply）：本进程的写入和定时 refresh 都会同步过来，
+    所以和快照同时就绪、内容一致。
+    """
+
+    def __init__(self) -> None:
+        self._index = NgramIndex()
+
+    @classmethod
+    def build(cls, incidents: Iterable[Incident]) -> "TitleIndex":
+        idx = cls()
+        for it in incidents:
+            idx.apply(None, it)
+        return idx
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def apply(self, old: Optional[Incident], new: Optional[Incident]) -> None:
+        if new is None:
+            if old is not None:
+                self._index.remove(old.incident_id)
+            return
+        # 留言计数之类的变更不动索引
+        if old is None or old.title != new.title:
+            self._index.add(new.incident_id, new.title or "")
+
+    def search(self, q: str) -> list[str]:
+        """标题包含 q（忽略大小写）的 incident_id。"""
+        return self._index.search(q)
@@ -2,17 +2,105 @@ from __future__ import annotations
 
 from uuid import uuid4
 from datetime import datetime, timezone
+from typing import Optional
 
+from app.shared.geo import BBox
+from app.shared.singleflight import SingleFlight
 from app.shared.types import Incident
-from .repo import IncidentsRepo
+from app.storage.base import IncidentsRepository
+from .columns import IncidentColumns
+from .search import TitleIndex
+from .snapshot import IncidentsSnapshot
 
 
 class IncidentsService:
-    def __init__(self, repo: IncidentsRepo):
+    def __init__(
+        self,
+        repo: IncidentsRepository,
+        snapshot: Optional[IncidentsSnapshot] = None,
+        titles: Optional[TitleIndex] = None,
+        columns: Optional[IncidentColumns] = None,
+    ):
         self.repo = repo
+        self.snapshot = snapshot
+        # 标题倒排索引、列式副本都挂在快照上（快照的监听器），写入经快照 upsert/remove 同步过去；
+        # 有列式副本时标题搜索由它负责，titles 为 None
+        self.titles = titles
+        self.columns = columns
+        # 快照没就绪（启动时 / 关闭快照）时，同一时刻相同的读只打一次存储
+        self.flight: SingleFlight = SingleFlight()
 
-    async def list_incidents(self):
-        return await self.repo.list_incidents()
+    @property
+    def snapshot_ready(self) -> bool:
+        return self.snapshot is not None and self.snapshot.ready
+
+    async def list_incidents(self, bbox: Optional[BBox] = None) -> list[Incident]:
+        if self.snapshot_ready:
+            return self.snapshot.items(bbox)
+        if bbox is not None:
+            return await self.flight.do(("bbox", bbox), lambda: self.repo.list_in_bbox(bbox))
+        return await self.flight.do(("all",), self.repo.list_incidents)
+
+    async def get_incident(self, incident_id: str) -> Optional[Incident]:
+        if self.snapshot_ready:
+            return self.snapshot.get(incident_id)
+        return await self.flight.do(("get", incident_id), lambda: self.repo.get(incident_id))
+
+    def search_titles(self, q: str) -> Optional[list[Incident]]:
+        """标题包含 q 的全部点位（倒排索引 + 快照）；没就绪返回 None，调用方自己扫表。"""
+        if not self.snapshot_ready:
+            return None
+        if self.columns is not None:
+            return self.columns.items(self.columns.select(q=q))
+        if self.titles is None:
+            return None
+        items = (self.snapshot.get(i) for i in self.titles.search(q))
+        return [it for it in items if it is not None]
+
+    def filter_incidents(
+        self,
+        lat_min: Optional[float] = None,
+        lat_max: Optional[float] = None,
+        lng_min: Optional[float] = None,
+        lng_max: Optional[float] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        q: str = "",
+        offset: int = 0,
+        limit: int = 20,
+    ) -> Optional[tuple[int, list[Incident]]]:
+        """
+        控制台列表：bbox / 时间 / 标题关键词筛选，created_at 倒序分页，返回 (total, 当前页)。
+        走列式副本（向量化筛选 + argsort）；没装 numpy 或快照没就绪返回 None，调用方逐条过滤。
+        """
+        if self.columns is None or not self.snapshot_ready:
+            return None
+        rows = self.columns.select(lat_min, lat_max, lng_min, lng_max, start, end, q=q)
+        page = self.columns.newest_first(rows, offset + limit)[offset : offset + limit]
+        return len(rows), self.columns.items(page)
+
+    def page_incidents(
+        self,
+        lat_min: Optional[float] = None,
+        lat_max: Optional[float] = None,
+        lng_min: Optional[float] = None,
+        lng_max: Optional[float] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        q: str = "",
+        after: Optional[tuple[str, str]] = None,
+        limit: int = 20,
+    ) -> Optional[tuple[list[Incident], bool]]:
+        """
+        控制台游标分页：同 filter_incidents 的筛选，从 after=(created_at, incident_id) 之后取 limit 条，
+        返回 (当前页, 是否还有下一页)。after 里的 created_at 也可以是 "YYYY-MM"（只带桶的存储游标 = 该月之前）。
+        列式副本不可用时返回 None，调用方走存储的时间索引。
+        """
+        if self.columns is None or not self.snapshot_ready:
+            return None
+        rows = self.columns.select(lat_min, lat_max, lng_min, lng_max, start, end, q=q)
+        page = self.columns.page_after(rows, after, limit)
+        return self.columns.items(page[:limit]), len(page) > limit
 
     async def create_incident(self, lng: float, lat: float, title: str) -> Incident:
         now = datetime.now(timezone.utc).isoformat()
@@ -23,10 +111,52 @@ class IncidentsService:
             title=title,
             created_at=now,
         )
-        return await self.repo.create_incident(incident)
+        incident = await self.repo.create_incident(incident)
+        if self.snapshot is not None:
+            self.snapshot.upsert(incident)
+        return incident
+
+    async def create_incidents(self, items: list[tuple[float, float, str]]) -> list[Optional[Incident]]:
+        """批量创建：items 为 (lng, lat, title)。返回与输入一一对应，写入失败的位置为 None。"""
+        now = datetime.now(timezone.utc).isoformat()
+        incidents = [
+            Incident(incident_id=f"u-{uuid4().hex[:12]}", lng=lng, lat=lat, title=title, created_at=now)
+            for lng, lat, title in items
+        ]
+        created = {it.incident_id for it in await self.repo.create_incidents(incidents)}
+        if self.snapshot is not None:
+            for it in incidents:
+                if it.incident_id in created:
+                    self.snapshot.upsert(it)
+        return [it if it.incident_id in created else None for it in incidents]
 
     async def update_incident_title(self, incident_id: str, title: str) -> Incident:
-        return await self.repo.update_title(incident_id, title)
+        incident = await self.repo.update_title(incident_id, title)
+        if self.snapshot is not None:
+            self.snapshot.upsert(incident)
+        return incident
+
+    async def add_comment_count(
+        self, incident_id: str, delta: int, last_comment_at: Optional[str] = None
+    ) -> Optional[Incident]:
+        incident = await self.repo.add_comment_count(incident_id, delta, last_comment_at)
+        if incident is not None and self.snapshot is not None:
+            self.snapshot.upsert(incident)
+        return incident
+
+    async def set_comment_stats(
+        self,
+        incident_id: str,
+        count: int,
+        last_comment_at: Optional[str],
+        expected_count: Optional[int] = None,
+    ) -> Optional[Incident]:
+        incident = await self.repo.set_comment_stats(incident_id, count, last_comment_at, expected_count)
+        if incident is not None and self.snapshot is not None:
+            self.snapshot.upsert(incident)
+        return incident
 
     async def delete_incident(self, incident_id: str) -> None:
-        await self.repo.delete(incident_id)
\ No newline at end of file
+        await self.repo.delete(incident_id)
+        if self.snapshot is not None:
+            self.snapshot.remove(incident_id)
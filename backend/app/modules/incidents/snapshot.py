@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from app.shared.compression import Precompressed
+from app.shared.geo import BBox
+from app.shared.http import encode_json, strong_etag
+from app.shared.types import Incident
+from app.storage.base import IncidentsRepository
+
+log = logging.getLogger(__name__)
+
+# (old, new)：新增时 old=None，删除时 new=None
+ChangeListener = Callable[[Optional[Incident], Optional[Incident]], None]
+
+
+def geometry_key(it: Incident) -> tuple:
+    """影响瓦片 / 聚合的字段（位置、标题、创建时间）；留言数之类的统计不在内。"""
+    return (it.lat, it.lng, it.title, it.created_at)
+
+
+def _geometry_changed(old: Optional[Incident], new: Optional[Incident]) -> bool:
+    return old is None or new is None or geometry_key(old) != geometry_key(new)
+
+
+class IncidentsSnapshot:
+    """
+    进程内的全量点位快照（带版本号）。
+    - 本进程的写操作通过 upsert/remove 就地更新
+    - 后台定时 refresh 用来同步其它副本写入的数据
+    - payload() 按版本缓存编码好的 JSON + ETag；payload_encoded() 给出同一版本的 gzip/br 版本（每版本只压一次）
+    - geometry_version 只在位置/标题/创建时间变化时增加（留言不算），geometry_tag() 给瓦片 URL 用
+    - subscribe() 注册的监听器会收到每一条变更，用于维护派生索引（聚合等）
+    """
+
+    def __init__(self, repo: IncidentsRepository, refresh_seconds: float = 30.0) -> None:
+        self.repo = repo
+        self.refresh_seconds = refresh_seconds
+        self.version = 0
+        self.geometry_version = 0
+        self.ready = False
+
+        self._items: dict[str, Incident] = {}
+        # refresh 期间本进程的写入；scan 结果回来后要覆盖上去，避免被旧数据冲掉
+        self._writes: dict[str, Optional[Incident]] = {}
+        self._payload: Optional[tuple[int, Precompressed, str]] = None
+        self._geometry_tag: Optional[tuple[int, str]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: list[ChangeListener] = []
+
+    # ---------- reads ----------
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, incident_id: str) -> Optional[Incident]:
+        return self._items.get(incident_id)
+
+    def items(self, bbox: Optional[BBox] = None) -> list[Incident]:
+        if bbox is None:
+            return list(self._items.values())
+        return [it for it in self._items.values() if bbox.contains(it.lat, it.lng)]
+
+    def _cached_payload(self) -> tuple[int, Precompressed, str]:
+        cached = self._payload
+        if cached is None or cached[0] != self.version:
+            body = encode_json(self.items())
+            # 每条留言都会换版本：用按请求压缩的级别，不值得为一个很快过期的版本压到最高
+            cached = (self.version, Precompressed(body, static=False), strong_etag(body))
+            self._payload = cached
+        return cached
+
+    def geometry_tag(self) -> str:
+        """
+        位置/标题/创建时间的内容哈希（strong ETag 形式），按 geometry_version 缓存。
+        按 incident_id 排序后再算：各副本插入顺序不同，同样的数据也得到同一个值。
+        """
+        cached = self._geometry_tag
+        if cached is None or cached[0] != self.geometry_version:
+            rows = sorted((it.incident_id, *geometry_key(it)) for it in self._items.values())
+            cached = (self.geometry_version, strong_etag(encode_json(rows)))
+            self._geometry_tag = cached
+        return cached[1]
+
+    def payload(self) -> tuple[bytes, str]:
+        """(JSON body, strong ETag) of the full list, encoded once per version."""
+        _, pre, etag = self._cached_payload()
+        return pre.body, etag
+
+    async def payload_encoded(self, encoding: Optional[str]) -> tuple[bytes, str]:
+        """Same as payload(), body compressed with `encoding` (None = identity); the ETag is the uncompressed one."""
+        _, pre, etag = self._cached_payload()
+        return await pre.get(encoding), etag
+
+    # ---------- writes ----------
+
+    def subscribe(self, listener: ChangeListener) -> None:
+        self._listeners.append(listener)
+        for it in self._items.values():
+            listener(None, it)
+
+    def _emit(self, old: Optional[Incident], new: Optional[Incident]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(old, new)
+            except Exception:
+                log.exception("incidents snapshot listener failed")
+
+    def upsert(self, incident: Incident) -> None:
+        self._writes[incident.incident_id] = incident
+        old = self._items.get(incident.incident_id)
+        if old != incident:
+            self._items[incident.incident_id] = incident
+            self.version += 1
+            if _geometry_changed(old, incident):
+                self.geometry_version += 1
+            self._emit(old, incident)
+
+    def remove(self, incident_id: str) -> None:
+        self._writes[incident_id] = None
+        old = self._items.pop(incident_id, None)
+        if old is not None:
+            self.version += 1
+            self.geometry_version += 1
+            self._emit(old, None)
+
+    # ---------- refresh ----------
+
+    async def refresh(self) -> None:
+        self._writes = {}
+        fresh = {it.incident_id: it for it in await self.repo.list_incidents()}
+        for incident_id, it in self._writes.items():
+            if it is None:
+                fresh.pop(incident_id, None)
+            else:
+                fresh[incident_id] = it
+
+        if fresh != self._items:
+            old_items = self._items
+            self._items = fresh
+            self.version += 1
+            geometry = False
+            for incident_id, old in old_items.items():
+                if incident_id not in fresh:
+                    geometry = True
+                    self._emit(old, None)
+            for incident_id, it in fresh.items():
+                old = old_items.get(incident_id)
+                if old != it:
+                    geometry = geometry or _geometry_changed(old, it)
+                    self._emit(old, it)
+            if geometry:
+                self.geometry_version += 1
+        self.ready = True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                log.exception("incidents snapshot refresh failed")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self) -> None:
+        if self.refresh_seconds <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
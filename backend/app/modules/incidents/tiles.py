@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from app.shared.geo import BBox, mercator_lat, mercator_xy
+from app.shared.http import encode_json, strong_etag
+from app.shared.lru import LRUCache
+from app.shared.mvt import MVT_EXTENT, encode_point_layer
+from app.shared.types import Incident
+from .snapshot import geometry_key
+
+MAX_TILE_ZOOM = 22
+TILE_LAYER = "incidents"
+
+TILE_MEDIA_TYPES = {
+    "mvt": "application/vnd.mapbox-vector-tile",
+    "geojson": "application/geo+json",
+}
+
+TileKey = tuple[int, int, int, str]
+
+
+def tile_bbox(z: int, x: int, y: int) -> BBox:
+    n = 1 << z
+    return BBox(
+        lat_min=mercator_lat((y + 1) / n),
+        lat_max=mercator_lat(y / n),
+        lng_min=x / n * 360.0 - 180.0,
+        lng_max=(x + 1) / n * 360.0 - 180.0,
+    )
+
+
+def tile_of(lat: float, lng: float, z: int) -> tuple[int, int]:
+    mx, my = mercator_xy(lat, lng)
+    n = 1 << z
+    return int(mx * n), int(my * n)
+
+
+def _props(it: Incident) -> dict:
+    # 只放 geometry_key 里的字段：瓦片按 geometry_version 长期缓存，留言数等统计走 GET /incidents
+    return {
+        "incident_id": it.incident_id,
+        "title": it.title,
+        "created_at": it.created_at,
+    }
+
+
+def render_tile(z: int, x: int, y: int, fmt: str, incidents: Iterable[Incident]) -> bytes:
+    """只渲染真正落在 (z, x, y) 里的点（bbox 查询会带上边界外一点的数据）。"""
+    n = 1 << z
+    inside: list[tuple[Incident, float, float]] = []
+    for it in incidents:
+        mx, my = mercator_xy(it.lat, it.lng)
+        tx, ty = mx * n - x, my * n - y
+        if 0 <= tx < 1 and 0 <= ty < 1:
+            inside.append((it, tx, ty))
+
+    if fmt == "mvt":
+        return encode_point_layer(
+            TILE_LAYER,
+            ((int(tx * MVT_EXTENT), int(ty * MVT_EXTENT), _props(it)) for it, tx, ty in inside),
+        )
+
+    return encode_json(
+        {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": [it.lng, it.lat]},
+                    "properties": _props(it),
+                }
+                for it, _, _ in inside
+            ],
+        }
+    )
+
+
+class TileCache:
+    """
+    渲染好的瓦片（body, ETag）的 LRU 缓存。
+    作为 IncidentsSnapshot 的监听器：某个点位变化时只失效包含它的那些瓦片。
+    """
+
+    def __init__(self, maxsize: int = 2048) -> None:
+        self._lru: LRUCache[TileKey, tuple[bytes, str]] = LRUCache(maxsize)
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def get(self, key: TileKey) -> Optional[tuple[bytes, str]]:
+        return self._lru.get(key)
+
+    def put(self, key: TileKey, body: bytes) -> tuple[bytes, str]:
+        entry = (body, strong_etag(body))
+        self._lru.set(key, entry)
+        return entry
+
+    def apply(self, old: Optional[Incident], new: Optional[Incident]) -> None:
+        if old is not None and new is not None and geometry_key(old) == geometry_key(new):
+            return  # 只改了留言统计：瓦片里没有这些字段
+        for it in (old, new):
+            if it is None:
+                continue
+            for z in range(MAX_TILE_ZOOM + 1):
+                x, y = tile_of(it.lat, it.lng, z)
+                for fmt in TILE_MEDIA_TYPES:
+                    self._lru.pop((z, x, y, fmt))
@@ -0,0 +1,244 @@
+"""
+响应压缩（gzip / brotli，按 Accept-Encoding 协商）。
+
+- CompressionMiddleware：兜底压缩够大的文本类响应（JSON / GeoJSON / MVT 等），流式响应边产出边压
+- Precompressed：可缓存的大 body（点位快照）每个数据版本只压一次，之后直接复用
+- 大 body（>= THREAD_MIN_BYTES）的压缩放到线程里做，不占事件循环（zlib / brotli 压缩时都释放 GIL）
+- brotli 在 requirements.txt 里；没装时只协商 gzip
+"""
+from __future__ import annotations
+
+import asyncio
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.shared.singleflight import SingleFlight
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# 超过这个大小的 body 在线程里压缩（几十 KB 以下压缩本身比线程切换还快）
+THREAD_MIN_BYTES = 64 * 1024
+
+# 按请求压缩：速度优先；预压缩（每版本一次）：压缩率优先，但不至于阻塞太久
+GZIP_LEVEL = 6
+BR_QUALITY = 4
+STATIC_GZIP_LEVEL = 9
+STATIC_BR_QUALITY = 9
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/geo+json",
+    "application/x-ndjson",
+    "application/vnd.mapbox-vector-tile",
+    "text/",
+)
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Accept-Encoding -> 我们支持的最优编码（br 优先），不接受压缩时返回 None。"""
+    if not accept_encoding:
+        return None
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    star = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for enc in ENCODINGS:
+        q = accepted.get(enc, star)
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def compress(body: bytes, encoding: str, static: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=STATIC_BR_QUALITY if static else BR_QUALITY)
+    if encoding == "gzip":
+        c = zlib.compressobj(STATIC_GZIP_LEVEL if static else GZIP_LEVEL, zlib.DEFLATED, 31)
+        return c.compress(body) + c.flush()
+    raise ValueError(f"unsupported encoding: {encoding}")
+
+
+async def compress_async(body: bytes, encoding: str, static: bool = False) -> bytes:
+    """compress()，大 body 放到线程里。"""
+    if len(body) < THREAD_MIN_BYTES:
+        return compress(body, encoding, static)
+    return await asyncio.to_thread(compress, body, encoding, static)
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """同一资源不同编码是不同的表示，强 ETag 要区分开："abc" -> "abc-gzip"。"""
+    if not encoding or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def strip_encoding_suffix(etag: str) -> str:
+    for enc in ("br", "gzip"):
+        suffix = f'-{enc}"'
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)] + '"'
+    return etag
+
+
+class Precompressed:
+    """
+    一份不变的 body 及其压缩版本：第一次用到某个编码时在线程里压缩，并发请求共享这一次。
+    static=False 用按请求压缩的级别（版本更替很快、压到最高不划算的 body）。
+    """
+
+    def __init__(self, body: bytes, static: bool = True) -> None:
+        self.body = body
+        self.static = static
+        self._variants: dict[str, bytes] = {}
+        self._flight: SingleFlight[str, bytes] = SingleFlight()
+
+    async def get(self, encoding: Optional[str]) -> bytes:
+        if not encoding:
+            return self.body
+        out = self._variants.get(encoding)
+        if out is None:
+            out = await self._flight.do(encoding, lambda: compress_async(self.body, encoding, self.static))
+            self._variants[encoding] = out
+        return out
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str) -> None:
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=BR_QUALITY)
+            self._flush = self._c.flush
+            self._finish = self._c.finish
+            self._compress = self._c.process
+        else:
+            self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._flush = lambda: self._c.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._c.flush
+            self._compress = self._c.compress
+
+    def chunk(self, data: bytes) -> bytes:
+        # 每块都 flush：NDJSON 之类的流式响应要能边收边解析
+        return self._compress(data) + self._flush()
+
+    async def chunk_async(self, data: bytes) -> bytes:
+        # 同一个压缩器的块按顺序 await，不会并发使用
+        if len(data) < THREAD_MIN_BYTES:
+            return self.chunk(data)
+        return await asyncio.to_thread(self.chunk, data)
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+def _vary(headers: MutableHeaders) -> None:
+    if "accept-encoding" not in headers.get("vary", "").lower():
+        headers.add_vary_header("Accept-Encoding")
+
+
+class CompressionMiddleware:
+    """
+    纯 ASGI 中间件：文本类响应 >= min_size 时按协商结果压缩。
+    已经带 Content-Encoding 的响应（路由自己给了预压缩版本）原样透传。
+    """
+
+    def __init__(self, app: ASGIApp, min_size: int = 1024) -> None:
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        await _CompressingResponder(self.app, encoding, self.min_size)(scope, receive, send)
+
+
+class _CompressingResponder:
+    def __init__(self, app: ASGIApp, encoding: Optional[str], min_size: int) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.min_size = min_size
+        self.send: Send
+        self.start: Optional[Message] = None
+        self.compressor: Optional[_StreamCompressor] = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self._send)
+
+    def _compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        ctype = headers.get("content-type", "")
+        return ctype.startswith(COMPRESSIBLE_TYPES)
+
+    async def _send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            if not self._compressible(Headers(raw=message["headers"])):
+                self.passthrough = True
+                await self.send(message)
+            elif self.encoding is None:
+                # 客户端不要压缩：原样返回，但告诉缓存这个响应随 Accept-Encoding 变化
+                self.passthrough = True
+                _vary(MutableHeaders(raw=message["headers"]))
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        headers = MutableHeaders(raw=self.start["headers"])
+
+        if self.compressor is None:
+            if not more:
+                # 一次性响应：太小就不压
+                if len(body) < self.min_size:
+                    _vary(headers)
+                    await self.send(self.start)
+                    await self.send(message)
+                    return
+                body = await compress_async(body, self.encoding)
+                self._set_headers(headers)
+                headers["Content-Length"] = str(len(body))
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            # 流式响应：不知道总长度，直接走流式压缩
+            self.compressor = _StreamCompressor(self.encoding)
+            self._set_headers(headers)
+            if "content-length" in headers:
+                del headers["content-length"]
+            await self.send(self.start)
+
+        out = await self.compressor.chunk_async(body) if body else b""
+        if not more:
+            out += self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": out, "more_body": more})
+
+    def _set_headers(self, headers: MutableHeaders) -> None:
+        headers["Content-Encoding"] = self.encoding
+        _vary(headers)
+        etag = headers.get("etag")
+        if etag:
+            headers["ETag"] = encoded_etag(etag, self.encoding)
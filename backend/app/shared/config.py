@@ -7,9 +7,18 @@ class Settings(BaseSettings):
 
     app_jwt_secret: str = Field(alias="APP_JWT_SECRET")
     app_jwt_expire_days: int = Field(default=7, alias="APP_JWT_EXPIRE_DAYS")
+    # 已验签 token 的进程内缓存：条数上限；单条最长缓存秒数（同时不超过 token 的 exp）
+    app_jwt_cache_size: int = Field(default=10000, alias="APP_JWT_CACHE_SIZE")
+    app_jwt_cache_ttl_seconds: float = Field(default=300, alias="APP_JWT_CACHE_TTL_SECONDS")
 
     douyin_client_key: str = Field(default="", alias="DOUYIN_CLIENT_KEY")
     douyin_client_secret: str = Field(default="", alias="DOUYIN_CLIENT_SECRET")
+    # 本地联调可指向 mock OAuth 服务
+    douyin_base_url: str = Field(default="https://open.douyin.com", alias="DOUYIN_BASE_URL")
+    douyin_connect_timeout: float = Field(default=3.0, alias="DOUYIN_CONNECT_TIMEOUT")
+    douyin_read_timeout: float = Field(default=10.0, alias="DOUYIN_READ_TIMEOUT")
+    douyin_max_connections: int = Field(default=100, alias="DOUYIN_MAX_CONNECTIONS")
+    douyin_userinfo_ttl_seconds: float = Field(default=300, alias="DOUYIN_USERINFO_TTL_SECONDS")
 
     aws_region: str = Field(default="ap-northeast-1", alias="AWS_REGION")
     ddb_incidents_table: str = Field(default="", alias="DDB_INCIDENTS_TABLE")
@@ -17,5 +26,46 @@ class Settings(BaseSettings):
 
     cors_origins: str = Field(default="*", alias="CORS_ORIGINS")
 
+    # 响应压缩（gzip/br）的最小 body 字节数；<=0 关闭压缩中间件
+    compress_min_bytes: int = Field(default=1024, alias="COMPRESS_MIN_BYTES")
+
+    # 存储后端：dynamodb | memory | sqlite（memory/sqlite 用于本地开发、CI、压测，不需要 AWS）
+    storage_backend: str = Field(default="dynamodb", alias="STORAGE_BACKEND")
+    sqlite_path: str = Field(default="friendlypetmap.db", alias="SQLITE_PATH")
+
+    # DynamoDB 访问层：auto（默认）=原生 async（aiobotocore，见 requirements.txt），没装时退回线程池；off=boto3 + 线程池
+    ddb_async: str = Field(default="auto", alias="DDB_ASYNC")
+    ddb_endpoint_url: str = Field(default="", alias="DDB_ENDPOINT_URL")  # 本地 DynamoDB Local 等
+    ddb_max_pool_connections: int = Field(default=50, alias="DDB_MAX_POOL_CONNECTIONS")
+    ddb_max_concurrency: int = Field(default=64, alias="DDB_MAX_CONCURRENCY")
+    # 全表扫描（快照刷新/导出/对账/回填）：并行 Scan 的分段数（TotalSegments）和同时在途的分段数上限
+    ddb_scan_segments: int = Field(default=8, alias="DDB_SCAN_SEGMENTS")
+    ddb_scan_concurrency: int = Field(default=4, alias="DDB_SCAN_CONCURRENCY")
+
+    # 文本审核单次耗时预算（毫秒），超出记 warning + 计数，判定结果不变
+    moderation_budget_ms: float = Field(default=10.0, alias="MODERATION_BUDGET_MS")
+
+    # POST /incidents/batch 单次最多条数
+    incidents_batch_max: int = Field(default=500, alias="INCIDENTS_BATCH_MAX")
+
+    # GET /comments?incident_ids=：单次最多几个点位、同时在途的查询数
+    comments_multi_max_ids: int = Field(default=50, alias="COMMENTS_MULTI_MAX_IDS")
+    comments_multi_concurrency: int = Field(default=8, alias="COMMENTS_MULTI_CONCURRENCY")
+
+    # 点位留言数 / 最后留言时间的定时对账间隔（秒）；<=0 关闭
+    comment_stats_reconcile_seconds: float = Field(default=3600, alias="COMMENT_STATS_RECONCILE_SECONDS")
+    # 控制台留言搜索的倒排索引：启动时全量建一次，之后按这个间隔（秒）从时间索引追其它副本新写的留言；
+    # <=0 关闭（退回时间索引逐条过滤）
+    comments_search_refresh_seconds: float = Field(default=60, alias="COMMENTS_SEARCH_REFRESH_SECONDS")
+    # 倒排索引最多收录的留言条数，超过就停用索引、释放内存（约 1KB/条，短留言更少）
+    comments_search_max_docs: int = Field(default=200_000, alias="COMMENTS_SEARCH_MAX_DOCS")
+
+    # 点位快照后台刷新间隔（秒）；<=0 关闭快照，每次直接读 DynamoDB
+    incidents_snapshot_refresh_seconds: float = Field(default=30, alias="INCIDENTS_SNAPSHOT_REFRESH_SECONDS")
+
+    # 点位瓦片：进程内 LRU 条数；未带当前数据版本 v 的瓦片 URL 的 max-age（秒）
+    incidents_tile_cache_size: int = Field(default=2048, alias="INCIDENTS_TILE_CACHE_SIZE")
+    incidents_tile_max_age: int = Field(default=60, alias="INCIDENTS_TILE_MAX_AGE")
+
 
 settings = Settings()
@@ -0,0 +1,40 @@
+"""Opaque, HMAC-signed pagination cursors (wrap DynamoDB LastEvaluatedKey etc.)."""
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+from typing import Any
+
+from app.shared.config import settings
+
+
+def _sign(payload: bytes) -> str:
+    mac = hmac.new(settings.app_jwt_secret.encode("utf-8"), payload, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(mac[:16]).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(s: str) -> bytes:
+    return base64.urlsafe_b64decode(s + "=" * (-len(s) % 4))
+
+
+def encode_cursor(data: dict[str, Any]) -> str:
+    payload = json.dumps(data, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    body = base64.urlsafe_b64encode(payload).rstrip(b"=").decode("ascii")
+    return f"{body}.{_sign(payload)}"
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    """Raises ValueError on malformed or tampered cursors."""
+    try:
+        body, sig = cursor.split(".", 1)
+        payload = _b64decode(body)
+    except Exception:
+        raise ValueError("malformed cursor")
+    if not hmac.compare_digest(sig, _sign(payload)):
+        raise ValueError("invalid cursor")
+    data = json.loads(payload)
+    if not isinstance(data, dict):
+        raise ValueError("malformed cursor")
+    return data
@@ -0,0 +1,398 @@
+"""
+DynamoDB 访问层：所有 repo 共用一个连接池 + 并发上限。
+
+- 默认（DDB_ASYNC=auto/on）走 aiobotocore 原生 async 客户端，不再每次调用都跳一次线程；
+  aiobotocore 在 requirements.txt 里和 boto3/botocore 锁在匹配的版本上；
+- DDB_ASYNC=off（或环境里没装 aiobotocore）时退回 boto3 resource + 专用线程池
+  （行为与原先的 asyncio.to_thread 一致）。
+
+两条路径对 repo 暴露同样的接口（resource 风格：Python 原生值 + boto3 conditions），
+repo 里只需要 `await table.query(...)`。
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Optional
+
+import boto3
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.config import Config
+
+from app.shared.config import settings
+
+try:  # requirements.txt 里锁了版本；没装时（只装了 boto3 的环境）退回线程池
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session as _aio_session
+except ImportError:  # pragma: no cover - depends on the environment
+    AioConfig = None
+    _aio_session = None
+
+log = logging.getLogger(__name__)
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+# 请求里需要从 Python 值序列化成 AttributeValue 的 map 参数
+_ITEM_PARAMS = ("Item", "Key", "ExclusiveStartKey")
+
+# BatchWriteItem：每次最多 25 条；UnprocessedItems 的重试次数 / 退避起点
+BATCH_WRITE_MAX = 25
+BATCH_WRITE_ATTEMPTS = 6
+BATCH_RETRY_BASE_SECONDS = 0.05
+# 可以是 boto3 condition 对象的表达式参数
+_CONDITION_PARAMS = {
+    "KeyConditionExpression": True,  # is_key_condition
+    "FilterExpression": False,
+    "ConditionExpression": False,
+}
+
+
+def _ser_map(m: dict[str, Any]) -> dict[str, Any]:
+    return {k: _serializer.serialize(v) for k, v in m.items()}
+
+
+def _de_map(m: dict[str, Any]) -> dict[str, Any]:
+    return {k: _deserializer.deserialize(v) for k, v in m.items()}
+
+
+def serialize_request(table_name: str, kwargs: dict[str, Any]) -> dict[str, Any]:
+    """resource 风格参数 → 低层 client 参数。"""
+    out = dict(kwargs)
+    out["TableName"] = table_name
+
+    builder = ConditionExpressionBuilder()
+    names: dict[str, str] = dict(out.pop("ExpressionAttributeNames", None) or {})
+    values: dict[str, Any] = dict(out.pop("ExpressionAttributeValues", None) or {})
+
+    for param, is_key in _CONDITION_PARAMS.items():
+        cond = out.get(param)
+        if isinstance(cond, ConditionBase):
+            built = builder.build_expression(cond, is_key_condition=is_key)
+            out[param] = built.condition_expression
+            names.update(built.attribute_name_placeholders)
+            values.update(built.attribute_value_placeholders)
+
+    for param in _ITEM_PARAMS:
+        if out.get(param) is not None:
+            out[param] = _ser_map(out[param])
+
+    if names:
+        out["ExpressionAttributeNames"] = names
+    if values:
+        out["ExpressionAttributeValues"] = _ser_map(values)
+    return out
+
+
+def serialize_request_items(request_items: dict[str, list[dict[str, Any]]]) -> dict[str, Any]:
+    """BatchWriteItem 的 RequestItems（resource 风格）→ 低层格式。"""
+    out: dict[str, Any] = {}
+    for table_name, requests in request_items.items():
+        reqs = []
+        for r in requests:
+            if "PutRequest" in r:
+                reqs.append({"PutRequest": {"Item": _ser_map(r["PutRequest"]["Item"])}})
+            else:
+                reqs.append({"DeleteRequest": {"Key": _ser_map(r["DeleteRequest"]["Key"])}})
+        out[table_name] = reqs
+    return out
+
+
+def deserialize_request_items(request_items: dict[str, Any]) -> dict[str, list[dict[str, Any]]]:
+    out: dict[str, list[dict[str, Any]]] = {}
+    for table_name, requests in request_items.items():
+        reqs = []
+        for r in requests:
+            if "PutRequest" in r:
+                reqs.append({"PutRequest": {"Item": _de_map(r["PutRequest"]["Item"])}})
+            else:
+                reqs.append({"DeleteRequest": {"Key": _de_map(r["DeleteRequest"]["Key"])}})
+        out[table_name] = reqs
+    return out
+
+
+def deserialize_response(resp: dict[str, Any]) -> dict[str, Any]:
+    out = dict(resp)
+    if "Items" in out:
+        out["Items"] = [_de_map(it) for it in out["Items"]]
+    for param in ("Item", "Attributes", "LastEvaluatedKey"):
+        if out.get(param) is not None:
+            out[param] = _de_map(out[param])
+    return out
+
+
+class DynamoTable:
+    """One table on a shared DynamoDB engine. All methods are coroutines."""
+
+    def __init__(self, engine: "DynamoDB", name: str) -> None:
+        self._engine = engine
+        self.name = name
+
+    async def get_item(self, **kwargs: Any) -> dict[str, Any]:
+        return await self._engine.call(self.name, "get_item", kwargs)
+
+    async def put_item(self, **kwargs: Any) -> dict[str, Any]:
+        return await self._engine.call(self.name, "put_item", kwargs)
+
+    async def update_item(self, **kwargs: Any) -> dict[str, Any]:
+        return await self._engine.call(self.name, "update_item", kwargs)
+
+    async def delete_item(self, **kwargs: Any) -> dict[str, Any]:
+        return await self._engine.call(self.name, "delete_item", kwargs)
+
+    async def query(self, **kwargs: Any) -> dict[str, Any]:
+        return await self._engine.call(self.name, "query", kwargs)
+
+    async def scan(self, **kwargs: Any) -> dict[str, Any]:
+        return await self._engine.call(self.name, "scan", kwargs)
+
+    async def parallel_scan(
+        self,
+        segments: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """
+        并行全表扫描（Segment/TotalSegments）：每段一个 worker 自己翻页，最多 concurrency 段同时在途，
+        各段的页合并成一条异步流按到达顺序产出（不保证顺序）。kwargs 原样带给 Scan（FilterExpression 等）。
+        中途停止迭代会取消还在跑的分段；任一分段出错，异常从迭代处抛出。
+        """
+        segments = self._engine.scan_segments if segments is None else segments
+        concurrency = self._engine.scan_concurrency if concurrency is None else concurrency
+        if segments <= 1:
+            async for page in self._scan_segment(kwargs, None):
+                yield page
+            return
+
+        sem = asyncio.Semaphore(max(1, concurrency))
+        # 有界队列：消费方慢时分段 worker 自然停下，不会把整表堆进内存
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, concurrency) * 2)
+        done = object()
+
+        async def worker(segment: int) -> None:
+            async with sem:
+                async for page in self._scan_segment(kwargs, (segment, segments)):
+                    await queue.put(page)
+
+        async def supervise() -> None:
+            try:
+                await asyncio.gather(*workers)
+            except asyncio.CancelledError:
+                for w in workers:
+                    w.cancel()
+                raise
+            except Exception as e:
+                for w in workers:
+                    w.cancel()
+                await queue.put(e)
+                return
+            await queue.put(done)
+
+        workers = [asyncio.ensure_future(worker(i)) for i in range(segments)]
+        supervisor = asyncio.ensure_future(supervise())
+        try:
+            while True:
+                page = await queue.get()
+                if page is done:
+                    return
+                if isinstance(page, BaseException):
+                    raise page
+                yield page
+        finally:
+            for t in (supervisor, *workers):
+                t.cancel()
+            await asyncio.gather(supervisor, *workers, return_exceptions=True)
+
+    async def _scan_segment(
+        self, kwargs: dict[str, Any], segment: Optional[tuple[int, int]]
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        req = dict(kwargs)
+        if segment is not None:
+            req["Segment"], req["TotalSegments"] = segment
+        while True:
+            resp = await self.scan(**req)
+            items = resp.get("Items", [])
+            if items:
+                yield items
+            last_key = resp.get("LastEvaluatedKey")
+            if not last_key:
+                return
+            req["ExclusiveStartKey"] = last_key
+
+    async def batch_put(self, items: list[dict[str, Any]], max_attempts: int = BATCH_WRITE_ATTEMPTS) -> list[dict[str, Any]]:
+        """
+        BatchWriteItem 写入（每批 25 条，各批并发），UnprocessedItems 指数退避重试。
+        返回重试 max_attempts 次后仍未写入的 item。注意 batch 写不支持条件表达式（会覆盖同主键）。
+        """
+        chunks = [items[i : i + BATCH_WRITE_MAX] for i in range(0, len(items), BATCH_WRITE_MAX)]
+        results = await asyncio.gather(*(self._batch_put_chunk(c, max_attempts) for c in chunks))
+        return [it for failed in results for it in failed]
+
+    async def _batch_put_chunk(self, items: list[dict[str, Any]], max_attempts: int) -> list[dict[str, Any]]:
+        pending = items
+        for attempt in range(max_attempts):
+            if attempt:
+                await asyncio.sleep(min(BATCH_RETRY_BASE_SECONDS * (2 ** (attempt - 1)), 2.0))
+            resp = await self._engine.batch_write_item(
+                {self.name: [{"PutRequest": {"Item": it}} for it in pending]}
+            )
+            unprocessed = (resp.get("UnprocessedItems") or {}).get(self.name, [])
+            pending = [r["PutRequest"]["Item"] for r in unprocessed]
+            if not pending:
+                return []
+        return pending
+
+
+class DynamoDB:
+    """
+    进程级 DynamoDB 引擎：
+    - max_pool_connections：HTTP 连接池大小（两条路径共用这个配置）
+    - max_concurrency：同时在途的请求数上限（Semaphore）；线程池大小也取这个值
+    - scan_segments / scan_concurrency：DynamoTable.parallel_scan 的默认分段数和并行段数
+    """
+
+    def __init__(
+        self,
+        region: Optional[str] = None,
+        endpoint_url: Optional[str] = None,
+        max_pool_connections: int = 50,
+        max_concurrency: int = 64,
+        use_async: Optional[bool] = None,
+        scan_segments: int = 8,
+        scan_concurrency: int = 4,
+    ) -> None:
+        self.region = region or os.getenv("AWS_REGION", "ap-northeast-2")
+        self.endpoint_url = endpoint_url or None
+        self.max_pool_connections = max_pool_connections
+        self.max_concurrency = max_concurrency
+        self.scan_segments = scan_segments
+        self.scan_concurrency = scan_concurrency
+        self.use_async = (_aio_session is not None) if use_async is None else use_async
+        if self.use_async and _aio_session is None:
+            raise RuntimeError("DDB_ASYNC=on but aiobotocore is not installed")
+
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._resource = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._client = None
+        self._client_cm = None
+        self._client_lock: Optional[asyncio.Lock] = None
+        self.calls = 0
+
+    @property
+    def mode(self) -> str:
+        return "async" if self.use_async else "thread"
+
+    def _retries(self) -> dict[str, Any]:
+        return {"max_attempts": 10, "mode": "standard"}
+
+    def table(self, name: str) -> DynamoTable:
+        return DynamoTable(self, name)
+
+    # ---------- sync fallback ----------
+
+    def _sync_resource(self):
+        if self._resource is None:
+            cfg = Config(
+                region_name=self.region,
+                retries=self._retries(),
+                max_pool_connections=self.max_pool_connections,
+            )
+            self._resource = boto3.resource("dynamodb", config=cfg, endpoint_url=self.endpoint_url)
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="ddb")
+        return self._resource
+
+    # ---------- native async ----------
+
+    async def _async_client(self):
+        if self._client is not None:
+            return self._client
+        if self._client_lock is None:
+            self._client_lock = asyncio.Lock()
+        async with self._client_lock:
+            if self._client is None:
+                cfg = AioConfig(
+                    region_name=self.region,
+                    retries=self._retries(),
+                    max_pool_connections=self.max_pool_connections,
+                )
+                self._client_cm = _aio_session().create_client(
+                    "dynamodb", config=cfg, endpoint_url=self.endpoint_url
+                )
+                self._client = await self._client_cm.__aenter__()
+        return self._client
+
+    # ---------- dispatch ----------
+
+    async def call(self, table_name: str, op: str, kwargs: dict[str, Any]) -> dict[str, Any]:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        async with self._sem:
+            self.calls += 1
+            if self.use_async:
+                client = await self._async_client()
+                resp = await getattr(client, op)(**serialize_request(table_name, kwargs))
+                return deserialize_response(resp)
+
+            table = self._sync_resource().Table(table_name)
+            fn = functools.partial(getattr(table, op), **kwargs)
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn)
+
+    async def batch_write_item(self, request_items: dict[str, list[dict[str, Any]]]) -> dict[str, Any]:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        async with self._sem:
+            self.calls += 1
+            if self.use_async:
+                client = await self._async_client()
+                resp = await client.batch_write_item(RequestItems=serialize_request_items(request_items))
+                if resp.get("UnprocessedItems"):
+                    resp["UnprocessedItems"] = deserialize_request_items(resp["UnprocessedItems"])
+                return resp
+
+            fn = functools.partial(self._sync_resource().batch_write_item, RequestItems=request_items)
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn)
+
+    async def aclose(self) -> None:
+        if self._client_cm is not None:
+            await self._client_cm.__aexit__(None, None, None)
+            self._client_cm = None
+            self._client = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._resource = None
+
+
+def _use_async_setting() -> Optional[bool]:
+    v = settings.ddb_async.strip().lower()
+    if v in ("on", "1", "true"):
+        return True
+    if v in ("off", "0", "false"):
+        return False
+    return None  # auto
+
+
+_default: Optional[DynamoDB] = None
+
+
+def get_dynamodb() -> DynamoDB:
+    """进程内共享的默认引擎（按配置懒加载）。"""
+    global _default
+    if _default is None:
+        _default = DynamoDB(
+            endpoint_url=settings.ddb_endpoint_url,
+            max_pool_connections=settings.ddb_max_pool_connections,
+            max_concurrency=settings.ddb_max_concurrency,
+            use_async=_use_async_setting(),
+            scan_segments=settings.ddb_scan_segments,
+            scan_concurrency=settings.ddb_scan_concurrency,
+        )
+        if _aio_session is None and _default.mode == "thread":
+            log.warning("aiobotocore not installed, dynamodb falls back to the thread pool")
+        log.info("dynamodb engine: %s", _default.mode)
+    return _default
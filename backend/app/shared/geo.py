@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import math
+from typing import NamedTuple, Optional
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+class BBox(NamedTuple):
+    lat_min: float
+    lat_max: float
+    lng_min: float
+    lng_max: float
+
+    def contains(self, lat: float, lng: float) -> bool:
+        return self.lat_min <= lat <= self.lat_max and self.lng_min <= lng <= self.lng_max
+
+
+def geohash_encode(lat: float, lng: float, precision: int = 9) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    out: list[str] = []
+    bits = 0
+    ch = 0
+    even = True  # geohash 从经度开始交替取位
+    while len(out) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch = (ch << 1) | 1
+                lng_lo = mid
+            else:
+                ch <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(_BASE32[ch])
+            bits = 0
+            ch = 0
+    return "".join(out)
+
+
+def _cell_size(precision: int) -> tuple[float, float]:
+    """(lat_height, lng_width) of one geohash cell at `precision`."""
+    total = 5 * precision
+    lng_bits = (total + 1) // 2
+    lat_bits = total // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def _clamp(v: float, lo: float, hi: float) -> float:
+    return max(lo, min(hi, v))
+
+
+def geohash_cells(bbox: BBox, precision: int) -> list[str]:
+    """All geohash cells at `precision` that intersect `bbox`."""
+    h, w = _cell_size(precision)
+    lat_n = int(180.0 / h)
+    lng_n = int(360.0 / w)
+
+    i0 = int(_clamp(math.floor((bbox.lat_min + 90.0) / h), 0, lat_n - 1))
+    i1 = int(_clamp(math.floor((bbox.lat_max + 90.0) / h), 0, lat_n - 1))
+    j0 = int(_clamp(math.floor((bbox.lng_min + 180.0) / w), 0, lng_n - 1))
+    j1 = int(_clamp(math.floor((bbox.lng_max + 180.0) / w), 0, lng_n - 1))
+
+    cells: list[str] = []
+    for i in range(i0, i1 + 1):
+        lat_c = -90.0 + (i + 0.5) * h
+        for j in range(j0, j1 + 1):
+            lng_c = -180.0 + (j + 0.5) * w
+            cells.append(geohash_encode(lat_c, lng_c, precision))
+    return cells
+
+
+def geohash_cell_count(bbox: BBox, precision: int) -> int:
+    h, w = _cell_size(precision)
+    rows = math.floor((bbox.lat_max + 90.0) / h) - math.floor((bbox.lat_min + 90.0) / h) + 1
+    cols = math.floor((bbox.lng_max + 180.0) / w) - math.floor((bbox.lng_min + 180.0) / w) + 1
+    return max(1, rows) * max(1, cols)
+
+
+def cover_bbox(bbox: BBox, min_precision: int, max_precision: int, max_cells: int) -> Optional[list[str]]:
+    """
+    Finest set of geohash cells (precision in [min_precision, max_precision])
+    covering `bbox` with at most `max_cells` cells.
+    Returns None when even `min_precision` needs more cells (caller should scan).
+    """
+    best: Optional[int] = None
+    for p in range(min_precision, max_precision + 1):
+        if geohash_cell_count(bbox, p) > max_cells:
+            break
+        best = p
+    if best is None:
+        return None
+    return geohash_cells(bbox, best)
+
+
+# ---------- Web Mercator（地图瓦片坐标） ----------
+
+MERCATOR_MAX_LAT = 85.05112878
+
+
+def mercator_xy(lat: float, lng: float) -> tuple[float, float]:
+    """Normalized Web Mercator coordinates in [0, 1): x to the east, y to the south."""
+    lat = _clamp(lat, -MERCATOR_MAX_LAT, MERCATOR_MAX_LAT)
+    x = (lng + 180.0) / 360.0
+    s = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+    return _clamp(x, 0.0, 1.0 - 1e-12), _clamp(y, 0.0, 1.0 - 1e-12)
+
+
+def mercator_lat(y: float) -> float:
+    n = math.pi - 2.0 * math.pi * y
+    return math.degrees(math.atan(math.sinh(n)))
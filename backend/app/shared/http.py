@@ -1,4 +1,18 @@
-from fastapi import HTTPException
+import hashlib
+import json
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, TypeAdapter
+
+from .compression import encoded_etag, strip_encoding_suffix
+
+try:  # 可选依赖：没装时退回标准库 json
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
 
 
 def bad_request(msg: str):
@@ -7,3 +21,83 @@ def bad_request(msg: str):
 
 def unauthorized(msg: str = "unauthorized"):
     raise HTTPException(status_code=401, detail=msg)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(cls: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[cls])
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, BaseModel):
+        return o.model_dump(mode="json")
+    return jsonable_encoder(o)
+
+
+def encode_json(data: Any) -> bytes:
+    """
+    Compact UTF-8 JSON. Models (and lists of one model class) are dumped by
+    pydantic-core directly, without re-validation; anything else goes through
+    orjson when installed.
+    """
+    if isinstance(data, BaseModel):
+        return data.__pydantic_serializer__.to_json(data)
+    if isinstance(data, list) and data and isinstance(data[0], BaseModel):
+        cls = type(data[0])
+        if all(type(x) is cls for x in data):
+            return _list_adapter(cls).dump_json(data)
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_response(data: Any, status_code: int = 200, headers: Optional[dict[str, str]] = None) -> Response:
+    """
+    Already-trusted data (our own models) as a JSON response. Returning a Response
+    skips FastAPI's response_model validation + serialization; response_model on
+    the route still documents the shape.
+    """
+    return Response(content=encode_json(data), status_code=status_code, media_type="application/json", headers=headers)
+
+
+def strong_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        # 客户端缓存的可能是压缩版本的 ETag（"abc-gzip"），内容相同就算命中
+        if strip_encoding_suffix(tag) == etag:
+            return True
+    return False
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    return bool(inm) and _etag_matches(inm, etag)
+
+
+def etag_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    cache_control: str = "no-cache",
+    encoding: Optional[str] = None,
+) -> Response:
+    """
+    JSON bytes with a strong ETag; answers If-None-Match with 304.
+    encoding: body is already compressed with it (see compression.Precompressed).
+    """
+    tag = encoded_etag(etag, encoding)
+    if not_modified(request, etag):
+        # 304 没有 body：不带 Content-Encoding，只回校验器和 Vary
+        return Response(status_code=304, headers={"ETag": tag, "Vary": "Accept-Encoding"})
+    headers = {"ETag": tag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,86 @@
+"""
+Minimal Mapbox Vector Tile (v2.1) encoder: one layer of point features with
+string / integer properties, which is all the incidents layer needs.
+https://github.com/mapbox/vector-tile-spec/tree/master/2.1
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+MVT_EXTENT = 4096
+
+_GEOM_POINT = 1
+_CMD_MOVE_TO_1 = (1 & 0x7) | (1 << 3)
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def _zigzag(n: int) -> int:
+    return (n << 1) ^ (n >> 31)
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _len_field(field: int, payload: bytes) -> bytes:
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _uint_field(field: int, n: int) -> bytes:
+    return _key(field, 0) + _varint(n)
+
+
+def _packed(field: int, values: Iterable[int]) -> bytes:
+    return _len_field(field, b"".join(_varint(v) for v in values))
+
+
+def _value(v: str | int) -> bytes:
+    # Value message: 1 = string_value, 5 = uint_value, 6 = sint_value
+    if isinstance(v, str):
+        return _len_field(1, v.encode("utf-8"))
+    if v >= 0:
+        return _uint_field(5, v)
+    return _uint_field(6, (v << 1) ^ (v >> 63))
+
+
+def encode_point_layer(
+    name: str,
+    features: Iterable[tuple[int, int, dict[str, str | int]]],
+    extent: int = MVT_EXTENT,
+) -> bytes:
+    """features: (x, y, properties) in tile coordinates [0, extent)."""
+    keys: dict[str, int] = {}
+    values: dict[tuple[type, str | int], int] = {}
+    body = bytearray()
+
+    for x, y, props in features:
+        tags: list[int] = []
+        for k, v in props.items():
+            if v is None:
+                continue
+            tags.append(keys.setdefault(k, len(keys)))
+            v = v if isinstance(v, int) and not isinstance(v, bool) else str(v)
+            tags.append(values.setdefault((type(v), v), len(values)))
+        feat = _packed(2, tags) + _uint_field(3, _GEOM_POINT) + _packed(4, (_CMD_MOVE_TO_1, _zigzag(x), _zigzag(y)))
+        body += _len_field(2, feat)
+
+    layer = bytearray(_uint_field(15, 2) + _len_field(1, name.encode("utf-8")))
+    layer += body
+    for k in keys:
+        layer += _len_field(3, k.encode("utf-8"))
+    for _, v in values:
+        layer += _len_field(4, _value(v))
+    layer += _uint_field(5, extent)
+
+    return _len_field(3, bytes(layer))
@@ -0,0 +1,50 @@
+"""
+请求合并（single-flight）：同一个 key 同时只有一次在途的存储调用，并发的相同读请求共享它的结果。
+
+    flight = SingleFlight()
+    items = await flight.do(("bbox", bbox), lambda: repo.list_in_bbox(bbox))
+
+- 只合并"正在进行"的调用，结果不缓存：调用结束后下一个请求会重新读
+- 结果对象是共享的，调用方只读、不要就地修改
+- 异常同样分发给所有等待者；某个等待者被取消不影响其它人
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class SingleFlight(Generic[K, V]):
+    """Single event loop, no locking."""
+
+    def __init__(self) -> None:
+        self.calls = 0  # 真正发出去的调用
+        self.coalesced = 0  # 搭便车、没有发调用的请求
+        self._inflight: dict[K, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: K, fn: Callable[[], Awaitable[V]]) -> V:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        # shield：等待者被取消时，共享的调用继续跑完，其它等待者照常拿结果
+        return await asyncio.shield(task)
+
+    def _done(self, key: K, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # 所有等待者都取消了时，避免 "exception was never retrieved"
+
+    def stats(self) -> dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "inflight": len(self._inflight)}
@@ -1,9 +1,25 @@
 from __future__ import annotations
 
+import bisect
+import logging
 import re
+import time
 from dataclasses import dataclass
 from typing import Optional
 
+from .config import settings
+from .lru import LRUCache
+
+log = logging.getLogger(__name__)
+
+# 线性时间约定：
+# - 可变长的片段要么有上界（{m,n}），要么是后面紧跟的字符不可能被它吞掉的 possessive 量词（*+），
+#   失败时不回溯；
+# - 威胁检测不用 “A.{0,12}B.{0,12}C” 这种嵌套回溯的正则，改成按位置线性扫描（_has_threat）；
+# - 长度检查在所有规则之前，规则只扫不超过 max_len 的文本；
+#   原始输入超过 max_len * RAW_LEN_FACTOR 时连归一化都不做，直接 TOO_LONG。
+# bench/moderation.py 用构造的最坏输入验证耗时随长度线性增长。
+
 _whitespace = re.compile(r"\s+")
 
 # URL
@@ -14,7 +30,8 @@ _phone_cn = re.compile(r"(?<!\d)(?:1[3-9]\d{9})(?!\d)")
 
 # ========= 联系方式 / 引流（加强版） =========
 # 说明：为了防绕过，允许中间夹杂空格、符号、全角符号、点、下划线等
-_sep = r"[\s\-\_·\.\,，。:：|/\\~`!@#$%^&*()\[\]{}<>“”\"'＋+＝=]*"
+# possessive：分隔符后面跟的都是字母/汉字，不在这个字符集里，不回溯不影响结果
+_sep = r"[\s\-\_·\.\,，。:：|/\\~`!@#$%^&*()\[\]{}<>“”\"'＋+＝=]*+"
 
 # 1) 微信相关关键词（含常见同音/变体/拆字）
 # - 微信 / 微 信 / 薇信 / 威信 / wechat / weixin / wx / vx / v信 / vX 等
@@ -33,15 +50,80 @@ _cta_kw = re.compile(
 # 这里会在“微信关键词附近”或“CTA附近”才触发，减少误伤。
 _wechat_id = re.compile(r"[a-zA-Z][a-zA-Z0-9_-]{3,19}")
 
+# 短关键词 vx/wx（独立成词）
+_vx_wx = re.compile(r"\b(?:vx|wx)\b", re.IGNORECASE)
+
 # 4) 兜底：出现“VX/WX/微信”等关键词后，若后面 0~12 字符内出现可疑 ID 或数字串，就拦
 # 数字串用于抓 “vx: 1234567” 这类（即使不是标准微信号也属于引流）
 _suspicious_id_or_digits = re.compile(r"(?:[a-zA-Z][a-zA-Z0-9_-]{3,19}|[1-9]\d{4,11})")
 
 # ========= 明显威胁（保留你要求：不误伤描述投毒点） =========
+# 语义：意图词 + 0~12 个字符 + 暴力动词 + 0~12 个字符 + 对象（文本已归一化，不含换行）
 _intent = r"(我(要|会|准备|打算)|去|来|带人|叫人|今晚|明天|等我|给你|必须|应该|一起)"
 _target = r"(你|他|她|TA|某人|人|店|店家|老板|物业|邻居|小区|学校|公司)"
 _violence_verb = r"(杀|弄死|砍|捅|打死|烧|炸|放火|下毒|投毒)"
-_threat = re.compile(_intent + r".{0,12}" + _violence_verb + r".{0,12}" + _target, re.IGNORECASE)
+THREAT_GAP = 12
+
+# 零宽 lookahead：拿到每个位置上的命中（可重叠）。
+# 意图词 / 动词的各分支互不为前缀，所以同一起点的命中长度唯一。
+_intent_at = re.compile(rf"(?={_intent})", re.IGNORECASE)
+_verb_at = re.compile(rf"(?={_violence_verb})", re.IGNORECASE)
+_target_at = re.compile(rf"(?={_target})", re.IGNORECASE)
+_intent_full = re.compile(_intent, re.IGNORECASE)
+_verb_full = re.compile(_violence_verb, re.IGNORECASE)
+_target_full = re.compile(_target, re.IGNORECASE)
+
+
+def _has_threat(s: str) -> bool:
+    """等价于 re.search(intent + ".{0,12}" + verb + ".{0,12}" + target)，但是 O(n log n)。"""
+    # 三类词缺一个就不可能命中：先各做一次快速 search
+    if not (_verb_full.search(s) and _intent_full.search(s) and _target_full.search(s)):
+        return False
+
+    verbs = [m.start() for m in _verb_at.finditer(s)]
+    intent_ends = [_intent_full.match(s, m.start()).end() for m in _intent_at.finditer(s)]
+    targets = [m.start() for m in _target_at.finditer(s)]
+    intent_ends.sort()  # 不同长度的意图词，结束位置不一定有序
+
+    for c in verbs:
+        i = bisect.bisect_left(intent_ends, c - THREAT_GAP)
+        if i == len(intent_ends) or intent_ends[i] > c:
+            continue
+        d = _verb_full.match(s, c).end()
+        j = bisect.bisect_left(targets, d)
+        if j < len(targets) and targets[j] <= d + THREAT_GAP:
+            return True
+    return False
+
+# ========= 预筛 =========
+# 每条拦截规则都必须先命中下面某一个子式（URL / 手机号 / 微信关键词 / CTA / 暴力动词；
+# vx/wx 是 w·x / v·x 的特例）。一次扫描没命中 = 全部放行，绝大多数正常文本只走这一遍；
+# 命中了再跑下面的精确规则，结果与逐条检查完全一致。
+# 开头的字符集是各子式所有可能的首字符：让正则引擎直接跳到候选位置，不必在每个位置试所有分支。
+# 改了上面任何一个子式的开头，这里要同步。
+_prefilter_first = "hw1微薇威维v加私联来找杀弄砍捅打烧炸放下投"
+_prefilter = re.compile(
+    rf"(?=[{_prefilter_first}])(?:"
+    + "|".join(
+        f"(?:{p})"
+        for p in (_url.pattern, _phone_cn.pattern, _wechat_kw.pattern, _cta_kw.pattern, _violence_verb)
+    )
+    + ")",
+    re.IGNORECASE,
+)
+
+# 原始输入（归一化之前）的长度上限 = max_len * RAW_LEN_FACTOR：
+# 空白折叠能把长度缩到原来的几分之一，但超过这个倍数的基本只可能是灌水
+RAW_LEN_FACTOR = 4
+
+# 单次判定的耗时预算（MODERATION_BUDGET_MS）：规则都是线性的、输入长度有上限，
+# 超预算说明进程被卡住或规则被改坏了：记 warning + 计数（GET /console/stats），判定结果照常返回，
+# 不引入新的 reason（客户端只认识现有的几种）
+moderation_stats = {"checks": 0, "over_budget": 0, "max_ms": 0.0}
+
+# 判定结果缓存（刷屏的广告往往一字不差）：(文本, check_contact, check_threat) -> reason，"" 表示通过
+VERDICT_CACHE_SIZE = 4096
+_verdicts: LRUCache[tuple[str, bool, bool], str] = LRUCache(VERDICT_CACHE_SIZE)
 
 
 @dataclass
@@ -69,21 +151,55 @@ def _has_contact_or_ad(s: str) -> bool:
         if _suspicious_id_or_digits.search(tail):
             return True
 
+    has_id: Optional[bool] = None  # _wechat_id 最多搜一次
+
     # CTA 命中：如果同时出现疑似微信关键词 or 疑似ID，也拦（防 “加我 abc1234”）
     if _cta_kw.search(s):
         # 如果直接出现 wechat 关键词或 ID 形态，也认为是引流
-        if _wechat_kw.search(s) or _wechat_id.search(s):
+        if m:
+            return True
+        has_id = _wechat_id.search(s) is not None
+        if has_id:
             return True
 
     # 额外兜底：出现 “vx/wx” 这类非常短的关键词，即使没有明显分隔，也尝试抓
     # （例如：vxabc123 / wx_abc123）
-    if re.search(r"\b(?:vx|wx)\b", s, re.IGNORECASE):
-        if _wechat_id.search(s):
+    if _vx_wx.search(s):
+        if has_id is None:
+            has_id = _wechat_id.search(s) is not None
+        if has_id:
             return True
 
     return False
 
 
+def _verdict(s: str, check_contact: bool, check_threat: bool) -> Optional[str]:
+    if not _prefilter.search(s):
+        return None
+
+    if check_contact:
+        if _has_contact_or_ad(s):
+            return "CONTACT_OR_AD_NOT_ALLOWED"
+
+    if check_threat:
+        # 不会因为“毒/毒死/杀死”等单词本身就拦
+        if _has_threat(s):
+            return "VIOLENT_THREAT"
+
+    return None
+
+
+def _record(elapsed: float, length: int) -> None:
+    """记一次判定耗时，超预算打 warning。"""
+    ms = elapsed * 1000
+    moderation_stats["checks"] += 1
+    if ms > moderation_stats["max_ms"]:
+        moderation_stats["max_ms"] = ms
+    if ms > settings.moderation_budget_ms:
+        moderation_stats["over_budget"] += 1
+        log.warning("text moderation took %.1fms (budget %.1fms, %d chars)", ms, settings.moderation_budget_ms, length)
+
+
 def validate_text(
     s: str,
     *,
@@ -94,6 +210,8 @@ def validate_text(
 ) -> CleanResult:
     if s is None:
         return CleanResult(False, "", "EMPTY")
+    if len(s) > max_len * RAW_LEN_FACTOR:
+        return CleanResult(False, s, "TOO_LONG")
 
     s = _normalize_basic(s)
 
@@ -103,13 +221,17 @@ def validate_text(
         # 加重处理：直接拒绝
         return CleanResult(False, s, "TOO_LONG")
 
-    if check_contact:
-        if _has_contact_or_ad(s):
-            return CleanResult(False, s, "CONTACT_OR_AD_NOT_ALLOWED")
+    if not (check_contact or check_threat):
+        return CleanResult(True, s, None)
 
-    if check_threat:
-        # 不会因为“毒/毒死/杀死”等单词本身就拦
-        if _threat.search(s):
-            return CleanResult(False, s, "VIOLENT_THREAT")
+    key = (s, check_contact, check_threat)
+    reason = _verdicts.get(key)
+    if reason is None:
+        t0 = time.perf_counter()
+        reason = _verdict(s, check_contact, check_threat) or ""
+        _record(time.perf_counter() - t0, len(s))
+        _verdicts.set(key, reason)
 
+    if reason:
+        return CleanResult(False, s, reason)
     return CleanResult(True, s, None)
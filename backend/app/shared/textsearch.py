@@ -0,0 +1,87 @@
+"""
+进程内的子串检索倒排索引（控制台 q= 搜索用）。
+
+中文没有空格分词，按字切：每个字（unigram）和相邻两个字（bigram）各一条倒排。
+查询 "草丛有药" 拆成 bigram 求交集，再对候选做一次真正的子串校验，结果与
+`q.lower() in text.lower()` 完全一致；代价取决于最短的那条倒排，而不是总文档数。
+"""
+from __future__ import annotations
+
+from typing import Hashable, Optional
+
+
+def _grams(text: str) -> set[str]:
+    grams = set(text)
+    grams.update(text[i : i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def _query_grams(q: str) -> set[str]:
+    # 单字查 unigram；两个字以上 bigram 已经覆盖所有字
+    return {q} if len(q) == 1 else {q[i : i + 2] for i in range(len(q) - 1)}
+
+
+class NgramIndex:
+    """key -> text 的 unigram + bigram 倒排，支持增量 add/remove。大小写不敏感。"""
+
+    def __init__(self) -> None:
+        # 存原文（和调用方手里的是同一个 str 对象，不额外占内存；调用方可以用 text() 取回，不必另存一份）
+        self._docs: dict[Hashable, str] = {}
+        self._postings: dict[str, set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._docs
+
+    def text(self, key: Hashable) -> Optional[str]:
+        return self._docs.get(key)
+
+    def add(self, key: Hashable, text: str) -> None:
+        """新增或替换 key 的文本。"""
+        old = self._docs.get(key)
+        if old is not None:
+            if old == text:
+                return
+            self.remove(key)
+        self._docs[key] = text
+        for g in _grams(text.lower()):
+            posting = self._postings.get(g)
+            if posting is None:
+                posting = self._postings[g] = set()
+            posting.add(key)
+
+    def remove(self, key: Hashable) -> None:
+        text = self._docs.pop(key, None)
+        if text is None:
+            return
+        for g in _grams(text.lower()):
+            posting = self._postings.get(g)
+            if posting is not None:
+                posting.discard(key)
+                if not posting:
+                    del self._postings[g]
+
+    def search(self, q: str) -> list[Hashable]:
+        """文本包含 q（忽略大小写）的所有 key，顺序不固定。空查询返回空列表。"""
+        q = q.lower()
+        if not q:
+            return []
+        postings = []
+        for g in _query_grams(q):
+            posting = self._postings.get(g)
+            if not posting:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        hits = postings[0]
+        for posting in postings[1:]:
+            hits = hits & posting  # set & 只遍历较小的一边
+            if not hits:
+                return []
+        if len(q) <= 2:
+            return list(hits)
+        # bigram 都在不代表连续出现（"草丛有" 命中 "有草丛"），逐条校验
+        docs = self._docs
+        return [k for k in hits if q in docs[k].lower()]
@@ -0,0 +1,177 @@
+"""
+按月分桶的时间索引（GSI: ts_bucket + created_at）。
+created_at 统一存 UTC ISO8601 字符串，同一桶内字符串序 = 时间序。
+早于 TIME_BUCKET_START 的数据统一放进 LEGACY_BUCKET（桶内照样按 created_at 排序），
+所以从新到旧走完月桶后只需要再查一个桶，不会因为下限写死而漏掉旧数据。
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional, TypeVar
+
+from boto3.dynamodb.conditions import Attr, ConditionBase, Key
+
+from app.shared.ddb import DynamoTable
+
+T = TypeVar("T")
+
+# 按月分桶的起点；更早的数据都在 LEGACY_BUCKET 里
+TIME_BUCKET_START = os.getenv("DDB_TIME_BUCKET_START", "2025-01")
+# 比所有 "YYYY-MM" 都小，桶倒序时排在最后
+LEGACY_BUCKET = "0000-00"
+# 没有 created_at 的点位不在索引里（GSI 排序键缺失），走完所有桶后用 Scan 补在最后；
+# 只出现在 next_key 里，表示"进入无时间数据阶段"
+UNTIMED_BUCKET = ""
+
+# 单次调用最多发多少次 Query（过滤条件很苛刻时避免一路读到底）
+TIME_QUERY_MAX_CALLS = 20
+
+
+def parse_iso(s: str) -> datetime:
+    s2 = s.strip().replace("Z", "+00:00")
+    return datetime.fromisoformat(s2)
+
+
+def to_utc(dt: datetime) -> datetime:
+    """不带时区的输入按 UTC 处理。"""
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def time_bucket(created_at: str) -> str:
+    b = to_utc(parse_iso(created_at)).strftime("%Y-%m")
+    return b if b >= TIME_BUCKET_START else LEGACY_BUCKET
+
+
+def stale_bucket_cond() -> ConditionBase:
+    """
+    ts_bucket 与当前分桶规则不一致的行（上一版按月分到了 TIME_BUCKET_START 之前 / 改过起点），
+    backfill 用它重新分桶。
+    """
+    return (Attr("ts_bucket").lt(TIME_BUCKET_START) & Attr("ts_bucket").ne(LEGACY_BUCKET)) | (
+        Attr("ts_bucket").eq(LEGACY_BUCKET) & Attr("created_at").gte(TIME_BUCKET_START)
+    )
+
+
+def buckets_desc(start: Optional[datetime], end: Optional[datetime]) -> list[str]:
+    """[end 所在月 .. start 所在月]，从新到旧；范围伸到 TIME_BUCKET_START 之前时最后加上 LEGACY_BUCKET。"""
+    hi = to_utc(end or datetime.now(timezone.utc))
+    lo_s = to_utc(start).strftime("%Y-%m") if start else LEGACY_BUCKET
+    y, m = hi.year, hi.month
+    out: list[str] = []
+    while True:
+        b = f"{y:04d}-{m:02d}"
+        if b < lo_s or b < TIME_BUCKET_START:
+            break
+        out.append(b)
+        m -= 1
+        if m == 0:
+            y, m = y - 1, 12
+    if lo_s < TIME_BUCKET_START:
+        out.append(LEGACY_BUCKET)
+    return out
+
+
+async def query_time_index(
+    table: DynamoTable,
+    index_name: str,
+    *,
+    key_attrs: tuple[str, ...],
+    convert: Callable[[dict[str, Any]], T],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 20,
+    start_key: Optional[dict[str, Any]] = None,
+    predicate: Optional[Callable[[T], bool]] = None,
+    include_untimed: bool = False,
+) -> tuple[list[T], Optional[dict[str, Any]]]:
+    """
+    created_at 倒序分页：按月分桶从新到旧逐桶 Query。
+    start/end 下推到 KeyCondition；predicate 是额外的内存过滤（bbox/关键词）。
+    返回 (items, next_key)。next_key 是最后一条的索引键（或只有 ts_bucket，表示从该桶开头继续），
+    None 表示没有更多。key_attrs 是表自身的主键字段，用来拼 ExclusiveStartKey。
+    include_untimed: 没有时间筛选时，最后再带上没有 created_at 的行（Scan，顺序按表）。
+    """
+    lo = start.isoformat() if start else None
+    hi = end.isoformat() if end else None
+
+    buckets = buckets_desc(start, end)
+    if include_untimed and start is None and end is None:
+        buckets.append(UNTIMED_BUCKET)
+    if start_key:
+        buckets = [b for b in buckets if b <= start_key["ts_bucket"]]
+
+    out: list[T] = []
+    calls = 0
+    for b in buckets:
+        if calls >= TIME_QUERY_MAX_CALLS:
+            # 本页没凑满也先返回，客户端拿 cursor 继续
+            return out, {"ts_bucket": b}
+
+        if b == UNTIMED_BUCKET:
+            resumed = start_key and start_key["ts_bucket"] == b and key_attrs[0] in start_key
+            last_key = {k: start_key[k] for k in key_attrs} if resumed else None
+            while True:
+                scan_kwargs: dict[str, Any] = {
+                    "FilterExpression": Attr("created_at").not_exists(),
+                    "Limit": max(limit, 100),
+                }
+                if last_key:
+                    scan_kwargs["ExclusiveStartKey"] = last_key
+                resp = await table.scan(**scan_kwargs)
+                calls += 1
+                for raw in resp.get("Items", []):
+                    last_key = {k: raw[k] for k in key_attrs}
+                    it = convert(raw)
+                    if predicate is None or predicate(it):
+                        out.append(it)
+                        if len(out) >= limit:
+                            return out, {**last_key, "ts_bucket": b}
+                # Scan 的 Limit 是过滤前的条数：从 LastEvaluatedKey 继续，而不是最后一条命中
+                last_key = resp.get("LastEvaluatedKey")
+                if not last_key:
+                    return out, None
+                if calls >= TIME_QUERY_MAX_CALLS:
+                    return out, {**last_key, "ts_bucket": b}
+
+        cond = Key("ts_bucket").eq(b)
+        if lo and hi:
+            cond = cond & Key("created_at").between(lo, hi)
+        elif lo:
+            cond = cond & Key("created_at").gte(lo)
+        elif hi:
+            cond = cond & Key("created_at").lte(hi)
+
+        last_key = start_key if start_key and start_key.get("created_at") and start_key["ts_bucket"] == b else None
+        while True:
+            need = limit - len(out)
+            # 有内存过滤时多读一些，减少往返
+            page_limit = need if predicate is None else max(need, 100)
+
+            kwargs: dict[str, Any] = {
+                "IndexName": index_name,
+                "KeyConditionExpression": cond,
+                "ScanIndexForward": False,
+                "Limit": page_limit,
+            }
+            if last_key:
+                kwargs["ExclusiveStartKey"] = last_key
+            resp = await table.query(**kwargs)
+            calls += 1
+            for raw in resp.get("Items", []):
+                last_key = {k: raw[k] for k in key_attrs}
+                last_key.update({"ts_bucket": b, "created_at": raw["created_at"]})
+                it = convert(raw)
+                if predicate is None or predicate(it):
+                    out.append(it)
+                    if len(out) >= limit:
+                        return out, last_key
+
+            if not resp.get("LastEvaluatedKey"):
+                break
+            if calls >= TIME_QUERY_MAX_CALLS:
+                return out, last_key
+
+    return out, None
@@ -19,6 +19,22 @@ class Incident(BaseModel):
     lat: float
     title: str
     created_at: str | None = None  # ISO string (UTC). Old records may be None.
+    # 留言写入/删除时原子维护，定时对账修正漂移（见 comments/stats.py）
+    comment_count: int = 0
+    last_comment_at: str | None = None
+
+
+class IncidentCluster(BaseModel):
+    count: int
+    lat: float  # centroid
+    lng: float
+    bounds: list[float]  # [lng_min, lat_min, lng_max, lat_max]
+    incident_id: str | None = None  # count == 1 时直接给出点位 id
+
+
+class IncidentClusterListOut(BaseModel):
+    zoom: int
+    items: List[IncidentCluster]
 
 
 class IncidentCreateIn(BaseModel):
@@ -27,6 +43,25 @@ class IncidentCreateIn(BaseModel):
     title: str = Field(min_length=1, max_length=120)
 
 
+class IncidentBatchIn(BaseModel):
+    # 逐条校验（IncidentCreateIn），单条不合法只影响这一条
+    items: list[dict[str, Any]] = Field(min_length=1)
+
+
+class IncidentBatchItemOut(BaseModel):
+    index: int
+    ok: bool
+    incident: Optional[Incident] = None
+    code: Optional[str] = None  # INVALID / 审核 reason / WRITE_FAILED
+    message: Optional[str] = None
+
+
+class IncidentBatchOut(BaseModel):
+    created: int
+    failed: int
+    items: List[IncidentBatchItemOut]
+
+
 class IncidentUpdateIn(BaseModel):
     title: str = Field(min_length=1, max_length=120)
 
@@ -34,8 +69,9 @@ class IncidentUpdateIn(BaseModel):
 class ConsolePaged(BaseModel):
     page: int
     page_size: int
-    total: int
+    total: int | None = None  # 游标分页时不计算总数
     items: list[Any]
+    next_cursor: str | None = None
 
 
 class CommentUpdateIn(BaseModel):
@@ -60,6 +96,13 @@ class Comment(BaseModel):
     created_at: str  # ISO string
 
 
+class CommentFeedItem(Comment):
+    """控制台时间索引读出来的留言：带冗余的点位字段（旧数据可能没有）"""
+    incident_lng: float | None = None
+    incident_lat: float | None = None
+    incident_title: str | None = None
+
+
 class ConsoleCommentRow(Comment):
     incident_lng: float
     incident_lat: float
@@ -73,4 +116,10 @@ class CommentCreateOut(BaseModel):
 
 class CommentListOut(BaseModel):
     incident_id: str
-    items: List[Comment]
\ No newline at end of file
+    items: List[Comment]
+    next_cursor: str | None = None
+
+
+class CommentMultiListOut(BaseModel):
+    # 按请求里 incident_ids 的顺序（去重后），每个点位一组；next_cursor 可接着用单点位接口翻页
+    groups: List[CommentListOut]
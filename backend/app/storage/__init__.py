@@ -0,0 +1,20 @@
+"""
+存储后端。repo 接口见 base.py，按 STORAGE_BACKEND 选择实现（见 app/container.py）：
+
+- dynamodb（默认）：app/modules/*/repo.py
+- memory：进程内，重启即清空；本地开发 / 压测用
+- sqlite：单文件（SQLITE_PATH），R*Tree 空间索引 + created_at 索引
+"""
+from .base import CommentsRepository, IncidentsRepository
+from .memory import MemoryCommentsRepo, MemoryIncidentsRepo
+from .sqlite import SqliteCommentsRepo, SqliteDB, SqliteIncidentsRepo
+
+__all__ = [
+    "CommentsRepository",
+    "IncidentsRepository",
+    "MemoryCommentsRepo",
+    "MemoryIncidentsRepo",
+    "SqliteCommentsRepo",
+    "SqliteDB",
+    "SqliteIncidentsRepo",
+]
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Protocol, TypeVar
+
+from app.shared.geo import BBox
+from app.shared.types import Comment, CommentFeedItem, Incident
+
+T = TypeVar("T")
+
+PageKey = dict[str, Any]
+
+
+class IncidentsRepository(Protocol):
+    async def list_incidents(self, limit: Optional[int] = None) -> list[Incident]: ...
+
+    async def list_in_bbox(self, bbox: BBox) -> list[Incident]: ...
+
+    async def scan_incidents(
+        self,
+        limit: int = 500,
+        start_key: Optional[PageKey] = None,
+    ) -> tuple[list[Incident], Optional[PageKey]]: ...
+
+    def iter_incidents(self, page_size: int = 500) -> AsyncIterator[list[Incident]]: ...
+
+    async def query_by_created(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 20,
+        start_key: Optional[PageKey] = None,
+        predicate: Optional[Callable[[Incident], bool]] = None,
+    ) -> tuple[list[Incident], Optional[PageKey]]: ...
+
+    async def backfill_index_attrs(self) -> int: ...
+
+    async def get(self, incident_id: str) -> Optional[Incident]: ...
+
+    async def create_incident(self, incident: Incident) -> Incident: ...
+
+    async def create_incidents(self, incidents: list[Incident]) -> list[Incident]: ...
+
+    async def update_title(self, incident_id: str, title: str) -> Incident: ...
+
+    async def add_comment_count(
+        self, incident_id: str, delta: int, last_comment_at: Optional[str] = None
+    ) -> Optional[Incident]: ...
+
+    async def set_comment_stats(
+        self,
+        incident_id: str,
+        count: int,
+        last_comment_at: Optional[str],
+        expected_count: Optional[int] = None,
+    ) -> Optional[Incident]: ...
+
+    async def delete(self, incident_id: str) -> None: ...
+
+
+class CommentsRepository(Protocol):
+    async def add(self, comment: Comment, incident: Optional[Incident] = None) -> Comment: ...
+
+    async def list_by_incident(
+        self,
+        incident_id: str,
+        limit: int = 200,
+        start_key: Optional[PageKey] = None,
+        newest_first: bool = False,
+    ) -> list[Comment]: ...
+
+    async def list_page_by_incident(
+        self,
+        incident_id: str,
+        limit: int = 200,
+        start_key: Optional[PageKey] = None,
+        newest_first: bool = False,
+    ) -> tuple[list[Comment], Optional[PageKey]]: ...
+
+    async def scan_comments(
+        self,
+        limit: int = 500,
+        start_key: Optional[PageKey] = None,
+    ) -> tuple[list[Comment], Optional[PageKey]]: ...
+
+    def iter_comments(self, page_size: int = 500) -> AsyncIterator[list[Comment]]: ...
+
+    async def query_by_created(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 20,
+        start_key: Optional[PageKey] = None,
+        predicate: Optional[Callable[[CommentFeedItem], bool]] = None,
+    ) -> tuple[list[CommentFeedItem], Optional[PageKey]]: ...
+
+    async def set_incident_title(self, incident_id: str, title: str) -> int: ...
+
+    async def backfill_index_attrs(self, lookup: Callable[[str], Optional[Incident]]) -> int: ...
+
+    async def update_content(self, incident_id: str, created_at: str, content: str) -> None: ...
+
+    async def delete(self, incident_id: str, created_at: str) -> bool: ...
+
+
+def time_range(start: Optional[datetime], end: Optional[datetime]) -> tuple[Optional[str], Optional[str]]:
+    """与 DynamoDB 时间索引一致：按 created_at 的 ISO 字符串比较。"""
+    return (start.isoformat() if start else None, end.isoformat() if end else None)
+
+
+async def page_desc(
+    fetch: Callable[[Optional[PageKey], int], Awaitable[list[T]]],
+    key_of: Callable[[T], PageKey],
+    *,
+    limit: int,
+    start_key: Optional[PageKey],
+    predicate: Optional[Callable[[T], bool]],
+) -> tuple[list[T], Optional[PageKey]]:
+    """
+    created_at 倒序分页的公共循环（memory/sqlite）。
+    fetch(after_key, n) 返回 after_key 之后（不含）按倒序的最多 n 条。
+    """
+    out: list[T] = []
+    after = start_key or None
+    while True:
+        need = limit - len(out)
+        # 有内存过滤时多读一些，减少往返
+        n = need if predicate is None else max(need, 100)
+        batch = await fetch(after, n)
+        for it in batch:
+            after = key_of(it)
+            if predicate is None or predicate(it):
+                out.append(it)
+                if len(out) >= limit:
+                    return out, after
+        if len(batch) < n:
+            return out, None
+
+
+async def iter_scan(
+    scan: Callable[..., Awaitable[tuple[list[T], Optional[PageKey]]]], page_size: int
+) -> AsyncIterator[list[T]]:
+    """scan_incidents/scan_comments 顺序翻页成异步流（memory/sqlite 的 iter_*；DynamoDB 用并行分段 Scan）。"""
+    start_key: Optional[PageKey] = None
+    while True:
+        page, start_key = await scan(limit=page_size, start_key=start_key)
+        if page:
+            yield page
+        if not start_key:
+            return
@@ -0,0 +1,334 @@
+"""
+进程内存储：数据只在本进程里，重启即清空。本地开发 / 压测 / CI 用。
+排序用 bisect 维护的有序键列表，分页语义与 DynamoDB 版一致。
+"""
+from __future__ import annotations
+
+import bisect
+from datetime import datetime
+from typing import AsyncIterator, Callable, Iterable, Optional
+
+from app.shared.geo import BBox
+from app.shared.types import Comment, CommentFeedItem, Incident
+from .base import PageKey, iter_scan, page_desc, time_range
+
+# 比所有 id / ISO 时间串都大
+_MAX = "\uffff"
+
+
+def _desc_after(keys: list[tuple[str, str]], after: Optional[tuple[str, str]], n: int) -> list[tuple[str, str]]:
+    """有序（升序）keys 里严格小于 after 的最后 n 个，倒序返回。"""
+    hi = bisect.bisect_left(keys, after) if after else len(keys)
+    return keys[max(0, hi - n) : hi][::-1]
+
+
+def _time_keys_desc(
+    keys: list[tuple[str, str]], after: Optional[PageKey], lo: Optional[str], hi: Optional[str], n: int
+) -> list[tuple[str, str]]:
+    """
+    时间索引 (created_at, id) 上 after 之后、[lo, hi] 之内的最多 n 条，倒序。
+    没有 created_at 的行以 "" 入索引：排在最后，有时间筛选时不命中。
+    """
+    if after and after.get("created_at") is not None:
+        cursor: Optional[tuple[str, str]] = (after["created_at"], after["incident_id"])
+    else:
+        cursor = (hi, _MAX) if hi else None
+    out = _desc_after(keys, cursor, n)
+    if lo is not None or hi is not None:
+        out = [k for k in out if k[0] and (lo is None or k[0] >= lo)]
+    return out
+
+
+def _comment(row: CommentFeedItem) -> Comment:
+    return Comment(**row.model_dump(include=set(Comment.model_fields)))
+
+
+class MemoryIncidentsRepo:
+    def __init__(self) -> None:
+        self._items: dict[str, Incident] = {}
+        # (created_at, incident_id)，升序；没有 created_at 的旧数据记为 ""，倒序时排在最后
+        self._by_created: list[tuple[str, str]] = []
+        self.calls = 0
+
+    def _index(self, it: Incident) -> None:
+        bisect.insort(self._by_created, (it.created_at or "", it.incident_id))
+
+    def _unindex(self, it: Incident) -> None:
+        key = (it.created_at or "", it.incident_id)
+        i = bisect.bisect_left(self._by_created, key)
+        if i < len(self._by_created) and self._by_created[i] == key:
+            del self._by_created[i]
+
+    async def list_incidents(self, limit: Optional[int] = None) -> list[Incident]:
+        self.calls += 1
+        items = list(self._items.values())
+        return items if limit is None else items[:limit]
+
+    async def list_in_bbox(self, bbox: BBox) -> list[Incident]:
+        self.calls += 1
+        return [it for it in self._items.values() if bbox.contains(it.lat, it.lng)]
+
+    async def scan_incidents(
+        self,
+        limit: int = 500,
+        start_key: Optional[PageKey] = None,
+    ) -> tuple[list[Incident], Optional[PageKey]]:
+        self.calls += 1
+        ids = sorted(self._items)
+        lo = bisect.bisect_right(ids, start_key["incident_id"]) if start_key else 0
+        page = ids[lo : lo + limit]
+        last_key = {"incident_id": page[-1]} if lo + limit < len(ids) else None
+        return [self._items[i] for i in page], last_key
+
+    def iter_incidents(self, page_size: int = 500) -> AsyncIterator[list[Incident]]:
+        return iter_scan(self.scan_incidents, page_size)
+
+    async def query_by_created(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 20,
+        start_key: Optional[PageKey] = None,
+        predicate: Optional[Callable[[Incident], bool]] = None,
+    ) -> tuple[list[Incident], Optional[PageKey]]:
+        lo, hi = time_range(start, end)
+
+        async def fetch(after: Optional[PageKey], n: int) -> list[Incident]:
+            self.calls += 1
+            return [self._items[i] for _, i in _time_keys_desc(self._by_created, after, lo, hi, n)]
+
+        return await page_desc(
+            fetch,
+            lambda it: {"incident_id": it.incident_id, "created_at": it.created_at or ""},
+            limit=limit,
+            start_key=start_key,
+            predicate=predicate,
+        )
+
+    async def bulk_load(self, incidents: Iterable[Incident]) -> int:
+        """批量导入（压测造数据用）：最后统一排序一次，不逐条 insort。"""
+        n = 0
+        for it in incidents:
+            self._items[it.incident_id] = it
+            self._by_created.append((it.created_at or "", it.incident_id))
+            n += 1
+        self._by_created.sort()
+        return n
+
+    async def backfill_index_attrs(self) -> int:
+        return 0  # 索引随写入维护，没有需要补的
+
+    async def get(self, incident_id: str) -> Optional[Incident]:
+        self.calls += 1
+        return self._items.get(incident_id)
+
+    async def create_incident(self, incident: Incident) -> Incident:
+        self.calls += 1
+        if incident.incident_id in self._items:
+            raise ValueError("incident already exists")
+        self._items[incident.incident_id] = incident
+        self._index(incident)
+        return incident
+
+    async def create_incidents(self, incidents: list[Incident]) -> list[Incident]:
+        self.calls += 1
+        created = []
+        for it in incidents:
+            if it.incident_id not in self._items:
+                self._items[it.incident_id] = it
+                self._index(it)
+                created.append(it)
+        return created
+
+    async def update_title(self, incident_id: str, title: str) -> Incident:
+        self.calls += 1
+        old = self._items.get(incident_id)
+        if old is None:
+            raise KeyError("incident not found")
+        it = old.model_copy(update={"title": title})
+        self._items[incident_id] = it
+        return it
+
+    async def add_comment_count(
+        self, incident_id: str, delta: int, last_comment_at: Optional[str] = None
+    ) -> Optional[Incident]:
+        self.calls += 1
+        old = self._items.get(incident_id)
+        if old is None or old.comment_count + delta < 0:
+            return None
+        update: dict = {"comment_count": old.comment_count + delta}
+        if last_comment_at is not None:
+            update["last_comment_at"] = last_comment_at
+        it = self._items[incident_id] = old.model_copy(update=update)
+        return it
+
+    async def set_comment_stats(
+        self,
+        incident_id: str,
+        count: int,
+        last_comment_at: Optional[str],
+        expected_count: Optional[int] = None,
+    ) -> Optional[Incident]:
+        self.calls += 1
+        old = self._items.get(incident_id)
+        if old is None or (expected_count is not None and old.comment_count != expected_count):
+            return None
+        it = self._items[incident_id] = old.model_copy(
+            update={"comment_count": count, "last_comment_at": last_comment_at}
+        )
+        return it
+
+    async def delete(self, incident_id: str) -> None:
+        self.calls += 1
+        it = self._items.pop(incident_id, None)
+        if it is not None:
+            self._unindex(it)
+
+
+class MemoryCommentsRepo:
+    def __init__(self) -> None:
+        self._rows: dict[tuple[str, str], CommentFeedItem] = {}
+        # 主键序 (incident_id, created_at) 和时间序 (created_at, incident_id)，都是升序
+        self._by_pk: list[tuple[str, str]] = []
+        self._by_created: list[tuple[str, str]] = []
+        self.calls = 0
+
+    async def add(self, comment: Comment, incident: Optional[Incident] = None) -> Comment:
+        self.calls += 1
+        if not comment.incident_id or not comment.created_at:
+            raise ValueError("Comment must include incident_id and created_at.")
+        key = (comment.incident_id, comment.created_at)
+        if key in self._rows:
+            raise ValueError("comment already exists")
+
+        row = CommentFeedItem(**comment.model_dump())
+        if incident is not None:
+            row.incident_lng, row.incident_lat, row.incident_title = incident.lng, incident.lat, incident.title
+        self._rows[key] = row
+        bisect.insort(self._by_pk, key)
+        bisect.insort(self._by_created, (comment.created_at, comment.incident_id))
+        return comment
+
+    async def bulk_load(self, rows: Iterable[tuple[Comment, Optional[Incident]]]) -> int:
+        """批量导入（压测造数据用）：最后统一排序一次，不逐条 insort。"""
+        n = 0
+        for comment, incident in rows:
+            row = CommentFeedItem(**comment.model_dump())
+            if incident is not None:
+                row.incident_lng, row.incident_lat, row.incident_title = incident.lng, incident.lat, incident.title
+            key = (comment.incident_id, comment.created_at)
+            self._rows[key] = row
+            self._by_pk.append(key)
+            self._by_created.append((comment.created_at, comment.incident_id))
+            n += 1
+        self._by_pk.sort()
+        self._by_created.sort()
+        return n
+
+    async def list_by_incident(
+        self,
+        incident_id: str,
+        limit: int = 200,
+        start_key: Optional[PageKey] = None,
+        newest_first: bool = False,
+    ) -> list[Comment]:
+        items, _ = await self.list_page_by_incident(
+            incident_id, limit=limit, start_key=start_key, newest_first=newest_first
+        )
+        return items
+
+    def _incident_keys(self, incident_id: str) -> list[tuple[str, str]]:
+        lo = bisect.bisect_left(self._by_pk, (incident_id, ""))
+        hi = bisect.bisect_left(self._by_pk, (incident_id, _MAX))
+        return self._by_pk[lo:hi]
+
+    async def list_page_by_incident(
+        self,
+        incident_id: str,
+        limit: int = 200,
+        start_key: Optional[PageKey] = None,
+        newest_first: bool = False,
+    ) -> tuple[list[Comment], Optional[PageKey]]:
+        self.calls += 1
+        keys = self._incident_keys(incident_id)
+        if newest_first:
+            keys.reverse()
+        if start_key:
+            after = (start_key["incident_id"], start_key["created_at"])
+            keys = [k for k in keys if (k < after if newest_first else k > after)]
+
+        page = keys[:limit]
+        items = [_comment(self._rows[k]) for k in page]
+        last_key = {"incident_id": page[-1][0], "created_at": page[-1][1]} if len(keys) > limit else None
+        return items, last_key
+
+    async def scan_comments(
+        self,
+        limit: int = 500,
+        start_key: Optional[PageKey] = None,
+    ) -> tuple[list[Comment], Optional[PageKey]]:
+        self.calls += 1
+        lo = 0
+        if start_key:
+            lo = bisect.bisect_right(self._by_pk, (start_key["incident_id"], start_key["created_at"]))
+        page = self._by_pk[lo : lo + limit]
+        items = [_comment(self._rows[k]) for k in page]
+        last_key = {"incident_id": page[-1][0], "created_at": page[-1][1]} if lo + limit < len(self._by_pk) else None
+        return items, last_key
+
+    def iter_comments(self, page_size: int = 500) -> AsyncIterator[list[Comment]]:
+        return iter_scan(self.scan_comments, page_size)
+
+    async def query_by_created(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 20,
+        start_key: Optional[PageKey] = None,
+        predicate: Optional[Callable[[CommentFeedItem], bool]] = None,
+    ) -> tuple[list[CommentFeedItem], Optional[PageKey]]:
+        lo, hi = time_range(start, end)
+
+        async def fetch(after: Optional[PageKey], n: int) -> list[CommentFeedItem]:
+            self.calls += 1
+            return [self._rows[(i, c)] for c, i in _time_keys_desc(self._by_created, after, lo, hi, n)]
+
+        return await page_desc(
+            fetch,
+            lambda c: {"incident_id": c.incident_id, "created_at": c.created_at},
+            limit=limit,
+            start_key=start_key,
+            predicate=predicate,
+        )
+
+    async def set_incident_title(self, incident_id: str, title: str) -> int:
+        self.calls += 1
+        keys = self._incident_keys(incident_id)
+        for k in keys:
+            self._rows[k].incident_title = title
+        return len(keys)
+
+    async def backfill_index_attrs(self, lookup: Callable[[str], Optional[Incident]]) -> int:
+        updated = 0
+        for row in self._rows.values():
+            if row.incident_lat is None:
+                inc = lookup(row.incident_id)
+                if inc is not None:
+                    row.incident_lng, row.incident_lat, row.incident_title = inc.lng, inc.lat, inc.title
+                    updated += 1
+        return updated
+
+    async def update_content(self, incident_id: str, created_at: str, content: str) -> None:
+        self.calls += 1
+        row = self._rows.get((incident_id, created_at))
+        if row is not None:
+            row.content = content
+
+    async def delete(self, incident_id: str, created_at: str) -> bool:
+        self.calls += 1
+        key = (incident_id, created_at)
+        if self._rows.pop(key, None) is None:
+            return False
+        del self._by_pk[bisect.bisect_left(self._by_pk, key)]
+        del self._by_created[bisect.bisect_left(self._by_created, (created_at, incident_id))]
+        return True
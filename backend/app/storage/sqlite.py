@@ -0,0 +1,478 @@
+"""
+SQLite 存储：单文件（或 :memory:），不依赖 AWS。
+- incidents：R*Tree 空间索引（bbox 查询，按显式的 id 列关联）+ (created_at, incident_id) 索引（控制台时间分页）
+- comments：主键 (incident_id, created_at) + (created_at, incident_id) 索引
+整行存 JSON（data 列），需要查询的字段单独成列。
+
+sqlite3 是同步的：所有语句在一个专用线程上串行执行（一个连接，不用锁）。
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, Optional, Sequence, TypeVar
+
+from app.shared.geo import BBox
+from app.shared.types import Comment, CommentFeedItem, Incident
+from .base import PageKey, iter_scan, page_desc, time_range
+
+T = TypeVar("T")
+
+SCHEMA = """
+-- id 是 R*Tree 关联用的整数键：必须显式声明 INTEGER PRIMARY KEY（rowid 的别名），
+-- 否则 TEXT 主键表的隐式 rowid 在 VACUUM 时可能被重新编号，R*Tree 就对不上了
+CREATE TABLE IF NOT EXISTS incidents (
+    id INTEGER PRIMARY KEY,
+    incident_id TEXT NOT NULL UNIQUE,
+    lat REAL NOT NULL,
+    lng REAL NOT NULL,
+    created_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS incidents_created ON incidents (created_at, incident_id)
+    WHERE created_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS incidents_untimed ON incidents (incident_id) WHERE created_at IS NULL;
+CREATE VIRTUAL TABLE IF NOT EXISTS incidents_rtree USING rtree (id, lat_min, lat_max, lng_min, lng_max);
+
+CREATE TABLE IF NOT EXISTS comments (
+    incident_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (incident_id, created_at)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS comments_created ON comments (created_at, incident_id);
+"""
+
+
+def _dumps(model: Any) -> str:
+    return json.dumps(model.model_dump(), ensure_ascii=False)
+
+
+class SqliteDB:
+    def __init__(self, path: str = ":memory:") -> None:
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.calls = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            _migrate_incidents_id(conn)
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """在 SQLite 线程上执行 fn(conn)。"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self.calls += 1
+        return await asyncio.get_running_loop().run_in_executor(self._executor, lambda: fn(self._connection()))
+
+    async def transaction(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        def _tx(conn: sqlite3.Connection) -> T:
+            conn.execute("BEGIN")
+            try:
+                out = fn(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return out
+
+        return await self.run(_tx)
+
+    async def fetchall(self, sql: str, params: Sequence[Any] = ()) -> list[tuple]:
+        return await self.run(lambda conn: conn.execute(sql, params).fetchall())
+
+    async def fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        return await self.run(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        return await self.run(lambda conn: conn.execute(sql, params).rowcount)
+
+    async def aclose(self) -> None:
+        if self._executor is not None:
+            if self._conn is not None:
+                await self.run(lambda conn: conn.close())
+                self._conn = None
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def _time_where(
+    after: Optional[PageKey], lo: Optional[str], hi: Optional[str], id_col: str
+) -> tuple[str, list[Any]]:
+    where = ["created_at IS NOT NULL"]
+    params: list[Any] = []
+    if after and after.get("created_at"):
+        where.append(f"(created_at, {id_col}) < (?, ?)")
+        params += [after["created_at"], after[id_col]]
+    if lo:
+        where.append("created_at >= ?")
+        params.append(lo)
+    if hi:
+        where.append("created_at <= ?")
+        params.append(hi)
+    return " AND ".join(where), params
+
+
+def _migrate_incidents_id(conn: sqlite3.Connection) -> None:
+    """老库的 incidents 没有 id 列（R*Tree 关联的是隐式 rowid）：重建表并按新 id 重建 R*Tree。"""
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(incidents)")]
+    if not cols or "id" in cols:
+        return
+    conn.executescript(
+        """
+        BEGIN;
+        ALTER TABLE incidents RENAME TO incidents_old;
+        DROP INDEX IF EXISTS incidents_created;
+        DROP INDEX IF EXISTS incidents_untimed;
+        """
+        + SCHEMA
+        + """
+        INSERT INTO incidents (incident_id, lat, lng, created_at, data)
+            SELECT incident_id, lat, lng, created_at, data FROM incidents_old ORDER BY rowid;
+        DROP TABLE incidents_old;
+        DELETE FROM incidents_rtree;
+        INSERT INTO incidents_rtree (id, lat_min, lat_max, lng_min, lng_max)
+            SELECT id, lat, lat, lng, lng FROM incidents;
+        COMMIT;
+        """
+    )
+
+
+def _insert_incident(conn: sqlite3.Connection, it: Incident) -> None:
+    cur = conn.execute(
+        "INSERT INTO incidents (incident_id, lat, lng, created_at, data) VALUES (?, ?, ?, ?, ?)",
+        (it.incident_id, it.lat, it.lng, it.created_at, _dumps(it)),
+    )
+    conn.execute(
+        "INSERT INTO incidents_rtree (id, lat_min, lat_max, lng_min, lng_max) VALUES (?, ?, ?, ?, ?)",
+        (cur.lastrowid, it.lat, it.lat, it.lng, it.lng),
+    )
+
+
+class SqliteIncidentsRepo:
+    def __init__(self, db: SqliteDB) -> None:
+        self._db = db
+
+    async def list_incidents(self, limit: Optional[int] = None) -> list[Incident]:
+        sql = "SELECT data FROM incidents ORDER BY id"
+        rows = await self._db.fetchall(sql + " LIMIT ?", (limit,)) if limit is not None else await self._db.fetchall(sql)
+        return [Incident.model_validate_json(r[0]) for r in rows]
+
+    async def list_in_bbox(self, bbox: BBox) -> list[Incident]:
+        rows = await self._db.fetchall(
+            "SELECT i.data FROM incidents_rtree r JOIN incidents i ON i.id = r.id"
+            " WHERE r.lat_max >= ? AND r.lat_min <= ? AND r.lng_max >= ? AND r.lng_min <= ?",
+            (bbox.lat_min, bbox.lat_max, bbox.lng_min, bbox.lng_max),
+        )
+        # R*Tree 用 float32 存边界（向外取整），再按原始坐标精确过滤一次
+        items = [Incident.model_validate_json(r[0]) for r in rows]
+        return [it for it in items if bbox.contains(it.lat, it.lng)]
+
+    async def scan_incidents(
+        self,
+        limit: int = 500,
+        start_key: Optional[PageKey] = None,
+    ) -> tuple[list[Incident], Optional[PageKey]]:
+        where, params = "1", []
+        if start_key:
+            where, params = "incident_id > ?", [start_key["incident_id"]]
+        rows = await self._db.fetchall(
+            f"SELECT data FROM incidents WHERE {where} ORDER BY incident_id LIMIT ?", (*params, limit + 1)
+        )
+        items = [Incident.model_validate_json(r[0]) for r in rows[:limit]]
+        return items, ({"incident_id": items[-1].incident_id} if len(rows) > limit else None)
+
+    def iter_incidents(self, page_size: int = 500) -> AsyncIterator[list[Incident]]:
+        return iter_scan(self.scan_incidents, page_size)
+
+    async def query_by_created(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 20,
+        start_key: Optional[PageKey] = None,
+        predicate: Optional[Callable[[Incident], bool]] = None,
+    ) -> tuple[list[Incident], Optional[PageKey]]:
+        lo, hi = time_range(start, end)
+
+        async def fetch(after: Optional[PageKey], n: int) -> list[Incident]:
+            rows: list[Any] = []
+            # created_at == "" 的游标：已经翻到没有时间的那段
+            if not (after and after.get("created_at") == ""):
+                where, params = _time_where(after, lo, hi, "incident_id")
+                rows = await self._db.fetchall(
+                    f"SELECT data FROM incidents WHERE {where} ORDER BY created_at DESC, incident_id DESC LIMIT ?",
+                    (*params, n),
+                )
+                after = None
+            if len(rows) < n and lo is None and hi is None:
+                # 没有时间筛选：没有 created_at 的旧数据接在最后
+                where, params = "created_at IS NULL", []
+                if after:
+                    where += " AND incident_id < ?"
+                    params.append(after["incident_id"])
+                rows += await self._db.fetchall(
+                    f"SELECT data FROM incidents WHERE {where} ORDER BY incident_id DESC LIMIT ?",
+                    (*params, n - len(rows)),
+                )
+            return [Incident.model_validate_json(r[0]) for r in rows]
+
+        return await page_desc(
+            fetch,
+            lambda it: {"incident_id": it.incident_id, "created_at": it.created_at or ""},
+            limit=limit,
+            start_key=start_key,
+            predicate=predicate,
+        )
+
+    async def bulk_load(self, incidents: Iterable[Incident]) -> int:
+        """批量导入（压测造数据用）：一个事务 + executemany，R*Tree 最后按新行的 id 一条 INSERT ... SELECT 补上。"""
+
+        def _load(conn: sqlite3.Connection) -> int:
+            start = conn.execute("SELECT coalesce(max(id), 0) FROM incidents").fetchone()[0]
+            cur = conn.executemany(
+                "INSERT INTO incidents (incident_id, lat, lng, created_at, data) VALUES (?, ?, ?, ?, ?)",
+                ((it.incident_id, it.lat, it.lng, it.created_at, _dumps(it)) for it in incidents),
+            )
+            conn.execute(
+                "INSERT INTO incidents_rtree (id, lat_min, lat_max, lng_min, lng_max)"
+                " SELECT id, lat, lat, lng, lng FROM incidents WHERE id > ?",
+                (start,),
+            )
+            return cur.rowcount
+
+        return await self._db.transaction(_load)
+
+    async def backfill_index_attrs(self) -> int:
+        return 0  # 索引随写入维护，没有需要补的
+
+    async def get(self, incident_id: str) -> Optional[Incident]:
+        row = await self._db.fetchone("SELECT data FROM incidents WHERE incident_id = ?", (incident_id,))
+        return Incident.model_validate_json(row[0]) if row else None
+
+    async def create_incident(self, incident: Incident) -> Incident:
+        try:
+            await self._db.transaction(lambda conn: _insert_incident(conn, incident))
+        except sqlite3.IntegrityError:
+            raise ValueError("incident already exists")
+        return incident
+
+    async def create_incidents(self, incidents: list[Incident]) -> list[Incident]:
+        def _insert_all(conn: sqlite3.Connection) -> list[Incident]:
+            created = []
+            for it in incidents:
+                try:
+                    _insert_incident(conn, it)
+                except sqlite3.IntegrityError:
+                    continue
+                created.append(it)
+            return created
+
+        return await self._db.transaction(_insert_all)
+
+    async def update_title(self, incident_id: str, title: str) -> Incident:
+        rows = await self._db.fetchall(
+            "UPDATE incidents SET data = json_set(data, '$.title', ?) WHERE incident_id = ? RETURNING data",
+            (title, incident_id),
+        )
+        if not rows:
+            raise KeyError("incident not found")
+        return Incident.model_validate_json(rows[0][0])
+
+    async def add_comment_count(
+        self, incident_id: str, delta: int, last_comment_at: Optional[str] = None
+    ) -> Optional[Incident]:
+        # 单条 UPDATE，读改写在 SQLite 里完成，不会丢并发的加减
+        row = await self._db.fetchone(
+            "UPDATE incidents SET data = json_set(data,"
+            " '$.comment_count', coalesce(json_extract(data, '$.comment_count'), 0) + ?,"
+            " '$.last_comment_at', coalesce(?, json_extract(data, '$.last_comment_at')))"
+            " WHERE incident_id = ? AND coalesce(json_extract(data, '$.comment_count'), 0) + ? >= 0"
+            " RETURNING data",
+            (delta, last_comment_at, incident_id, delta),
+        )
+        return Incident.model_validate_json(row[0]) if row else None
+
+    async def set_comment_stats(
+        self,
+        incident_id: str,
+        count: int,
+        last_comment_at: Optional[str],
+        expected_count: Optional[int] = None,
+    ) -> Optional[Incident]:
+        sql = (
+            "UPDATE incidents SET data = json_set(data, '$.comment_count', ?, '$.last_comment_at', ?)"
+            " WHERE incident_id = ?"
+        )
+        params: list[Any] = [count, last_comment_at, incident_id]
+        if expected_count is not None:
+            sql += " AND coalesce(json_extract(data, '$.comment_count'), 0) = ?"
+            params.append(expected_count)
+        row = await self._db.fetchone(sql + " RETURNING data", params)
+        return Incident.model_validate_json(row[0]) if row else None
+
+    async def delete(self, incident_id: str) -> None:
+        def _delete(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "DELETE FROM incidents_rtree WHERE id = (SELECT id FROM incidents WHERE incident_id = ?)",
+                (incident_id,),
+            )
+            conn.execute("DELETE FROM incidents WHERE incident_id = ?", (incident_id,))
+
+        await self._db.transaction(_delete)
+
+
+class SqliteCommentsRepo:
+    def __init__(self, db: SqliteDB) -> None:
+        self._db = db
+
+    async def add(self, comment: Comment, incident: Optional[Incident] = None) -> Comment:
+        if not comment.incident_id or not comment.created_at:
+            raise ValueError("Comment must include incident_id and created_at.")
+        row = CommentFeedItem(**comment.model_dump())
+        if incident is not None:
+            row.incident_lng, row.incident_lat, row.incident_title = incident.lng, incident.lat, incident.title
+        try:
+            await self._db.execute(
+                "INSERT INTO comments (incident_id, created_at, data) VALUES (?, ?, ?)",
+                (comment.incident_id, comment.created_at, _dumps(row)),
+            )
+        except sqlite3.IntegrityError:
+            raise ValueError("comment already exists")
+        return comment
+
+    async def bulk_load(self, rows: Iterable[tuple[Comment, Optional[Incident]]]) -> int:
+        """批量导入（压测造数据用）：一个事务 + executemany。"""
+
+        def _params() -> Iterator[tuple[str, str, str]]:
+            for comment, incident in rows:
+                row = CommentFeedItem(**comment.model_dump())
+                if incident is not None:
+                    row.incident_lng, row.incident_lat, row.incident_title = incident.lng, incident.lat, incident.title
+                yield comment.incident_id, comment.created_at, _dumps(row)
+
+        return await self._db.transaction(
+            lambda conn: conn.executemany(
+                "INSERT INTO comments (incident_id, created_at, data) VALUES (?, ?, ?)", _params()
+            ).rowcount
+        )
+
+    async def list_by_incident(
+        self,
+        incident_id: str,
+        limit: int = 200,
+        start_key: Optional[PageKey] = None,
+        newest_first: bool = False,
+    ) -> list[Comment]:
+        items, _ = await self.list_page_by_incident(
+            incident_id, limit=limit, start_key=start_key, newest_first=newest_first
+        )
+        return items
+
+    async def list_page_by_incident(
+        self,
+        incident_id: str,
+        limit: int = 200,
+        start_key: Optional[PageKey] = None,
+        newest_first: bool = False,
+    ) -> tuple[list[Comment], Optional[PageKey]]:
+        where, params = "incident_id = ?", [incident_id]
+        if start_key:
+            where += " AND created_at < ?" if newest_first else " AND created_at > ?"
+            params.append(start_key["created_at"])
+        order = "DESC" if newest_first else "ASC"
+        rows = await self._db.fetchall(
+            f"SELECT data FROM comments WHERE {where} ORDER BY created_at {order} LIMIT ?", (*params, limit + 1)
+        )
+        items = [Comment.model_validate_json(r[0]) for r in rows[:limit]]
+        last_key = {"incident_id": incident_id, "created_at": items[-1].created_at} if len(rows) > limit else None
+        return items, last_key
+
+    async def scan_comments(
+        self,
+        limit: int = 500,
+        start_key: Optional[PageKey] = None,
+    ) -> tuple[list[Comment], Optional[PageKey]]:
+        where, params = "1", []
+        if start_key:
+            where, params = "(incident_id, created_at) > (?, ?)", [start_key["incident_id"], start_key["created_at"]]
+        rows = await self._db.fetchall(
+            f"SELECT data FROM comments WHERE {where} ORDER BY incident_id, created_at LIMIT ?", (*params, limit + 1)
+        )
+        items = [Comment.model_validate_json(r[0]) for r in rows[:limit]]
+        last = items[-1] if len(rows) > limit else None
+        return items, ({"incident_id": last.incident_id, "created_at": last.created_at} if last else None)
+
+    def iter_comments(self, page_size: int = 500) -> AsyncIterator[list[Comment]]:
+        return iter_scan(self.scan_comments, page_size)
+
+    async def query_by_created(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 20,
+        start_key: Optional[PageKey] = None,
+        predicate: Optional[Callable[[CommentFeedItem], bool]] = None,
+    ) -> tuple[list[CommentFeedItem], Optional[PageKey]]:
+        lo, hi = time_range(start, end)
+
+        async def fetch(after: Optional[PageKey], n: int) -> list[CommentFeedItem]:
+            where, params = _time_where(after, lo, hi, "incident_id")
+            rows = await self._db.fetchall(
+                f"SELECT data FROM comments WHERE {where} ORDER BY created_at DESC, incident_id DESC LIMIT ?",
+                (*params, n),
+            )
+            return [CommentFeedItem.model_validate_json(r[0]) for r in rows]
+
+        return await page_desc(
+            fetch,
+            lambda c: {"incident_id": c.incident_id, "created_at": c.created_at},
+            limit=limit,
+            start_key=start_key,
+            predicate=predicate,
+        )
+
+    async def set_incident_title(self, incident_id: str, title: str) -> int:
+        return await self._db.execute(
+            "UPDATE comments SET data = json_set(data, '$.incident_title', ?) WHERE incident_id = ?",
+            (title, incident_id),
+        )
+
+    async def backfill_index_attrs(self, lookup: Callable[[str], Optional[Incident]]) -> int:
+        rows = await self._db.fetchall(
+            "SELECT incident_id, created_at FROM comments WHERE json_extract(data, '$.incident_lat') IS NULL"
+        )
+        updated = 0
+        for incident_id, created_at in rows:
+            inc = lookup(incident_id)
+            if inc is None:
+                continue
+            updated += await self._db.execute(
+                "UPDATE comments SET data = json_set(data, '$.incident_lng', ?, '$.incident_lat', ?, '$.incident_title', ?)"
+                " WHERE incident_id = ? AND created_at = ?",
+                (inc.lng, inc.lat, inc.title, incident_id, created_at),
+            )
+        return updated
+
+    async def update_content(self, incident_id: str, created_at: str, content: str) -> None:
+        await self._db.execute(
+            "UPDATE comments SET data = json_set(data, '$.content', ?) WHERE incident_id = ? AND created_at = ?",
+            (content, incident_id, created_at),
+        )
+
+    async def delete(self, incident_id: str, created_at: str) -> bool:
+        n = await self._db.execute(
+            "DELETE FROM comments WHERE incident_id = ? AND created_at = ?", (incident_id, created_at)
+        )
+        return n > 0
@@ -0,0 +1 @@
+"""接口级压测：python -m bench.run --help"""
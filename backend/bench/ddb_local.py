@@ -0,0 +1,75 @@
+"""
+本地 DynamoDB 替身：moto server（真 HTTP，aiobotocore 的原生 async 路径也能走）+ 和线上一样的两张表。
+压测（python -m bench.run --backend ddb）和测试（tests/conftest.py 的 ddb_tables / ddb_endpoint）共用。
+
+需要 requirements-dev.txt 里的 moto[dynamodb,server]。
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+from typing import Any
+
+
+def _s(name: str) -> dict:
+    return {"AttributeName": name, "AttributeType": "S"}
+
+
+def _key(hash_key: str, range_key: str = "") -> list[dict]:
+    schema = [{"AttributeName": hash_key, "KeyType": "HASH"}]
+    if range_key:
+        schema.append({"AttributeName": range_key, "KeyType": "RANGE"})
+    return schema
+
+
+def create_tables(ddb: Any) -> None:
+    """和线上一样的两张表 + GSI（ddb 是 boto3 的 dynamodb resource）。已存在的表跳过。"""
+    existing = {t.name for t in ddb.tables.all()}
+    time_gsi = {
+        "IndexName": "created-index",
+        "KeySchema": _key("ts_bucket", "created_at"),
+        "Projection": {"ProjectionType": "ALL"},
+    }
+    incidents = os.environ.get("DDB_INCIDENTS_TABLE", "FriendlyPetMapIncidents")
+    comments = os.environ.get("DDB_COMMENTS_TABLE", "FriendlyPetMapComments")
+    if incidents not in existing:
+        ddb.create_table(
+            TableName=incidents,
+            KeySchema=_key("incident_id"),
+            AttributeDefinitions=[_s("incident_id"), _s("gh_cell"), _s("geohash"), _s("ts_bucket"), _s("created_at")],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "geohash-index",
+                    "KeySchema": _key("gh_cell", "geohash"),
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+                time_gsi,
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+    if comments not in existing:
+        ddb.create_table(
+            TableName=comments,
+            KeySchema=_key("incident_id", "created_at"),
+            AttributeDefinitions=[_s("incident_id"), _s("created_at"), _s("ts_bucket")],
+            GlobalSecondaryIndexes=[time_gsi],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+
+def start_moto_server(region: str) -> tuple[Any, str]:
+    """在本进程的线程里起一个 moto server 并建好表，返回 (server, endpoint_url)；用完调 server.stop()。"""
+    import boto3
+    from moto.server import ThreadedMotoServer
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    # werkzeug 默认每个请求打一行 access log
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    url = f"http://127.0.0.1:{port}"
+    create_tables(boto3.resource("dynamodb", region_name=region, endpoint_url=url))
+    return server, url
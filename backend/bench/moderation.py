@@ -0,0 +1,101 @@
+"""
+文本审核最坏输入压测：每条规则构造回溯最重的输入，看耗时是否随长度线性增长。
+
+    cd backend
+    python -m bench.moderation              # 长度 250/500/1000/2000
+    python -m bench.moderation --max-ms 5   # 任一输入超过 5ms，或增长明显超线性，退出码为 1
+
+legacy 列是改造前的威胁正则（A.{0,12}B.{0,12}C，嵌套回溯），只对威胁类输入有意义，用来对照。
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+import time
+from typing import Callable
+
+os.environ.setdefault("APP_JWT_SECRET", "bench")
+
+from app.shared import text_safety  # noqa: E402
+
+_legacy_threat = re.compile(
+    text_safety._intent + r".{0,12}" + text_safety._violence_verb + r".{0,12}" + text_safety._target,
+    re.IGNORECASE,
+)
+
+
+def _fill(unit: str, n: int) -> str:
+    return (unit * (n // len(unit) + 1))[:n]
+
+
+# 名字 -> 按长度生成输入
+CASES: dict[str, Callable[[int], str]] = {
+    "threat.intent_verb_no_target": lambda n: _fill("我要杀", n),
+    "threat.dense_gaps": lambda n: _fill("去去去去去去杀杀杀杀杀杀", n),
+    "threat.verbs_only": lambda n: _fill("弄死打死下毒", n),
+    "wechat.sep_run": lambda n: "微" + _fill("-·.|~", n - 1),
+    "wechat.kw_repeat": lambda n: _fill("微-.-.-", n),
+    "wechat.latin_sep": lambda n: _fill("w-.-v_._", n),
+    "cta.no_id": lambda n: _fill("加我私信", n),
+    "cta.with_seps": lambda n: _fill("加" + "-" * 30, n),
+    "id.long_words": lambda n: _fill("abcdefghijklmnopqrs ", n),
+    "url.long": lambda n: "http://" + _fill("a", n - 7),
+    "digits.long": lambda n: _fill("1", n),
+    "benign.cn": lambda n: _fill("今天在小区门口发现有人扔了可疑的食物，大家遛狗注意一下。", n),
+}
+
+
+def _best_ms(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench.moderation", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lengths", default="250,500,1000,2000")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--max-ms", type=float, default=5.0, help="单次判定的耗时上限")
+    ap.add_argument("--max-growth", type=float, default=2.0, help="允许的超线性倍数：t(最长)/t(最短) <= 长度比 * 该值")
+    args = ap.parse_args(argv)
+
+    lengths = [int(x) for x in args.lengths.split(",")]
+    ratio = lengths[-1] / lengths[0]
+    failed = False
+
+    print(f"{'case':<30}" + "".join(f"{n:>10}" for n in lengths) + f"{'growth':>10}{'legacy':>10}")
+    for name, make in CASES.items():
+        times = []
+        for n in lengths:
+            s = make(n)
+
+            def check() -> None:
+                text_safety._verdicts.clear()  # 不让缓存掩盖真实耗时
+                text_safety.validate_text(s, min_len=1, max_len=n)
+
+            times.append(_best_ms(check, args.repeat))
+
+        growth = times[-1] / max(times[0], 1e-6)
+        legacy = ""
+        if name.startswith("threat."):
+            legacy = f"{_best_ms(lambda: _legacy_threat.search(make(lengths[-1])), args.repeat):.3f}"
+        bad = max(times) > args.max_ms or growth > ratio * args.max_growth
+        failed |= bad
+        print(
+            f"{name:<30}"
+            + "".join(f"{t:>10.3f}" for t in times)
+            + f"{growth:>10.1f}{legacy:>10}"
+            + ("  FAIL" if bad else "")
+        )
+
+    print(f"(ms, best of {args.repeat}; growth = t({lengths[-1]}) / t({lengths[0]}), linear = {ratio:.0f})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
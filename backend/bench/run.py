@@ -0,0 +1,357 @@
+"""
+接口级压测：本地存储（memory / sqlite / ddb）造数据，固定并发打 FastAPI app（进程内 ASGI，不走网络），
+输出每个场景的 p50/p90/p99、RPS、每请求存储调用次数、被合并的请求数；可以和保存的基线对比。
+
+    cd backend
+    python -m bench.run                                   # memory，5 万点位 / 50 万留言
+    python -m bench.run --backend sqlite --incidents 5000 --comments 50000
+    python -m bench.run --backend ddb --incidents 5000 --comments 50000    # 进程内 moto server
+    python -m bench.run --backend ddb --ddb-endpoint http://localhost:8000  # 外部 DynamoDB Local
+    python -m bench.run --only console --requests 100
+    python -m bench.run --save bench/baseline.json        # 保存基线
+    python -m bench.run --baseline bench/baseline.json    # 对比，退步时退出码为 1
+
+不同机器的绝对延迟没有可比性：基线要在同一台机器（或同一规格的 CI runner）上生成。
+ddb 后端走真实的 DynamoDB 代码路径（parallel_scan / 时间索引 / geohash 覆盖查询 / batch_put），
+但进程内的 moto server 和被测 app 抢同一份 CPU、延迟也远不是真 DynamoDB：看存储调用次数和相对变化，别看绝对值。
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Optional
+
+# 先设环境变量再 import app（settings 在 import 时读取）
+os.environ.setdefault("APP_JWT_SECRET", "bench")
+os.environ.setdefault("CONSOLE_TOKEN", "bench")
+# 压测期间不要让后台刷新混进来
+os.environ.setdefault("INCIDENTS_SNAPSHOT_REFRESH_SECONDS", "3600")
+# ddb 后端连的是本地替身，凭证/表名随便给
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("AWS_REGION", "ap-northeast-2")
+os.environ.setdefault("AWS_DEFAULT_REGION", os.environ["AWS_REGION"])
+os.environ.setdefault("DDB_INCIDENTS_TABLE", "FriendlyPetMapIncidents")
+os.environ.setdefault("DDB_COMMENTS_TABLE", "FriendlyPetMapComments")
+
+CONSOLE_HEADERS = {"Authorization": f"Bearer {os.environ['CONSOLE_TOKEN']}"}
+
+# 一个场景 = 名字 + 生成第 i 个请求的函数 (method, url, params, json)
+Request = tuple[str, str, dict[str, Any], Optional[dict[str, Any]]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    group: str
+    make: Callable[[random.Random], Request]
+    headers: Optional[dict[str, str]] = None
+
+
+@dataclass
+class Result:
+    requests: int
+    errors: int
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+    rps: float
+    calls_per_req: float
+    coalesced: int
+
+
+def _viewport(rnd: random.Random, incidents: list, span: float) -> dict[str, float]:
+    it = rnd.choice(incidents)
+    return {
+        "lat_min": round(it.lat - span / 2, 5),
+        "lat_max": round(it.lat + span / 2, 5),
+        "lng_min": round(it.lng - span / 2, 5),
+        "lng_max": round(it.lng + span / 2, 5),
+    }
+
+
+def scenarios(incidents: list) -> list[Scenario]:
+    from bench.seed import COMMENTS, TITLES
+
+    def inc_id(rnd: random.Random) -> str:
+        return rnd.choice(incidents).incident_id
+
+    def bbox_str(rnd: random.Random, span: float) -> str:
+        v = _viewport(rnd, incidents, span)
+        return f"{v['lng_min']},{v['lat_min']},{v['lng_max']},{v['lat_max']}"
+
+    return [
+        Scenario("incidents.all", "public", lambda r: ("GET", "/fpm-api/incidents", {}, None)),
+        Scenario("incidents.bbox", "public", lambda r: ("GET", "/fpm-api/incidents", _viewport(r, incidents, 0.05), None)),
+        Scenario(
+            "incidents.clusters",
+            "public",
+            lambda r: ("GET", "/fpm-api/incidents/clusters", {"zoom": r.randint(4, 14), "bbox": bbox_str(r, 0.5)}, None),
+        ),
+        Scenario(
+            "incidents.tile",
+            "public",
+            lambda r: ("GET", "/fpm-api/incidents/tiles/{}/{}/{}.mvt".format(*_tile(r, incidents)), {}, None),
+        ),
+        Scenario("comments.list", "public", lambda r: ("GET", "/fpm-api/comments", {"incident_id": inc_id(r), "limit": 50}, None)),
+        Scenario(
+            "comments.multi",
+            "public",
+            lambda r: (
+                "GET",
+                "/fpm-api/comments",
+                {"incident_ids": ",".join(inc_id(r) for _ in range(8)), "limit_per": 20},
+                None,
+            ),
+        ),
+        Scenario(
+            "comments.create",
+            "write",
+            lambda r: ("POST", "/fpm-api/comments", {}, {"incident_id": inc_id(r), "content": "压测留言"}),
+        ),
+        Scenario(
+            "console.incidents",
+            "console",
+            lambda r: ("GET", "/fpm-api/console/incidents", {"page": 1, "page_size": 20}, None),
+            CONSOLE_HEADERS,
+        ),
+        Scenario(
+            "console.incidents.cursor",
+            "console",
+            lambda r: ("GET", "/fpm-api/console/incidents", {"page_size": 20, "cursor": ""}, None),
+            CONSOLE_HEADERS,
+        ),
+        Scenario(
+            "console.incidents.q",
+            "console",
+            lambda r: ("GET", "/fpm-api/console/incidents", {"page_size": 20, "cursor": "", "q": "毒"}, None),
+            CONSOLE_HEADERS,
+        ),
+        Scenario(
+            "console.incidents.page.q",
+            "console",
+            lambda r: ("GET", "/fpm-api/console/incidents", {"page": 1, "page_size": 20, "q": r.choice(TITLES)}, None),
+            CONSOLE_HEADERS,
+        ),
+        Scenario(
+            "console.comments",
+            "console",
+            lambda r: ("GET", "/fpm-api/console/comments", {"page": 1, "page_size": 20}, None),
+            CONSOLE_HEADERS,
+        ),
+        Scenario(
+            "console.comments.cursor",
+            "console",
+            lambda r: ("GET", "/fpm-api/console/comments", {"page_size": 20, "cursor": ""}, None),
+            CONSOLE_HEADERS,
+        ),
+        Scenario(
+            "console.comments.q",
+            "console",
+            lambda r: ("GET", "/fpm-api/console/comments", {"page": 1, "page_size": 20, "q": r.choice(COMMENTS)}, None),
+            CONSOLE_HEADERS,
+        ),
+    ]
+
+
+def _tile(rnd: random.Random, incidents: list) -> tuple[int, int, int]:
+    from app.modules.incidents.tiles import tile_of
+
+    it = rnd.choice(incidents)
+    z = rnd.randint(8, 16)
+    x, y = tile_of(it.lat, it.lng, z)
+    return z, x, y
+
+
+def _pct(sorted_ms: list[float], p: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    i = min(len(sorted_ms) - 1, max(0, int(round(p / 100 * len(sorted_ms))) - 1))
+    return sorted_ms[i]
+
+
+async def run_scenario(client, container, sc: Scenario, n: int, concurrency: int, seed: int) -> Result:
+    rnd = random.Random(seed)
+    reqs = [sc.make(rnd) for _ in range(n)]
+    latencies: list[float] = []
+    errors = 0
+    it = iter(reqs)
+
+    async def worker() -> None:
+        nonlocal errors
+        for method, url, params, body in it:
+            t0 = time.perf_counter()
+            req = client.build_request(method, url, params=params, json=body, headers=sc.headers)
+            resp = await client.send(req, stream=True)
+            # 只读原始字节、不解压：测的是服务端（含压缩），不是压测进程自己解 gzip 的时间
+            async for _ in resp.aiter_raw():
+                pass
+            await resp.aclose()
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if resp.status_code >= 400:
+                errors += 1
+
+    calls0, coalesced0 = container.storage_calls(), container.coalesced()
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    calls = container.storage_calls() - calls0
+    coalesced = container.coalesced() - coalesced0
+
+    latencies.sort()
+    return Result(
+        requests=n,
+        errors=errors,
+        p50_ms=round(statistics.median(latencies), 3),
+        p90_ms=round(_pct(latencies, 90), 3),
+        p99_ms=round(_pct(latencies, 99), 3),
+        max_ms=round(latencies[-1], 3),
+        rps=round(n / elapsed, 1),
+        calls_per_req=round(calls / n, 2),
+        coalesced=coalesced,
+    )
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """退步：p99 变慢 / RPS 下降超过 tolerance，或每请求存储调用变多。"""
+    problems: list[str] = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if cur["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            problems.append(f"{name}: p99 {base['p99_ms']}ms -> {cur['p99_ms']}ms")
+        if cur["rps"] < base["rps"] / (1 + tolerance):
+            problems.append(f"{name}: rps {base['rps']} -> {cur['rps']}")
+        if cur["calls_per_req"] > base["calls_per_req"] + 0.01:
+            problems.append(f"{name}: storage calls/req {base['calls_per_req']} -> {cur['calls_per_req']}")
+        if cur["errors"] > base.get("errors", 0):
+            problems.append(f"{name}: errors {base.get('errors', 0)} -> {cur['errors']}")
+    return problems
+
+
+def _print_table(results: dict[str, dict], baseline: Optional[dict[str, dict]]) -> None:
+    cols = ("p50_ms", "p90_ms", "p99_ms", "max_ms", "rps", "calls_per_req", "coalesced", "errors")
+    print(f"{'scenario':<26}" + "".join(f"{c:>14}" for c in cols))
+    for name, r in results.items():
+        print(f"{name:<26}" + "".join(f"{r[c]:>14}" for c in cols))
+        base = (baseline or {}).get(name)
+        if base:
+            print(f"{'  baseline':<26}" + "".join(f"{base.get(c, '-'):>14}" for c in cols))
+
+
+async def main(argv: Optional[list[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench.run", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--backend", choices=("memory", "sqlite", "ddb"), default="memory")
+    ap.add_argument("--sqlite-path", default=":memory:")
+    ap.add_argument("--ddb-endpoint", help="ddb 后端连这个 endpoint（表不存在时自动建）；不给就在进程内起 moto server")
+    ap.add_argument("--incidents", type=int, default=50_000)
+    ap.add_argument("--comments", type=int, default=500_000)
+    ap.add_argument("--requests", type=int, default=500, help="每个场景的请求数")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--warmup", type=int, default=20, help="每个场景正式计时前的请求数")
+    ap.add_argument("--only", help="只跑名字或分组包含该字符串的场景（逗号分隔）")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--accept-encoding", default="gzip, br", help='请求的 Accept-Encoding（"identity" = 不压缩）')
+    ap.add_argument("--save", help="结果写入 JSON（可作为基线）")
+    ap.add_argument("--baseline", help="对比的基线 JSON")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="允许的 p99/RPS 退步比例")
+    args = ap.parse_args(argv)
+
+    os.environ["STORAGE_BACKEND"] = "dynamodb" if args.backend == "ddb" else args.backend
+    os.environ["SQLITE_PATH"] = args.sqlite_path
+    moto_server = None
+    if args.backend == "ddb":
+        from bench import ddb_local
+
+        if args.ddb_endpoint:
+            import boto3
+
+            ddb_local.create_tables(
+                boto3.resource("dynamodb", region_name=os.environ["AWS_REGION"], endpoint_url=args.ddb_endpoint)
+            )
+            os.environ["DDB_ENDPOINT_URL"] = args.ddb_endpoint
+        else:
+            moto_server, os.environ["DDB_ENDPOINT_URL"] = ddb_local.start_moto_server(os.environ["AWS_REGION"])
+    try:
+        return await _run(args)
+    finally:
+        if moto_server is not None:
+            moto_server.stop()
+
+
+async def _run(args: argparse.Namespace) -> int:
+    import httpx
+
+    from app.main import app
+    from bench.seed import seed
+
+    container = app.state.container
+    t0 = time.perf_counter()
+    incidents = await seed(container, args.incidents, args.comments, seed=args.seed)
+    print(f"seeded {args.incidents} incidents / {args.comments} comments on {args.backend} in {time.perf_counter() - t0:.1f}s")
+
+    selected = scenarios(incidents)
+    if args.only:
+        keys = [k.strip() for k in args.only.split(",") if k.strip()]
+        selected = [s for s in selected if any(k in s.name or k == s.group for k in keys)]
+
+    results: dict[str, dict] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        # 等快照和留言搜索索引第一次加载完，之后的请求才是稳态
+        search = container.comment_search
+        search_settled = lambda: search.ready or search.over_capacity or search.refresh_seconds <= 0  # noqa: E731
+        while not (container.incidents_snapshot.ready and search_settled()):
+            await asyncio.sleep(0.05)
+        async with httpx.AsyncClient(
+            transport=transport,
+            base_url="http://bench",
+            timeout=None,
+            headers={"Accept-Encoding": args.accept_encoding},
+        ) as client:
+            for sc in selected:
+                if args.warmup:
+                    await run_scenario(client, container, sc, args.warmup, min(args.concurrency, args.warmup), args.seed + 1)
+                r = await run_scenario(client, container, sc, args.requests, args.concurrency, args.seed)
+                results[sc.name] = asdict(r)
+                print(f"  {sc.name}: p50={r.p50_ms}ms p99={r.p99_ms}ms rps={r.rps}", file=sys.stderr)
+
+    meta = {
+        k: getattr(args, k)
+        for k in ("backend", "incidents", "comments", "requests", "concurrency", "seed", "accept_encoding")
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            saved = json.load(f)
+        baseline = saved["results"]
+        diff = {k: (saved.get("meta", {}).get(k), v) for k, v in meta.items() if saved.get("meta", {}).get(k) != v}
+        if diff:
+            print(f"WARNING baseline was recorded with different settings: {diff}")
+
+    _print_table(results, baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"saved {args.save}")
+
+    if baseline is not None:
+        problems = compare(results, baseline, args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,44 @@
+"""
+测试默认跑在内存后端上，不需要 AWS；DynamoDB 相关的用 moto 模拟
+（ddb_tables 进程内拦截 botocore；ddb_endpoint 起 moto server，测 aiobotocore 路径）。
+
+    cd backend && pip install -r requirements-dev.txt && python -m pytest -q
+"""
+import os
+
+# 必须在 import app 之前：settings 在导入时读取环境变量
+os.environ.setdefault("APP_JWT_SECRET", "test-secret")
+os.environ.setdefault("CONSOLE_TOKEN", "test-console-token")
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("AWS_REGION", "ap-northeast-2")
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-northeast-2")
+os.environ.setdefault("DDB_INCIDENTS_TABLE", "FriendlyPetMapIncidents")
+os.environ.setdefault("DDB_COMMENTS_TABLE", "FriendlyPetMapComments")
+
+import boto3
+import pytest
+
+from bench.ddb_local import create_tables, start_moto_server
+
+
+@pytest.fixture
+def ddb_tables():
+    """moto 进程内模拟（拦截 botocore）：只能配 DynamoDB(use_async=False) 用。"""
+    moto = pytest.importorskip("moto")
+    with moto.mock_aws():
+        ddb = boto3.resource("dynamodb", region_name=os.environ["AWS_REGION"])
+        create_tables(ddb)
+        yield ddb
+
+
+@pytest.fixture
+def ddb_endpoint():
+    """moto server（真 HTTP）：aiobotocore 的原生 async 路径也能测。返回 endpoint_url。"""
+    pytest.importorskip("moto.server")  # 需要 moto[server]
+    server, url = start_moto_server(os.environ["AWS_REGION"])
+    try:
+        yield url
+    finally:
+        server.stop()
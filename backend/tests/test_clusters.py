@@ -0,0 +1,167 @@
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.container import Container
+from app.main import app
+from app.modules.incidents.clusters import ClusterIndex, _grid_size, parse_bbox_param
+from app.modules.incidents.snapshot import IncidentsSnapshot
+from app.shared.geo import BBox, mercator_xy
+from app.shared.types import Incident
+from app.storage import MemoryIncidentsRepo
+
+
+def _incident(i: int, lat: float, lng: float) -> Incident:
+    return Incident(incident_id=f"i{i}", lat=lat, lng=lng, title="t", created_at="2026-01-01T00:00:00+00:00")
+
+
+def _brute(points: dict[str, tuple[float, float]], zoom: int) -> dict:
+    n = _grid_size(zoom)
+    cells = defaultdict(list)
+    for incident_id, (lat, lng) in points.items():
+        x, y = mercator_xy(lat, lng)
+        cells[(int(x * n), int(y * n))].append((incident_id, lat, lng))
+    out = {}
+    for members in cells.values():
+        lats = [m[1] for m in members]
+        lngs = [m[2] for m in members]
+        out[frozenset(m[0] for m in members)] = (
+            round(sum(lats) / len(lats), 9),
+            round(sum(lngs) / len(lngs), 9),
+            (min(lngs), min(lats), max(lngs), max(lats)),
+        )
+    return out
+
+
+def _clusters(index: ClusterIndex, zoom: int) -> list:
+    # 中心是增量维护的累加和，删改多了有浮点误差：比到 9 位小数
+    return sorted((c.count, round(c.lat, 9), round(c.lng, 9), tuple(c.bounds)) for c in index.query(zoom))
+
+
+def _expected(points: dict, zoom: int) -> list:
+    return sorted((len(ids), lat, lng, bounds) for ids, (lat, lng, bounds) in _brute(points, zoom).items())
+
+
+def test_per_zoom_aggregation_matches_brute_force_under_updates():
+    rnd = random.Random(3)
+    index = ClusterIndex()
+    live: dict[str, Incident] = {}
+    for step in range(800):
+        r = rnd.random()
+        if live and r < 0.2:
+            old = live.pop(rnd.choice(sorted(live)))
+            index.apply(old, None)
+        elif live and r < 0.35:
+            old = live[rnd.choice(sorted(live))]
+            new = _incident(int(old.incident_id[1:]), rnd.uniform(30, 32), rnd.uniform(120, 122))
+            live[new.incident_id] = new
+            index.apply(old, new)
+        else:
+            it = _incident(step, rnd.uniform(30, 32), rnd.uniform(120, 122))
+            live[it.incident_id] = it
+            index.apply(None, it)
+
+    points = {it.incident_id: (it.lat, it.lng) for it in live.values()}
+    for zoom in (0, 4, 8, 12, 16):
+        got = index.query(zoom)
+        assert sum(c.count for c in got) == len(live)
+        assert _clusters(index, zoom) == _expected(points, zoom)
+        for c in got:
+            if c.count == 1:
+                it = live[c.incident_id]
+                assert (c.lat, c.lng) == pytest.approx((it.lat, it.lng))
+            else:
+                assert c.incident_id is None
+    # zoom 超过上限按最大级别算
+    assert _clusters(index, 30) == _expected(points, 16)
+
+
+def test_parse_bbox_splits_at_antimeridian_and_clamps_poles():
+    assert parse_bbox_param("120,30,122,32") == [BBox(30, 32, 120, 122)]
+    assert parse_bbox_param("170,-10,-170,10") == [BBox(-10, 10, 170, 180), BBox(-10, 10, -180, -170)]
+    assert parse_bbox_param("170,-10,190,10") == [BBox(-10, 10, 170, 180), BBox(-10, 10, -180, -170)]
+    assert parse_bbox_param("-190,-10,-170,10") == [BBox(-10, 10, 170, 180), BBox(-10, 10, -180, -170)]
+    assert parse_bbox_param("-200,-95,400,95") == [BBox(-90, 90, -180, 180)]
+    for bad in ("1,2,3", "0,10,1,5", "nan,0,1,1"):
+        with pytest.raises(ValueError):
+            parse_bbox_param(bad)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    container = Container(backend="memory")
+    points = [
+        (0, 0.5, 179.5), (1, -0.5, -179.5), (2, 0.0, 0.0),  # 日界线两侧 + 本初子午线
+        (3, 89.9, 10.0), (4, -89.9, 10.0), (5, 84.0, 10.0),  # 两极（墨卡托截在 ±85.05）
+    ]
+
+    async def seed():
+        for i, lat, lng in points:
+            await container.incidents_repo.create_incident(_incident(i, lat, lng))
+
+    asyncio.run(seed())
+    monkeypatch.setattr(app.state, "container", container)
+    with TestClient(app) as c:
+        deadline = time.time() + 5
+        while not container.incidents_snapshot.ready:
+            assert time.time() < deadline
+            time.sleep(0.01)
+        yield c, container
+
+
+def _ids(client: TestClient, zoom: int, bbox: str) -> list[str]:
+    resp = client.get("/incidents/clusters", params={"zoom": zoom, "bbox": bbox})
+    assert resp.status_code == 200
+    return sorted(c["incident_id"] for c in resp.json()["items"])
+
+
+def test_route_bbox_across_antimeridian_and_poles(client):
+    c, container = client
+    for bbox in ("179,-1,-179,1", "179,-1,181,1", "-181,-1,-179,1"):
+        assert _ids(c, 12, bbox) == ["i0", "i1"]
+    assert _ids(c, 12, "-1,-1,1,1") == ["i2"]
+    assert _ids(c, 12, "9,80,11,90") == ["i3", "i5"]
+    assert _ids(c, 12, "9,-90,11,-80") == ["i4"]
+    # 快照没就绪时的临时聚合走同样的拆分
+    container.incidents_snapshot.ready = False
+    assert _ids(c, 12, "179,-1,-179,1") == ["i0", "i1"]
+    assert c.get("/incidents/clusters", params={"zoom": 3, "bbox": "0,10,1,5"}).status_code == 400
+
+
+def test_clusters_follow_snapshot_refresh():
+    """快照刷新（版本号变化）时聚类跟着增量更新，不会留着旧的计数。"""
+
+    async def run():
+        repo = MemoryIncidentsRepo()
+        snapshot = IncidentsSnapshot(repo, refresh_seconds=0)
+        index = ClusterIndex()
+        snapshot.subscribe(index.apply)
+        await repo.create_incident(_incident(0, 31.2, 121.4))
+        await repo.create_incident(_incident(1, 31.2001, 121.4001))
+        await snapshot.refresh()
+        v = snapshot.version
+        assert [c.count for c in index.query(10)] == [2]
+
+        # 其它副本写入 / 删除 / 移动：下一次 refresh 之后可见
+        await repo.create_incident(_incident(2, 31.2002, 121.4002))
+        await snapshot.refresh()
+        assert snapshot.version > v and [c.count for c in index.query(10)] == [3]
+
+        await repo.delete(_incident(0, 0, 0).incident_id)
+        await snapshot.refresh()
+        assert [c.count for c in index.query(10)] == [2]
+
+        snapshot.upsert(_incident(1, -33.9, 151.2))
+        assert sorted(c.count for c in index.query(10)) == [1, 1]
+        assert sum(c.count for c in index.query(0)) == 2
+
+        await snapshot.refresh()  # 没变化：版本不动，聚类不动
+        v = snapshot.version
+        await snapshot.refresh()
+        assert snapshot.version == v and sum(c.count for c in index.query(10)) == 2
+
+    asyncio.run(run())
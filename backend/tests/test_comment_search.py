@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.modules.comments.search import CommentSearchIndex
+from app.shared.types import Comment
+from app.storage import MemoryCommentsRepo
+
+
+def _comment(i: int, content: str, minutes_ago: int = 0) -> Comment:
+    created_at = (datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)).isoformat()
+    return Comment(comment_id=f"c{i}", incident_id=f"i{i % 7}", content=content, created_at=created_at)
+
+
+class _CountingRepo(MemoryCommentsRepo):
+    def __init__(self) -> None:
+        super().__init__()
+        self.full_scans = 0
+
+    def iter_comments(self, page_size: int = 500):
+        self.full_scans += 1
+        return super().iter_comments(page_size)
+
+
+def _ids(index: CommentSearchIndex, q: str) -> set[str]:
+    return {c.comment_id for c in index.search(q)}
+
+
+def test_incremental_writes_and_catch_up_without_full_rescan():
+    async def run():
+        repo = _CountingRepo()
+        await repo.add(_comment(0, "门口草丛有药", minutes_ago=60))
+        index = CommentSearchIndex(repo, refresh_seconds=60)
+        await index.rebuild()
+        assert index.ready and _ids(index, "草丛") == {"c0"}
+        # 只存 id 和内容，不存 Comment 对象
+        assert all(isinstance(v, str) for v in index._ids.values())
+
+        # 本进程写入：就地更新
+        mine = await repo.add(_comment(1, "草丛里有只猫"))
+        index.add(mine)
+        index.update(mine.incident_id, mine.created_at, "换了内容 PARK")
+        assert _ids(index, "草丛") == {"c0"} and _ids(index, "park") == {"c1"}
+        hit = index.search("park")[0]
+        assert (hit.incident_id, hit.created_at, hit.content) == (mine.incident_id, mine.created_at, "换了内容 PARK")
+
+        # 其它副本写的：追增量只读时间索引上新的一段
+        await repo.add(_comment(2, "另一台机器写的草丛"))
+        assert await index.catch_up() == 1
+        assert await index.catch_up() == 0
+        assert _ids(index, "草丛") == {"c0", "c2"}
+
+        index.remove(mine.incident_id, mine.created_at)
+        assert _ids(index, "park") == set()
+        assert repo.full_scans == 1
+
+    asyncio.run(run())
+
+
+def test_reconcile_picks_up_other_replicas_deletes():
+    async def run():
+        repo = _CountingRepo()
+        gone = await repo.add(_comment(0, "草丛"))
+        await repo.add(_comment(1, "草丛"))
+        index = CommentSearchIndex(repo)
+        await index.reconcile()
+        await repo.delete(gone.incident_id, gone.created_at)  # 另一台机器删的
+        assert _ids(index, "草丛") == {"c0", "c1"}
+        await asyncio.gather(index.reconcile(), index.reconcile())
+        assert _ids(index, "草丛") == {"c1"}
+        assert repo.full_scans == 2  # 并发的 reconcile 只跑一次
+
+    asyncio.run(run())
+
+
+def test_over_capacity_disables_index():
+    async def run():
+        repo = MemoryCommentsRepo()
+        for i in range(5):
+            await repo.add(_comment(i, "草丛"))
+        index = CommentSearchIndex(repo, max_docs=5)
+        await index.rebuild()
+        assert index.ready and len(index) == 5
+
+        index.add(_comment(5, "草丛"))
+        assert not index.ready and index.over_capacity and len(index) == 0
+
+        small = CommentSearchIndex(repo, max_docs=3)
+        await small.rebuild()
+        assert not small.ready and small.over_capacity and len(small) == 0
+
+    asyncio.run(run())
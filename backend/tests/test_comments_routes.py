@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.container import Container
+from app.main import app
+from app.shared.config import settings
+from app.shared.types import Comment
+
+
+@pytest.fixture
+def client(monkeypatch):
+    container = Container(backend="memory")
+
+    async def seed():
+        for inc, n in (("a", 5), ("b", 2), ("c", 0)):
+            for i in range(n):
+                await container.comments_repo.add(
+                    Comment(
+                        comment_id=f"{inc}{i}",
+                        incident_id=inc,
+                        content=f"{inc} 的第 {i} 条",
+                        created_at=f"2026-01-01T00:00:{i:02d}+00:00",
+                    )
+                )
+
+    asyncio.run(seed())
+    monkeypatch.setattr(app.state, "container", container)
+    with TestClient(app) as c:
+        yield c
+
+
+def _ids(group: dict) -> list[str]:
+    return [c["comment_id"] for c in group["items"]]
+
+
+def test_multi_fetch_groups_in_request_order(client):
+    body = client.get("/comments", params={"incident_ids": "b, a,missing,b", "limit_per": 3}).json()
+    groups = body["groups"]
+    # 去重、保持请求顺序；不存在的点位给空组而不是报错
+    assert [g["incident_id"] for g in groups] == ["b", "a", "missing"]
+    assert _ids(groups[0]) == ["b0", "b1"] and groups[0]["next_cursor"] is None
+    assert _ids(groups[1]) == ["a0", "a1", "a2"]
+    assert groups[2] == {"incident_id": "missing", "items": [], "next_cursor": None}
+
+    # 超出 limit_per 的部分用单点位接口 + next_cursor 接着翻
+    rest = client.get("/comments", params={"incident_id": "a", "cursor": groups[1]["next_cursor"]}).json()
+    assert _ids(rest) == ["a3", "a4"]
+
+
+def test_multi_fetch_desc_order(client):
+    groups = client.get("/comments", params={"incident_ids": "a,c", "limit_per": 2, "order": "desc"}).json()["groups"]
+    assert _ids(groups[0]) == ["a4", "a3"]
+    assert _ids(groups[1]) == []
+    rest = client.get(
+        "/comments", params={"incident_id": "a", "order": "desc", "cursor": groups[0]["next_cursor"]}
+    ).json()
+    assert _ids(rest) == ["a2", "a1", "a0"]
+
+
+def test_multi_fetch_limits(client, monkeypatch):
+    monkeypatch.setattr(settings, "comments_multi_max_ids", 3)
+    assert client.get("/comments", params={"incident_ids": "a,b,c"}).status_code == 200
+    assert client.get("/comments", params={"incident_ids": "a,b,c,d"}).status_code == 400
+    # 去重后不超限就行
+    assert client.get("/comments", params={"incident_ids": "a,a,b,b,c"}).status_code == 200
+    assert client.get("/comments", params={"incident_ids": " , "}).status_code == 400
+    assert client.get("/comments", params={"incident_ids": "a", "limit_per": 201}).status_code == 422
+    assert client.get("/comments", params={"incident_ids": "a", "incident_id": "a"}).status_code == 400
+    assert client.get("/comments").status_code == 400
+    assert client.get("/comments", params={"incident_ids": "a", "cursor": "x"}).status_code == 400
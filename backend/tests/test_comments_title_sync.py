@@ -0,0 +1,48 @@
+import asyncio
+
+from app.modules.comments.repo import CommentsRepo
+from app.modules.comments.service import CommentsService
+from app.shared.ddb import DynamoDB
+from app.shared.types import Comment, Incident
+
+
+def test_rename_sync_runs_in_background_and_keeps_last_title(ddb_tables):
+    table = ddb_tables.Table("FriendlyPetMapComments")
+
+    async def run():
+        repo = CommentsRepo(DynamoDB(use_async=False))
+        inc = Incident(incident_id="a", lat=31.2, lng=121.4, title="old")
+        for i in range(30):
+            c = Comment(comment_id=f"c{i}", incident_id="a", content="x", created_at=f"2026-01-01T00:00:{i:02d}+00:00")
+            await repo.add(c, inc)
+        svc = CommentsService(repo)
+
+        svc.sync_incident_title("a", "mid")
+        svc.sync_incident_title("a", "new")  # 第一轮还在跑：合并成跑完后再补一轮
+        await svc.drain()
+        assert not svc._title_syncs
+
+    asyncio.run(run())
+    rows = table.scan()["Items"]
+    assert len(rows) == 30
+    assert {r["incident_title"] for r in rows} == {"new"}
+
+
+def test_title_sync_does_not_recreate_deleted_comment(ddb_tables):
+    table = ddb_tables.Table("FriendlyPetMapComments")
+    table.put_item(Item={"incident_id": "a", "created_at": "2026-01-01T00:00:00+00:00", "incident_title": "old"})
+
+    async def run():
+        repo = CommentsRepo(DynamoDB(use_async=False))
+        real_query = repo._table.query
+
+        async def query_then_delete(**kwargs):
+            resp = await real_query(**kwargs)
+            table.delete_item(Key={"incident_id": "a", "created_at": "2026-01-01T00:00:00+00:00"})
+            return resp
+
+        repo._table.query = query_then_delete
+        assert await repo.set_incident_title("a", "new") == 0
+
+    asyncio.run(run())
+    assert table.scan()["Items"] == []
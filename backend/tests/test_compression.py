@@ -0,0 +1,111 @@
+import asyncio
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.main import app
+from app.shared import compression
+from app.shared.compression import CompressionMiddleware, Precompressed, negotiate
+
+brotli = pytest.importorskip("brotli")
+
+BIG = ('{"items":[' + ",".join('{"id":%d,"title":"草丛里有药"}' % i for i in range(20000)) + "]}").encode()
+
+
+def _client() -> TestClient:
+    async def big(request):
+        return Response(BIG, media_type="application/json")
+
+    async def small(request):
+        return Response(b'{"ok":true}', media_type="application/json")
+
+    async def stream(request):
+        async def gen():
+            for i in range(3):
+                yield b'{"i":%d}\n' % i
+
+        return StreamingResponse(gen(), media_type="application/x-ndjson")
+
+    app = Starlette(routes=[Route("/big", big), Route("/small", small), Route("/stream", stream)])
+    return TestClient(CompressionMiddleware(app, min_size=1024))
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    [
+        (None, None),
+        ("", None),
+        ("gzip", "gzip"),
+        ("gzip, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("br;q=0, gzip;q=0", None),
+        ("*", "br"),
+        ("identity", None),
+        ("GZIP;q=0.8", "gzip"),
+    ],
+)
+def test_negotiate(header, expected):
+    assert negotiate(header) == expected
+
+
+@pytest.mark.parametrize("encoding,decode", [("gzip", gzip.decompress), ("br", brotli.decompress)])
+def test_middleware_round_trip(encoding, decode):
+    client = _client()
+    with client.stream("GET", "/big", headers={"Accept-Encoding": encoding}) as resp:
+        raw = b"".join(resp.iter_raw())
+    assert resp.headers["content-encoding"] == encoding
+    assert "Accept-Encoding" in resp.headers["vary"]
+    assert int(resp.headers["content-length"]) == len(raw)
+    assert decode(raw) == BIG
+
+
+def test_small_and_identity_pass_through():
+    client = _client()
+    resp = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in resp.headers and resp.content == b'{"ok":true}'
+    resp = client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in resp.headers and resp.content == BIG
+
+
+def test_streaming_response_is_compressed_incrementally():
+    with _client().stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as resp:
+        raw = b"".join(resp.iter_raw())
+    assert resp.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw) == b'{"i":0}\n{"i":1}\n{"i":2}\n'
+
+
+def test_large_bodies_compress_off_the_event_loop(monkeypatch):
+    offloaded = []
+    real = asyncio.to_thread
+
+    async def spy(fn, *args):
+        offloaded.append(len(args[0]))
+        return await real(fn, *args)
+
+    monkeypatch.setattr(compression.asyncio, "to_thread", spy)
+    client = _client()
+    client.get("/big", headers={"Accept-Encoding": "gzip"})
+    client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert offloaded == [len(BIG)]
+
+    offloaded.clear()
+    assert gzip.decompress(asyncio.run(Precompressed(BIG).get("gzip"))) == BIG
+    assert offloaded == [len(BIG)]
+
+
+def test_not_modified_has_no_content_encoding():
+    with TestClient(app) as client:
+        first = client.get("/incidents", headers={"Accept-Encoding": "gzip"})
+        assert first.status_code == 200
+        again = client.get(
+            "/incidents", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]}
+        )
+    assert again.status_code == 304
+    assert again.content == b""
+    assert "content-encoding" not in again.headers
+    assert again.headers["etag"] == first.headers["etag"]
+    assert again.headers["vary"] == "Accept-Encoding"
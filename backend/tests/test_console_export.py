@@ -0,0 +1,149 @@
+import asyncio
+import csv
+import io
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.container import Container
+from app.main import app
+from app.modules.console import routes as console_routes
+from app.shared.types import Comment, ConsoleCommentRow, Incident
+
+AUTH = {"Authorization": "Bearer test-console-token"}
+BOM = "\ufeff".encode()
+
+TITLES = ["=1+1", "+cmd|' /C calc'!A0", "-2+3", "@SUM(A1:A2)", "\t=tab", "门口草丛有药", 'a,"b"\nc']
+
+
+@pytest.fixture
+def client(monkeypatch):
+    container = Container(backend="memory")
+    incidents = [
+        Incident(
+            incident_id=f"i{i}",
+            lat=-33.9 + i,
+            lng=151.2,
+            title=title,
+            created_at=f"2026-01-0{i + 1}T00:00:00+00:00",
+        )
+        for i, title in enumerate(TITLES)
+    ]
+
+    async def seed():
+        for it in incidents:
+            await container.incidents_repo.create_incident(it)
+            for j in range(3):
+                c = Comment(
+                    comment_id=f"{it.incident_id}-c{j}",
+                    incident_id=it.incident_id,
+                    content=f"{it.title} 留言{j}",
+                    created_at=f"2026-02-0{j + 1}T00:00:00+00:00",
+                )
+                await container.comments_repo.add(c, it)
+
+    asyncio.run(seed())
+    monkeypatch.setattr(app.state, "container", container)
+    # 小块输出：走到分块的路径
+    monkeypatch.setattr(console_routes, "EXPORT_CHUNK_BYTES", 64)
+    with TestClient(app) as c:
+        deadline = time.time() + 5
+        while not container.incidents_snapshot.ready:
+            assert time.time() < deadline
+            time.sleep(0.01)
+        yield c
+
+
+def _get(client: TestClient, kind: str, **params) -> tuple[bytes, dict]:
+    resp = client.get(f"/console/export/{kind}", params=params, headers=AUTH)
+    assert resp.status_code == 200
+    return resp.content, dict(resp.headers)
+
+
+def test_ndjson_keeps_raw_values(client):
+    body, headers = _get(client, "incidents", format="ndjson")
+    assert headers["content-type"] == "application/x-ndjson"
+    assert headers["content-disposition"].startswith('attachment; filename="incidents-')
+    assert headers["cache-control"] == "no-store"
+    rows = [json.loads(line) for line in body.decode().splitlines()]
+    # NDJSON 不做公式转义：原样导出
+    assert sorted(r["title"] for r in rows) == sorted(TITLES)
+
+    body, _ = _get(client, "comments", format="ndjson", q="草丛")
+    rows = [json.loads(line) for line in body.decode().splitlines()]
+    assert sorted(r["comment_id"] for r in rows) == ["i5-c0", "i5-c1", "i5-c2"]
+    assert set(rows[0]) == set(ConsoleCommentRow.model_fields)
+
+
+def _parse_csv(body: bytes) -> list[list[str]]:
+    assert body.startswith(BOM)
+    assert body.count(BOM) == 1
+    return list(csv.reader(io.StringIO(body[len(BOM) :].decode("utf-8"), newline="")))
+
+
+def test_csv_bom_header_and_formula_guard(client):
+    body, headers = _get(client, "incidents", format="csv")
+    assert headers["content-type"] == "text/csv; charset=utf-8"
+    header, *rows = _parse_csv(body)
+    assert header == list(Incident.model_fields)
+
+    by_id = {r[header.index("incident_id")]: dict(zip(header, r)) for r in rows}
+    assert len(by_id) == len(TITLES)
+    for i, title in enumerate(TITLES):
+        row = by_id[f"i{i}"]
+        if title[:1] in ("=", "+", "-", "@", "\t"):
+            assert row["title"] == "'" + title
+        else:
+            assert row["title"] == title  # 逗号、引号、换行照常转义，往返不变
+        # 数值列不动（负数坐标不能被当成公式加引号）
+        assert float(row["lat"]) == pytest.approx(-33.9 + i)
+    assert by_id["i0"]["lat"].startswith("-")
+
+
+def test_csv_comments_guarded_and_filtered(client):
+    body, _ = _get(client, "comments", format="csv", lat_min=-33.0, lat_max=-30.0)
+    header, *rows = _parse_csv(body)
+    assert header == list(ConsoleCommentRow.model_fields)
+    got = {(r[header.index("incident_id")], r[header.index("content")], r[header.index("incident_title")]) for r in rows}
+    want = {
+        (f"i{i}", ("'" if TITLES[i][:1] in "=+-@\t" else "") + f"{TITLES[i]} 留言{j}", ("'" if TITLES[i][:1] in "=+-@\t" else "") + TITLES[i])
+        for i in (1, 2, 3)
+        for j in range(3)
+    }
+    assert got == want
+
+
+def test_export_requires_token(client):
+    assert client.get("/console/export/incidents").status_code == 401
+    assert client.get("/console/export/incidents", params={"format": "xlsx"}, headers=AUTH).status_code == 422
+
+
+def test_writers_stream_in_chunks(monkeypatch):
+    """TestClient 会把响应收齐，分块直接看生成器：BOM 只在第一块，拼起来和一次写完一样。"""
+    rows = [
+        Incident(incident_id=f"i{i}", lat=1.0, lng=2.0, title=TITLES[i % len(TITLES)]) for i in range(50)
+    ]
+
+    async def collect(gen) -> list[bytes]:
+        return [chunk async for chunk in gen]
+
+    async def source():
+        for r in rows:
+            yield r
+
+    fields = list(Incident.model_fields)
+    monkeypatch.setattr(console_routes, "EXPORT_CHUNK_BYTES", 10**9)
+    whole_csv = asyncio.run(collect(console_routes._csv(source(), fields)))
+    whole_nd = asyncio.run(collect(console_routes._ndjson(source())))
+    assert len(whole_csv) == len(whole_nd) == 1
+
+    monkeypatch.setattr(console_routes, "EXPORT_CHUNK_BYTES", 256)
+    chunks = asyncio.run(collect(console_routes._csv(source(), fields)))
+    assert len(chunks) > 5
+    assert chunks[0].startswith(BOM) and not any(BOM in c for c in chunks[1:])
+    assert b"".join(chunks) == whole_csv[0]
+    nd = asyncio.run(collect(console_routes._ndjson(source())))
+    assert len(nd) > 5 and all(c.endswith(b"\n") for c in nd)
+    assert b"".join(nd) == whole_nd[0]
@@ -0,0 +1,21 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+AUTH = {"Authorization": "Bearer test-console-token"}
+
+
+def test_stats_requires_console_token():
+    with TestClient(app) as client:
+        assert client.get("/console/stats").status_code == 401
+
+
+def test_stats_reports_counters():
+    with TestClient(app) as client:
+        client.post("/incidents", json={"lat": 31.2, "lng": 121.4, "title": "门口有药"})
+        body = client.get("/console/stats", headers=AUTH).json()
+    assert body["storage"]["backend"] == "memory"
+    assert body["moderation"]["checks"] >= 1
+    assert set(body["token_cache"]) == {"hits", "misses", "revoked"}
+    assert body["snapshot"]["ready"] and body["snapshot"]["items"] >= 1
+    assert "coalesced" in body["storage"]
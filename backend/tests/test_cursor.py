@@ -0,0 +1,23 @@
+import pytest
+
+from app.shared.cursor import decode_cursor, encode_cursor
+
+
+def test_round_trip():
+    key = {"ts_bucket": "2026-03", "created_at": "2026-03-01T00:00:00+00:00", "incident_id": "草丛-1"}
+    assert decode_cursor(encode_cursor(key)) == key
+
+
+def test_tampered_payload_rejected():
+    body, sig = encode_cursor({"ts_bucket": "2026-03"}).split(".")
+    other_body = encode_cursor({"ts_bucket": "2020-01"}).split(".")[0]
+    with pytest.raises(ValueError):
+        decode_cursor(f"{other_body}.{sig}")
+    with pytest.raises(ValueError):
+        decode_cursor(f"{body}.{sig[:-1]}A" if sig[-1] != "A" else f"{body}.{sig[:-1]}B")
+
+
+@pytest.mark.parametrize("bad", ["", "no-dot", "!!!.???", "e30"])
+def test_malformed_rejected(bad):
+    with pytest.raises(ValueError):
+        decode_cursor(bad)
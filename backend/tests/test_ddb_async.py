@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from app.modules.comments.repo import CommentsRepo
+from app.modules.incidents.repo import IncidentsRepo
+from app.shared.ddb import DynamoDB
+from app.shared.types import Comment, Incident
+
+pytest.importorskip("aiobotocore")
+
+
+def test_default_engine_is_async():
+    assert DynamoDB().mode == "async"
+
+
+def test_async_client_round_trip(ddb_endpoint):
+    async def run():
+        ddb = DynamoDB(endpoint_url=ddb_endpoint, use_async=True)
+        try:
+            incidents, comments = IncidentsRepo(ddb), CommentsRepo(ddb)
+            for i in range(25):
+                created_at = f"2026-01-{i + 1:02d}T00:00:00+00:00"
+                await incidents.create_incident(
+                    Incident(incident_id=f"i{i}", lat=31.2, lng=121.4, title="t", created_at=created_at)
+                )
+            inc = await incidents.get("i3")
+            assert inc is not None and inc.lat == 31.2
+            c = Comment(comment_id="c", incident_id="i3", content="x", created_at="2026-02-01T00:00:00+00:00")
+            await comments.add(c, inc)
+
+            assert len(await incidents.list_incidents()) == 25  # 并行分段 Scan
+            page, key = await incidents.query_by_created(limit=10)
+            assert [it.incident_id for it in page] == [f"i{i}" for i in range(24, 14, -1)]
+            assert key is not None
+
+            with pytest.raises(KeyError):
+                await incidents.update_title("missing", "x")
+            assert (await incidents.update_title("i3", "新标题")).title == "新标题"
+            assert await comments.set_incident_title("i3", "新标题") == 1
+        finally:
+            await ddb.aclose()
+        assert ddb.mode == "async"
+
+    asyncio.run(run())
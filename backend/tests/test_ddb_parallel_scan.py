@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from app.shared.ddb import DynamoDB
+
+TABLE = "FriendlyPetMapIncidents"
+N = 300
+
+
+def _fill(ddb_tables) -> None:
+    with ddb_tables.Table(TABLE).batch_writer() as w:
+        for i in range(N):
+            w.put_item(Item={"incident_id": f"i{i:03d}", "title": "t"})
+
+
+class _Spy:
+    """包一层 DynamoTable.scan：记下每段扫了几页；可以让某一段出错、某些段变慢。"""
+
+    def __init__(self, table, fail_segment=None, slow=0.0):
+        self.table, self.real = table, table.scan
+        self.fail_segment, self.slow = fail_segment, slow
+        self.pages: dict = {}
+        self.cancelled = 0
+        table.scan = self
+
+    async def __call__(self, **kwargs):
+        seg = kwargs.get("Segment")
+        self.pages[seg] = self.pages.get(seg, 0) + 1
+        if self.fail_segment is not None and seg == self.fail_segment and self.pages[seg] == 2:
+            raise RuntimeError("segment failed")
+        try:
+            if self.slow and seg != self.fail_segment:
+                await asyncio.sleep(self.slow)
+            return await self.real(**kwargs)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def _live_tasks() -> set:
+    return {t for t in asyncio.all_tasks() if t is not asyncio.current_task()}
+
+
+def test_segments_merge_into_one_stream(ddb_tables):
+    _fill(ddb_tables)
+
+    async def run():
+        table = DynamoDB(use_async=False).table(TABLE)
+        spy = _Spy(table)
+        ids = [it["incident_id"] async for page in table.parallel_scan(segments=5, concurrency=2, Limit=17) for it in page]
+        assert sorted(ids) == [f"i{i:03d}" for i in range(N)]  # 每条恰好一次
+        assert set(spy.pages) == {0, 1, 2, 3, 4}
+        assert sum(spy.pages.values()) > 5  # 各段自己翻页
+
+        # segments<=1：退回普通顺序 Scan
+        one = [it async for page in table.parallel_scan(segments=1, Limit=50) for it in page]
+        assert len(one) == N and None in spy.pages
+        assert not _live_tasks()
+
+    asyncio.run(run())
+
+
+def test_segments_merge_on_async_client(ddb_endpoint):
+    async def run():
+        ddb = DynamoDB(endpoint_url=ddb_endpoint, use_async=True)
+        try:
+            table = ddb.table(TABLE)
+            await table.batch_put([{"incident_id": f"i{i:03d}", "title": "t"} for i in range(N)])
+            ids = [it["incident_id"] async for page in table.parallel_scan(segments=4, concurrency=4, Limit=30) for it in page]
+            assert sorted(ids) == [f"i{i:03d}" for i in range(N)]
+        finally:
+            await ddb.aclose()
+
+    asyncio.run(run())
+
+
+def test_stopping_early_cancels_workers(ddb_tables):
+    """消费方拿够 limit 条就停：剩下的分段被取消，扫描页数受有界队列限制，不会读完整表。"""
+    _fill(ddb_tables)
+
+    async def run():
+        table = DynamoDB(use_async=False).table(TABLE)
+        spy = _Spy(table, slow=0.01)
+        got = []
+        stream = table.parallel_scan(segments=8, concurrency=2, Limit=5)
+        async for page in stream:
+            got += page
+            if len(got) >= 10:
+                break
+        await stream.aclose()
+        assert len(got) >= 10
+        # 总共 N/5 = 60 页；停下时最多读了：已消费的 + 队列里的(2*2) + 在途的(2)
+        assert sum(spy.pages.values()) < 20
+        assert not _live_tasks()
+
+    asyncio.run(run())
+
+
+def test_segment_error_propagates_and_cancels_others(ddb_tables):
+    _fill(ddb_tables)
+
+    async def run():
+        table = DynamoDB(use_async=False).table(TABLE)
+        spy = _Spy(table, fail_segment=1, slow=0.05)
+        with pytest.raises(RuntimeError, match="segment failed"):
+            async for _ in table.parallel_scan(segments=4, concurrency=4, Limit=10):
+                pass
+        assert spy.cancelled >= 1  # 其它还在途的分段被取消了
+        assert not _live_tasks()
+
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.container import Container
+from app.main import app
+from app.modules.auth.douyin_client import DouyinClient
+from app.shared.config import settings
+
+
+class _Douyin:
+    """假的抖音开放平台：记下收到的请求。"""
+
+    def __init__(self) -> None:
+        self.requests: list[httpx.Request] = []
+        self.transport = httpx.MockTransport(self.handle)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.url.path == "/oauth/access_token/":
+            code = request.url.params["code"]
+            return httpx.Response(200, json={"data": {"access_token": f"at-{code}", "open_id": "oid-1"}})
+        if request.url.path == "/oauth/userinfo/":
+            return httpx.Response(200, json={"data": {"nickname": "小猫", "avatar": "https://x/a.png"}})
+        return httpx.Response(404)
+
+
+def test_client_is_reused_and_userinfo_cached():
+    fake = _Douyin()
+
+    async def run():
+        client = DouyinClient(base_url="https://open.example", transport=fake.transport)
+        http = client.http
+        for _ in range(3):
+            assert (await client.get_userinfo("at", "oid-1"))["nickname"] == "小猫"
+        assert client.http is http  # 同一个连接池
+        await client.aclose()
+        assert http.is_closed and client._http is None
+        await client.aclose()  # 重复关闭无害
+
+    asyncio.run(run())
+    assert [r.url.path for r in fake.requests] == ["/oauth/userinfo/"]  # 后两次命中 userinfo 缓存
+
+
+def test_lifespan_shares_one_client_and_closes_it(monkeypatch):
+    fake = _Douyin()
+    monkeypatch.setattr(settings, "douyin_client_key", "k")
+    monkeypatch.setattr(settings, "douyin_client_secret", "s")
+
+    built: list[httpx.AsyncClient] = []
+    real_init = httpx.AsyncClient.__init__
+
+    def counting_init(self, *args, **kwargs):
+        built.append(self)
+        real_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(httpx.AsyncClient, "__init__", counting_init)
+
+    container = Container(backend="memory")
+    container.douyin = DouyinClient(base_url="https://open.example", transport=fake.transport)
+    monkeypatch.setattr(app.state, "container", container)
+    with TestClient(app) as client:
+        http = container.douyin.http  # startup 时已经建好
+        for code in ("c1", "c2"):
+            body = client.post("/auth/douyin/callback", json={"code": code}).json()
+            assert body["profile"]["nickname"] == "小猫" and body["app_token"]
+        assert container.douyin.http is http
+        # 两次登录都没有另建 AsyncClient
+        assert [c for c in built if str(c.base_url).startswith("https://open.example")] == [http]
+        assert not http.is_closed
+
+    # lifespan 退出时 Container.shutdown 关掉连接池
+    assert http.is_closed
+    assert container.douyin._http is None
+    assert [r.url.path for r in fake.requests].count("/oauth/access_token/") == 2
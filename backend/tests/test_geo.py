@@ -0,0 +1,37 @@
+import random
+
+from app.shared.geo import BBox, cover_bbox, geohash_cells, geohash_encode
+
+
+def test_geohash_encode_known_value():
+    # 公认的参考值（Wikipedia）
+    assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+
+def test_cover_bbox_contains_every_point():
+    rnd = random.Random(1)
+    for _ in range(200):
+        lat0, lng0 = rnd.uniform(-80, 80), rnd.uniform(-170, 170)
+        bbox = BBox(lat0, lat0 + rnd.uniform(0, 2), lng0, lng0 + rnd.uniform(0, 2))
+        cells = cover_bbox(bbox, 3, 6, 24)
+        if cells is None:
+            continue
+        assert len(cells) <= 24
+        for _ in range(50):
+            lat = rnd.uniform(bbox.lat_min, bbox.lat_max)
+            lng = rnd.uniform(bbox.lng_min, bbox.lng_max)
+            gh = geohash_encode(lat, lng, 9)
+            assert any(gh.startswith(c) for c in cells), (bbox, lat, lng)
+
+
+def test_cover_bbox_picks_finest_precision_within_budget():
+    bbox = BBox(31.20, 31.25, 121.45, 121.50)
+    cells = cover_bbox(bbox, 3, 6, 24)
+    assert cells is not None and len(cells) <= 24
+    p = len(cells[0])
+    if p < 6:
+        assert len(geohash_cells(bbox, p + 1)) > 24
+
+
+def test_cover_bbox_too_large_returns_none():
+    assert cover_bbox(BBox(-60, 60, -150, 150), 3, 6, 24) is None
@@ -0,0 +1,103 @@
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+from app.modules.incidents.columns import IncidentColumns, np
+from app.shared.types import Incident
+
+pytestmark = pytest.mark.skipif(np is None, reason="numpy not installed")
+
+WORDS = ["草丛", "有药", "小猫", "Park", "门口"]
+
+
+def _incident(rnd: random.Random, i: int) -> Incident:
+    # 时间故意取得很粗，制造大量同一时刻的并列（靠 id 排序）
+    created_at = None if i % 11 == 0 else f"2025-{rnd.randint(1, 3):02d}-{rnd.choice([10, 20]):02d}T00:00:00+00:00"
+    return Incident(
+        incident_id=f"i{rnd.randint(0, 10**6):07d}",
+        lat=rnd.uniform(30, 32),
+        lng=rnd.uniform(120, 122),
+        title="".join(rnd.sample(WORDS, 2)),
+        created_at=created_at,
+    )
+
+
+def _ok(it: Incident, f: dict) -> bool:
+    if not (f["lat"][0] <= it.lat <= f["lat"][1] and f["lng"][0] <= it.lng <= f["lng"][1]):
+        return False
+    if f["q"] and f["q"].lower() not in it.title.lower():
+        return False
+    if f["start"] is not None:
+        if it.created_at is None:
+            return False
+        ts = datetime.fromisoformat(it.created_at)
+        if not f["start"] <= ts <= f["end"]:
+            return False
+    return True
+
+
+def _pos(it: Incident) -> tuple[str, str]:
+    return (it.created_at or "", it.incident_id)
+
+
+def _filters(rnd: random.Random):
+    for _ in range(30):
+        lat = sorted(rnd.uniform(29.5, 32.5) for _ in range(2))
+        lng = sorted(rnd.uniform(119.5, 122.5) for _ in range(2))
+        start = datetime(2025, rnd.randint(1, 2), 15, tzinfo=timezone.utc) if rnd.random() < 0.4 else None
+        end = datetime(2025, 3, 15, tzinfo=timezone.utc) if start else None
+        yield {"lat": lat, "lng": lng, "q": rnd.choice(["", "草", "park", "小猫门"]), "start": start, "end": end}
+
+
+def _walk(cols: IncidentColumns, rows, limit: int) -> list[Incident]:
+    out, after = [], None
+    while True:
+        page = cols.page_after(rows, after, limit)
+        items = cols.items(page[:limit])
+        out += items
+        if len(page) <= limit:
+            return out
+        after = _pos(items[-1])
+
+
+def test_select_and_page_match_brute_force():
+    rnd = random.Random(25)
+    live: dict[str, Incident] = {}
+    cols = IncidentColumns(capacity=4)  # 顺带走到扩容
+    for step in range(1500):
+        if live and rnd.random() < 0.25:
+            old = live.pop(rnd.choice(sorted(live)))
+            cols.apply(old, None)
+        elif live and rnd.random() < 0.2:
+            old = live[rnd.choice(sorted(live))]
+            new = _incident(rnd, step).model_copy(update={"incident_id": old.incident_id})
+            live[old.incident_id] = new
+            cols.apply(old, new)
+        else:
+            it = _incident(rnd, step)
+            cols.apply(live.get(it.incident_id), it)
+            live[it.incident_id] = it
+
+    assert len(cols) == len(live)
+    for f in _filters(rnd):
+        want = sorted((it for it in live.values() if _ok(it, f)), key=_pos, reverse=True)
+        rows = cols.select(f["lat"][0], f["lat"][1], f["lng"][0], f["lng"][1], f["start"], f["end"], q=f["q"])
+        assert sorted(cols.items(rows), key=_pos, reverse=True) == want
+        for limit in (1, 7, 50):
+            assert _walk(cols, rows, limit) == want
+
+
+def test_page_after_bucket_only_position():
+    """只带桶的存储游标（"YYYY-MM"）= 从该月开头往前，没有时间的排在最后。"""
+    cols = IncidentColumns.build(
+        [
+            Incident(incident_id="a", lat=0, lng=0, title="t", created_at="2025-03-01T00:00:00+00:00"),
+            Incident(incident_id="b", lat=0, lng=0, title="t", created_at="2025-02-28T23:59:59+00:00"),
+            Incident(incident_id="c", lat=0, lng=0, title="t", created_at=None),
+        ]
+    )
+    rows = cols.select()
+    assert [it.incident_id for it in cols.items(cols.page_after(rows, ("2025-03", ""), 5))] == ["b", "c"]
+    assert [it.incident_id for it in cols.items(cols.page_after(rows, ("", "d"), 5))] == ["c"]
+    assert cols.page_after(rows, ("", "c"), 5) == []
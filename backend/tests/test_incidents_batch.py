@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.container import Container
+from app.main import app
+from app.shared import ddb as ddb_mod
+from app.shared.config import settings
+from app.shared.ddb import DynamoDB
+
+AUTH = {"Authorization": "Bearer test-console-token"}
+TABLE = "FriendlyPetMapIncidents"
+
+
+def _client(monkeypatch, container: Container) -> TestClient:
+    monkeypatch.setattr(app.state, "container", container)
+    return TestClient(app)
+
+
+def _valid(i: int) -> dict:
+    return {"lng": 121.4 + i * 1e-4, "lat": 31.2, "title": f"门口草丛第{i}处"}
+
+
+def test_batch_reports_each_item(monkeypatch):
+    container = Container(backend="memory")
+    items = [
+        _valid(0),
+        {"lng": 121.4, "title": "缺 lat"},
+        {"lng": "东边", "lat": 31.2, "title": "lng 不是数"},
+        _valid(3),
+        {"lng": 121.4, "lat": 31.2, "title": "加我微信 abc_123 领猫粮"},
+        {"lng": 121.4, "lat": 31.2, "title": ""},
+        _valid(6),
+    ]
+    with _client(monkeypatch, container) as client:
+        body = client.post("/incidents/batch", json={"items": items}, headers=AUTH).json()
+        listed = {it["incident_id"] for it in client.get("/incidents").json()}
+
+    assert (body["created"], body["failed"]) == (3, 4)
+    assert [r["index"] for r in body["items"]] == list(range(len(items)))
+    by_index = {r["index"]: r for r in body["items"]}
+    for i in (0, 3, 6):
+        assert by_index[i]["ok"] and by_index[i]["incident"]["title"] == items[i]["title"]
+    assert [by_index[i]["code"] for i in (1, 2, 5)] == ["INVALID"] * 3
+    assert by_index[4]["code"] == "CONTACT_OR_AD_NOT_ALLOWED"
+    assert listed == {by_index[i]["incident"]["incident_id"] for i in (0, 3, 6)}
+
+
+def test_batch_requires_console_token_and_limit(monkeypatch):
+    container = Container(backend="memory")
+    with _client(monkeypatch, container) as client:
+        assert client.post("/incidents/batch", json={"items": [_valid(0)]}).status_code == 401
+        wrong = {"Authorization": "Bearer nope"}
+        assert client.post("/incidents/batch", json={"items": [_valid(0)]}, headers=wrong).status_code == 401
+        assert client.post("/incidents/batch", json={"items": []}, headers=AUTH).status_code == 422
+
+        monkeypatch.setattr(settings, "incidents_batch_max", 3)
+        too_many = {"items": [_valid(i) for i in range(4)]}
+        assert client.post("/incidents/batch", json=too_many, headers=AUTH).status_code == 400
+        assert client.get("/incidents").json() == []
+
+
+class _Flaky:
+    """包一层 BatchWriteItem：记下每批大小；drop 里的标题按给定次数放进 UnprocessedItems。"""
+
+    def __init__(self, ddb: DynamoDB, drop: dict[str, int]) -> None:
+        self.real, self.drop = ddb.batch_write_item, drop
+        self.sizes: list[int] = []
+        ddb.batch_write_item = self
+
+    async def __call__(self, request_items):
+        ((name, reqs),) = request_items.items()
+        self.sizes.append(len(reqs))
+        keep, unprocessed = [], []
+        for r in reqs:
+            title = r["PutRequest"]["Item"]["title"]
+            if self.drop.get(title, 0) > 0:
+                self.drop[title] -= 1
+                unprocessed.append(r)
+            else:
+                keep.append(r)
+        if keep:
+            await self.real({name: keep})
+        return {"UnprocessedItems": {name: unprocessed}} if unprocessed else {}
+
+
+def test_batch_put_chunks_and_retries_unprocessed(ddb_tables, monkeypatch):
+    monkeypatch.setattr(ddb_mod, "BATCH_RETRY_BASE_SECONDS", 0)
+
+    async def run():
+        ddb = DynamoDB(use_async=False)
+        flaky = _Flaky(ddb, {"t3": 2, "t40": 1, "t59": 99})
+        items = [{"incident_id": f"i{i}", "title": f"t{i}"} for i in range(60)]
+        failed = await ddb.table(TABLE).batch_put(items, max_attempts=4)
+        return flaky.sizes, failed
+
+    sizes, failed = asyncio.run(run())
+    # 25 / 25 / 10 三批，之后只重发没处理的
+    assert sorted(sizes[:3]) == [10, 25, 25]
+    # 各批只重发自己没处理的：t3 两次、t40 一次、t59 用满剩下的 3 次
+    assert sizes[3:] == [1] * (2 + 1 + 3)
+    assert failed == [{"incident_id": "i59", "title": "t59"}]
+    stored = {it["incident_id"] for it in ddb_tables.Table(TABLE).scan()["Items"]}
+    assert stored == {f"i{i}" for i in range(59)}
+
+
+def test_batch_route_on_dynamodb_reports_write_failures(ddb_tables, monkeypatch):
+    monkeypatch.setattr(ddb_mod, "BATCH_RETRY_BASE_SECONDS", 0)
+    ddb = DynamoDB(use_async=False)
+    _Flaky(ddb, {_valid(7)["title"]: 99, _valid(8)["title"]: 1})
+    container = Container(ddb=ddb, backend="dynamodb")
+    items = [_valid(i) for i in range(30)] + [{"lng": 121.4, "lat": 31.2, "title": "加我微信 abc_123"}]
+    with _client(monkeypatch, container) as client:
+        body = client.post("/incidents/batch", json={"items": items}, headers=AUTH).json()
+
+    assert (body["created"], body["failed"]) == (29, 2)
+    by_index = {r["index"]: r for r in body["items"]}
+    assert by_index[7]["code"] == "WRITE_FAILED" and by_index[7]["incident"] is None
+    assert by_index[8]["ok"]  # 第一次没处理，重试后写进去了
+    assert by_index[30]["code"] == "CONTACT_OR_AD_NOT_ALLOWED"
+    stored = {it["incident_id"] for it in ddb_tables.Table(TABLE).scan()["Items"]}
+    assert stored == {r["incident"]["incident_id"] for r in body["items"] if r["ok"]}
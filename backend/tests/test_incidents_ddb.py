@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.modules.incidents.repo import IncidentsRepo
+from app.shared.ddb import DynamoDB
+from app.shared.geo import BBox
+from app.shared.types import Incident
+
+
+def _repo() -> IncidentsRepo:
+    # moto 只拦 botocore（同步），测试固定走线程池路径
+    return IncidentsRepo(DynamoDB(use_async=False))
+
+
+def test_rename_missing_incident_does_not_create_row(ddb_tables):
+    async def run():
+        repo = _repo()
+        await repo.create_incident(
+            Incident(incident_id="a", lat=31.2, lng=121.4, title="old", created_at="2026-01-02T00:00:00+00:00")
+        )
+        with pytest.raises(KeyError):
+            await repo.update_title("missing", "new")
+        # 没有残缺行：全表扫描仍然都能通过校验
+        items = await repo.list_incidents()
+        assert [it.incident_id for it in items] == ["a"]
+        assert await repo.get("missing") is None
+
+        renamed = await repo.update_title("a", "new")
+        assert renamed.title == "new"
+
+    asyncio.run(run())
+
+
+def test_backfill_skips_rows_without_coordinates(ddb_tables):
+    table = ddb_tables.Table("FriendlyPetMapIncidents")
+    table.put_item(Item={"incident_id": "junk", "title": "x"})
+    table.put_item(Item={"incident_id": "old", "lat": "31.2", "lng": "121.4", "title": "t"})
+
+    async def run():
+        assert await _repo().backfill_index_attrs() == 1
+
+    asyncio.run(run())
+    assert "geohash" in table.get_item(Key={"incident_id": "old"})["Item"]
+
+
+def test_list_in_bbox_matches_filter(ddb_tables):
+    async def run():
+        repo = _repo()
+        pts = [(31.20 + i * 0.01, 121.40 + i * 0.01) for i in range(20)]
+        for i, (lat, lng) in enumerate(pts):
+            await repo.create_incident(Incident(incident_id=f"p{i}", lat=lat, lng=lng, title="t"))
+        bbox = BBox(31.23, 31.30, 121.40, 121.50)
+        got = {it.incident_id for it in await repo.list_in_bbox(bbox)}
+        want = {f"p{i}" for i, (lat, lng) in enumerate(pts) if bbox.contains(lat, lng)}
+        assert got == want
+
+    asyncio.run(run())
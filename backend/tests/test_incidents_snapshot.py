@@ -0,0 +1,64 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.modules.incidents.snapshot import IncidentsSnapshot
+from app.modules.incidents.tiles import TileCache, tile_of
+from app.shared.types import Incident
+from app.storage import MemoryIncidentsRepo
+
+
+def _snapshot(*items: Incident) -> IncidentsSnapshot:
+    repo = MemoryIncidentsRepo()
+
+    async def run():
+        for it in items:
+            await repo.create_incident(it)
+        snap = IncidentsSnapshot(repo, refresh_seconds=0)
+        await snap.refresh()
+        return snap
+
+    return asyncio.run(run())
+
+
+def test_comment_stats_do_not_change_geometry_tag():
+    a = Incident(incident_id="a", lat=31.2, lng=121.4, title="t", created_at="2026-01-01T00:00:00+00:00")
+    snap = _snapshot(a)
+    version, tag = snap.version, snap.geometry_tag()
+
+    snap.upsert(a.model_copy(update={"comment_count": 3, "last_comment_at": "2026-01-02T00:00:00+00:00"}))
+    assert snap.version == version + 1  # 全量列表里有留言数，要换版本
+    assert snap.geometry_tag() == tag
+
+    snap.upsert(a.model_copy(update={"title": "new"}))
+    assert snap.geometry_tag() != tag
+
+
+def test_geometry_tag_independent_of_insertion_order():
+    a = Incident(incident_id="a", lat=31.2, lng=121.4, title="t")
+    b = Incident(incident_id="b", lat=30.0, lng=120.0, title="u")
+    assert _snapshot(a, b).geometry_tag() == _snapshot(b, a).geometry_tag()
+
+
+def test_tile_cache_keeps_tiles_on_comment_stats_change():
+    a = Incident(incident_id="a", lat=31.2, lng=121.4, title="t")
+    tiles = TileCache()
+    x, y = tile_of(a.lat, a.lng, 10)
+    tiles.put((10, x, y, "mvt"), b"tile")
+    tiles.apply(a, a.model_copy(update={"comment_count": 1}))
+    assert tiles.get((10, x, y, "mvt")) is not None
+    tiles.apply(a, a.model_copy(update={"title": "new"}))
+    assert tiles.get((10, x, y, "mvt")) is None
+
+
+def test_tile_url_stable_across_comments():
+    with TestClient(app) as client:
+        inc = client.post("/incidents", json={"lat": 31.2, "lng": 121.4, "title": "门口有药"}).json()["incident"]
+        url = client.get("/incidents/tiles.json").json()["tiles"][0]
+        etag = client.get("/incidents").headers["etag"]
+
+        comment = {"incident_id": inc["incident_id"], "content": "看到了"}
+        assert client.post("/comments", json=comment).status_code == 200
+        assert client.get("/incidents/tiles.json").json()["tiles"][0] == url
+        assert client.get("/incidents").headers["etag"] != etag
@@ -0,0 +1,79 @@
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app.modules.auth import jwt_service
+from app.modules.auth.jwt_service import (
+    clear_token_cache,
+    revoke_app_token,
+    sign_app_token,
+    token_cache_stats,
+    verify_app_token,
+)
+from app.shared.config import settings
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    clear_token_cache()
+    jwt_service._revoked.clear()
+    yield
+    clear_token_cache()
+    jwt_service._revoked.clear()
+
+
+def _rejected(token: str) -> bool:
+    try:
+        verify_app_token(token)
+    except HTTPException as e:
+        return e.status_code == 401
+    return False
+
+
+def test_cached_token_still_expires_at_exp():
+    exp = int(time.time()) + 1
+    token = jwt.encode({"sub": "u1", "exp": exp}, settings.app_jwt_secret, algorithm="HS256")
+    assert verify_app_token(token)["sub"] == "u1"
+    hits = token_cache_stats["hits"]
+    assert verify_app_token(token)["sub"] == "u1"
+    assert token_cache_stats["hits"] == hits + 1
+    # 缓存条目的过期时间不会超过 token 自己的 exp（哪怕 TTL 更长）
+    assert jwt_service._verified.get(jwt_service._digest(token))[0] <= exp
+
+    while time.time() <= exp:
+        time.sleep(0.05)
+    assert _rejected(token)
+    assert _rejected(token)  # 也没有被当成缓存命中放行
+
+
+def test_other_signature_misses_cache():
+    token = sign_app_token({"sub": "u1"})
+    assert verify_app_token(token)["sub"] == "u1"
+
+    header, payload, _ = token.split(".")
+    forged_sig = jwt.encode(jwt.decode(token, options={"verify_signature": False}), "other-secret", algorithm="HS256")
+    forged = ".".join((header, payload, forged_sig.split(".")[2]))
+    assert forged != token
+
+    misses = token_cache_stats["misses"]
+    assert _rejected(forged)
+    assert token_cache_stats["misses"] == misses + 1
+    # 原 token 的缓存不受影响
+    assert verify_app_token(token)["sub"] == "u1"
+
+
+def test_revoked_token_rejected_even_if_cached():
+    token = sign_app_token({"sub": "u1"})
+    verify_app_token(token)
+    revoke_app_token(token)
+    assert _rejected(token)
+
+
+def test_clear_cache_after_secret_rotation(monkeypatch):
+    token = sign_app_token({"sub": "u1"})
+    verify_app_token(token)
+    monkeypatch.setattr(settings, "app_jwt_secret", "rotated-secret")
+    clear_token_cache()
+    assert _rejected(token)
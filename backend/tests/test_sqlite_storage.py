@@ -0,0 +1,75 @@
+import asyncio
+import random
+import sqlite3
+
+from app.shared.geo import BBox
+from app.shared.types import Incident
+from app.storage import SqliteDB, SqliteIncidentsRepo
+
+
+def _incidents(n: int, seed: int = 3) -> list[Incident]:
+    rnd = random.Random(seed)
+    return [
+        Incident(incident_id=f"i{i:04d}", lat=rnd.uniform(30, 32), lng=rnd.uniform(120, 122), title="t")
+        for i in range(n)
+    ]
+
+
+async def _check_bboxes(repo: SqliteIncidentsRepo, alive: list[Incident]) -> None:
+    rnd = random.Random(9)
+    for _ in range(30):
+        lat, lng = rnd.uniform(30, 32), rnd.uniform(120, 122)
+        bbox = BBox(lat, lat + 0.5, lng, lng + 0.5)
+        got = sorted(it.incident_id for it in await repo.list_in_bbox(bbox))
+        assert got == sorted(it.incident_id for it in alive if bbox.contains(it.lat, it.lng))
+
+
+def test_bbox_survives_deletes_and_vacuum(tmp_path):
+    async def run():
+        db = SqliteDB(str(tmp_path / "t.db"))
+        repo = SqliteIncidentsRepo(db)
+        incidents = _incidents(400)
+        assert await repo.bulk_load(incidents[:300]) == 300
+        for it in incidents[300:]:
+            await repo.create_incident(it)
+        for it in incidents[::3]:
+            await repo.delete(it.incident_id)
+        await db.execute("VACUUM")
+        await _check_bboxes(repo, [it for i, it in enumerate(incidents) if i % 3])
+        await db.aclose()
+
+    asyncio.run(run())
+
+
+def test_migrates_table_without_id_column(tmp_path):
+    path = str(tmp_path / "old.db")
+    incidents = _incidents(50)
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE incidents (incident_id TEXT PRIMARY KEY, lat REAL NOT NULL, lng REAL NOT NULL,
+                                created_at TEXT, data TEXT NOT NULL);
+        CREATE INDEX incidents_created ON incidents (created_at, incident_id) WHERE created_at IS NOT NULL;
+        CREATE VIRTUAL TABLE incidents_rtree USING rtree (id, lat_min, lat_max, lng_min, lng_max);
+        """
+    )
+    for it in incidents:
+        cur = conn.execute(
+            "INSERT INTO incidents (incident_id, lat, lng, created_at, data) VALUES (?, ?, ?, ?, ?)",
+            (it.incident_id, it.lat, it.lng, None, it.model_dump_json()),
+        )
+        # 模拟 VACUUM 之后 rowid 与 R*Tree 错位
+        conn.execute(
+            "INSERT INTO incidents_rtree VALUES (?, ?, ?, ?, ?)", (cur.lastrowid + 7, it.lat, it.lat, it.lng, it.lng)
+        )
+    conn.commit()
+    conn.close()
+
+    async def run():
+        db = SqliteDB(path)
+        repo = SqliteIncidentsRepo(db)
+        await _check_bboxes(repo, incidents)
+        assert [it.incident_id for it in await repo.list_incidents()] == [it.incident_id for it in incidents]
+        await db.aclose()
+
+    asyncio.run(run())
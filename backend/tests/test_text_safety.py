@@ -0,0 +1,93 @@
+import random
+import re
+import time
+
+import pytest
+
+from app.shared import text_safety
+from app.shared.config import settings
+from app.shared.text_safety import validate_text
+
+# ---- 参照实现：预筛 / 缓存 / 线性扫描之前的原始规则（回溯正则，逐条检查） ----
+_sep = r"[\s\-\_·\.\,，。:：|/\\~`!@#$%^&*()\[\]{}<>“”\"'＋+＝=]*"
+_url = re.compile(r"(https?://|www\.)\S+", re.IGNORECASE)
+_phone = re.compile(r"(?<!\d)(?:1[3-9]\d{9})(?!\d)")
+_wechat_kw = re.compile(
+    rf"(微{_sep}信|薇{_sep}信|威{_sep}信|维{_sep}信|v{_sep}信|w{_sep}x|v{_sep}x|we{_sep}chat|wei{_sep}xin)", re.I
+)
+_cta_kw = re.compile(rf"(加{_sep}我|加{_sep}v|加{_sep}V|私{_sep}信|联{_sep}系|来{_sep}聊|找{_sep}我)", re.I)
+_wechat_id = re.compile(r"[a-zA-Z][a-zA-Z0-9_-]{3,19}")
+_id_or_digits = re.compile(r"(?:[a-zA-Z][a-zA-Z0-9_-]{3,19}|[1-9]\d{4,11})")
+_threat = re.compile(
+    r"(我(要|会|准备|打算)|去|来|带人|叫人|今晚|明天|等我|给你|必须|应该|一起)"
+    r".{0,12}(杀|弄死|砍|捅|打死|烧|炸|放火|下毒|投毒).{0,12}"
+    r"(你|他|她|TA|某人|人|店|店家|老板|物业|邻居|小区|学校|公司)",
+    re.I,
+)
+
+
+def _reference(s: str, max_len: int, check_contact: bool, check_threat: bool):
+    s = re.sub(r"\s+", " ", s.strip())
+    if len(s) < 1:
+        return False, s, "TOO_SHORT"
+    if len(s) > max_len:
+        return False, s, "TOO_LONG"
+    if check_contact:
+        m = _wechat_kw.search(s)
+        if (
+            _url.search(s)
+            or _phone.search(s)
+            or (m and _id_or_digits.search(s[m.end() : m.end() + 40]))
+            or (_cta_kw.search(s) and (m or _wechat_id.search(s)))
+            or (re.search(r"\b(?:vx|wx)\b", s, re.I) and _wechat_id.search(s))
+        ):
+            return False, s, "CONTACT_OR_AD_NOT_ALLOWED"
+    if check_threat and _threat.search(s):
+        return False, s, "VIOLENT_THREAT"
+    return True, s, None
+
+
+_PIECES = [
+    "微信", "微 信", "薇.信", "v信", "vx", "wx", "VX", "w-x", "wechat", "weixin", "加我", "加 V", "私信", "联系",
+    "来聊", "找我", "abc_123", "Tom2024", "13812345678", "138123456789", "98765", "http://x.cn", "www.a.com",
+    "我要", "我会", "去", "今晚", "给你", "一起", "杀", "弄死", "砍", "下毒", "投毒", "烧", "你", "他", "店家",
+    "邻居", "学校", "TA", "小猫", "草丛", "有药", "注意", "狗狗", "毒死", "杀死", "  ", "\n", "，", "。", ":", "!",
+    "a", "Z", "1", "_", "-",
+]
+
+
+def test_matches_reference_rules():
+    rnd = random.Random(7)
+    for _ in range(5000):
+        s = "".join(rnd.choice(_PIECES) for _ in range(rnd.randint(1, 14)))
+        for flags in ((True, True), (True, False), (False, True)):
+            res = validate_text(s, min_len=1, max_len=60, check_contact=flags[0], check_threat=flags[1])
+            assert (res.ok, res.cleaned, res.reason) == _reference(s, 60, *flags), s
+
+
+def test_raw_input_cap_skips_normalization():
+    assert validate_text("a" + " " * 1000, min_len=1, max_len=30).reason == "TOO_LONG"
+    # 空白多但在倍数以内：照常折叠后判断
+    assert validate_text("猫" + " " * 50 + "狗", min_len=1, max_len=30).ok
+
+
+def test_over_budget_only_logs(monkeypatch, caplog):
+    """超预算只记 warning + 计数，判定结果和 reason 都不变。"""
+    monkeypatch.setattr(settings, "moderation_budget_ms", -1.0)
+    text_safety._verdicts.clear()
+    before = text_safety.moderation_stats["over_budget"]
+    with caplog.at_level("WARNING", logger=text_safety.__name__):
+        assert validate_text("门口草丛里有只小猫", min_len=1, max_len=30).ok
+        assert validate_text("加我微信 abc_123", min_len=1, max_len=30).reason == "CONTACT_OR_AD_NOT_ALLOWED"
+    assert text_safety.moderation_stats["over_budget"] == before + 2
+    assert "budget" in caplog.text
+
+
+@pytest.mark.parametrize("n", [300, 1_000])
+def test_worst_case_inputs_stay_in_budget(n):
+    text_safety._verdicts.clear()
+    for s in ("我要" + "去" * n, "微" + "." * n, "加" + " " * n + "我"):
+        t0 = time.perf_counter()
+        validate_text(s, min_len=1, max_len=n + 2)
+        # 预算本身（默认 10ms）在繁忙的 CI 上会抖，这里只卡一个宽松的上限：挡住回溯爆炸
+        assert time.perf_counter() - t0 < 0.5
@@ -0,0 +1,38 @@
+import random
+
+from app.shared.textsearch import NgramIndex
+
+_ALPHABET = "草丛有药小猫狗abcAB 1"
+
+
+def _rand_text(rnd: random.Random, n: int) -> str:
+    return "".join(rnd.choice(_ALPHABET) for _ in range(n))
+
+
+def test_matches_substring_search_under_updates():
+    rnd = random.Random(11)
+    index, docs = NgramIndex(), {}
+    for step in range(3000):
+        key = rnd.randrange(300)
+        if rnd.random() < 0.2:
+            index.remove(key)
+            docs.pop(key, None)
+        else:
+            text = _rand_text(rnd, rnd.randint(0, 12))
+            index.add(key, text)
+            docs[key] = text
+        if step % 50 == 0:
+            for _ in range(20):
+                q = _rand_text(rnd, rnd.randint(1, 4))
+                want = {k for k, t in docs.items() if q.lower() in t.lower()}
+                assert set(index.search(q)) == want, q
+    assert len(index) == len(docs)
+
+
+def test_empty_query_and_missing_grams():
+    index = NgramIndex()
+    index.add("a", "草丛有药")
+    assert index.search("") == []
+    assert index.search("有草丛") == []
+    assert index.search("丛有") == ["a"]
+    assert index.search("草丛有药") == ["a"]
@@ -0,0 +1,120 @@
+import asyncio
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+from app.modules.incidents.repo import IncidentsRepo
+from app.shared.ddb import DynamoDB
+from app.shared.timeindex import LEGACY_BUCKET, TIME_BUCKET_START, buckets_desc, time_bucket
+from app.shared.types import Incident
+from app.storage import MemoryIncidentsRepo, SqliteDB, SqliteIncidentsRepo
+
+
+def _dt(s: str) -> datetime:
+    return datetime.fromisoformat(s).replace(tzinfo=timezone.utc)
+
+
+def test_time_bucket_before_start_goes_to_legacy():
+    assert TIME_BUCKET_START == "2025-01"
+    assert time_bucket("2025-01-01T00:00:00Z") == "2025-01"
+    assert time_bucket("2024-12-31T23:59:59+00:00") == LEGACY_BUCKET
+    assert time_bucket("2019-05-01T08:00:00+08:00") == LEGACY_BUCKET
+
+
+def test_buckets_desc():
+    assert buckets_desc(_dt("2025-02-10"), _dt("2025-04-01")) == ["2025-04", "2025-03", "2025-02"]
+    assert buckets_desc(_dt("2024-06-01"), _dt("2025-02-01")) == ["2025-02", "2025-01", LEGACY_BUCKET]
+    assert buckets_desc(_dt("2020-01-01"), _dt("2023-01-01")) == [LEGACY_BUCKET]
+    assert buckets_desc(None, _dt("2025-01-15"))[-2:] == ["2025-01", LEGACY_BUCKET]
+
+
+def _incidents() -> list[Incident]:
+    rnd = random.Random(5)
+    out = []
+    for i in range(60):
+        if i % 10 == 0:
+            created_at = None  # 老数据没有时间
+        else:
+            y = rnd.choice([2019, 2023, 2024, 2025, 2026])
+            created_at = f"{y}-{rnd.randint(1, 9):02d}-{rnd.randint(10, 28)}T0{rnd.randint(0, 9)}:00:00+00:00"
+        out.append(Incident(incident_id=f"i{i:02d}", lat=31.0, lng=121.0, title="t", created_at=created_at))
+    return out
+
+
+async def _walk(repo, start=None, end=None, page_size=7, predicate=None) -> list[Incident]:
+    out, key = [], None
+    while True:
+        items, key = await repo.query_by_created(start, end, limit=page_size, start_key=key, predicate=predicate)
+        out += items
+        if not key:
+            return out
+
+
+def _check(got: list[Incident], incidents: list[Incident]) -> None:
+    timed = [it for it in got if it.created_at]
+    assert {it.incident_id for it in got} == {it.incident_id for it in incidents}
+    assert len(got) == len(incidents)
+    assert timed == sorted(timed, key=lambda it: (it.created_at, it.incident_id), reverse=True)
+    # 没有时间的排在最后
+    assert all(it.created_at is None for it in got[len(timed) :])
+
+
+async def _load(repo, incidents: list[Incident]) -> None:
+    for it in incidents:
+        await repo.create_incident(it)
+
+
+def test_memory_and_sqlite_include_all_rows():
+    async def run():
+        incidents = _incidents()
+        db = SqliteDB()
+        for repo in (MemoryIncidentsRepo(), SqliteIncidentsRepo(db)):
+            await _load(repo, incidents)
+            _check(await _walk(repo), incidents)
+            ranged = await _walk(repo, _dt("2023-01-01"), _dt("2024-12-31"))
+            assert {it.incident_id for it in ranged} == {
+                it.incident_id for it in incidents if it.created_at and "2023" <= it.created_at[:4] <= "2024"
+            }
+
+    asyncio.run(run())
+
+
+def test_dynamodb_includes_legacy_and_untimed_rows(ddb_tables):
+    async def run():
+        incidents = _incidents()
+        repo = IncidentsRepo(DynamoDB(use_async=False))
+        await _load(repo, incidents)
+        _check(await _walk(repo), incidents)
+        only_odd = await _walk(repo, predicate=lambda it: int(it.incident_id[1:]) % 2 == 1)
+        assert [it.incident_id for it in only_odd] == [
+            it.incident_id for it in await _walk(repo) if int(it.incident_id[1:]) % 2 == 1
+        ]
+
+    asyncio.run(run())
+
+
+def test_backfill_rebuckets_rows_before_start(ddb_tables):
+    table = ddb_tables.Table("FriendlyPetMapIncidents")
+    # 上一版按月分桶写进去的旧数据
+    table.put_item(
+        Item={
+            "incident_id": "old",
+            "lat": "31.2",
+            "lng": "121.4",
+            "title": "t",
+            "created_at": "2024-06-01T00:00:00+00:00",
+            "geohash": "wtw3sjq6q",
+            "gh_cell": "wtw",
+            "ts_bucket": "2024-06",
+        }
+    )
+
+    async def run():
+        repo = IncidentsRepo(DynamoDB(use_async=False))
+        assert await repo.backfill_index_attrs() == 1
+        assert await repo.backfill_index_attrs() == 0
+        assert [it.incident_id for it in await _walk(repo)] == ["old"]
+
+    asyncio.run(run())
+    assert table.get_item(Key={"incident_id": "old"})["Item"]["ts_bucket"] == LEGACY_BUCKET
@@ -5,8 +5,15 @@ export function postComment(input: { incident_id: string; content: string }) {
   return apiPost<{ ok: boolean; comment: Comment }>("/comments", input);
 }
 
-export function listComments(incident_id: string) {
-  return apiGet<{ incident_id: string; items: Comment[] }>(
-    `/comments?incident_id=${encodeURIComponent(incident_id)}`
+export function listComments(
+  incident_id: string,
+  opts?: { limit?: number; order?: "asc" | "desc"; cursor?: string }
+) {
+  const u = new URLSearchParams({ incident_id });
+  if (opts?.limit) u.set("limit", String(opts.limit));
+  if (opts?.order) u.set("order", opts.order);
+  if (opts?.cursor) u.set("cursor", opts.cursor);
+  return apiGet<{ incident_id: string; items: Comment[]; next_cursor?: string | null }>(
+    `/comments?${u.toString()}`
   );
 }
@@ -41,10 +41,13 @@ export function ConsolePage() {
   const [err, setErr] = useState<string | null>(null);
 
   const [incidents, setIncidents] = useState<Incident[]>([]);
-  const [incTotal, setIncTotal] = useState(0);
+  const [incTotal, setIncTotal] = useState<number | null>(0);
+  // 游标分页：cursors[i] 是第 i+1 页的 cursor（第一页为空字符串）
+  const [cursors, setCursors] = useState<string[]>([""]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
   const [comments, setComments] = useState<ConsoleCommentRow[]>([]);
-  const [cTotal, setCTotal] = useState(0);
+  const [cTotal, setCTotal] = useState<number | null>(0);
 
   const queryInput = useMemo(
     () => ({
@@ -63,21 +66,41 @@ export function ConsolePage() {
 
   const totalPages = useMemo(() => {
     const total = tab === "incidents" ? incTotal : cTotal;
+    if (total === null) return null;
     return Math.max(1, Math.ceil(total / pageSize));
   }, [tab, incTotal, cTotal, pageSize]);
 
-  const load = async () => {
+  const hasNext = totalPages === null ? !!nextCursor : page < totalPages;
+
+  const resetPaging = () => {
+    setPage(1);
+    setCursors([""]);
+    setNextCursor(null);
+  };
+
+  // first=true：筛选条件变了，从第一页重新开始（此时 page/cursors 状态可能还没更新）
+  const load = async (opts?: { first?: boolean }) => {
     setLoading(true);
     setErr(null);
     try {
+      const input = { ...queryInput, cursor: opts?.first ? "" : cursors[page - 1] ?? "" };
+      let next: string | null | undefined;
       if (tab === "incidents") {
-        const res = await consoleListIncidents(queryInput);
+        const res = await consoleListIncidents(input);
         setIncidents(res.items);
         setIncTotal(res.total);
+        next = res.next_cursor;
       } else {
-        const res = await consoleListComments(queryInput);
+        const res = await consoleListComments(input);
         setComments(res.items);
         setCTotal(res.total);
+        next = res.next_cursor;
+      }
+      setNextCursor(next ?? null);
+      if (next) {
+        const nc = next;
+        const at = opts?.first ? 1 : page;
+        setCursors((cs) => [...cs.slice(0, at), nc]);
       }
     } catch (e: any) {
       setErr(e?.message ?? "加载失败");
@@ -93,8 +116,8 @@ export function ConsolePage() {
   }, [token, tab, page, pageSize]);
 
   const onApplyFilters = () => {
-    setPage(1);
-    load();
+    resetPaging();
+    load({ first: true });
   };
 
   const onReset = () => {
@@ -105,8 +128,8 @@ export function ConsolePage() {
     setStart("");
     setEnd("");
     setQ("");
-    setPage(1);
-    load();
+    resetPaging();
+    load({ first: true });
   };
 
   const onSetToken = () => {
@@ -156,7 +179,7 @@ export function ConsolePage() {
         <button
           onClick={() => {
             setTab("incidents");
-            setPage(1);
+            resetPaging();
           }}
           style={{ padding: "8px 12px", borderRadius: 8, border: "1px solid #ddd", background: tab === "incidents" ? "#eee" : "#fff" }}
         >
@@ -165,7 +188,7 @@ export function ConsolePage() {
         <button
           onClick={() => {
             setTab("comments");
-            setPage(1);
+            resetPaging();
           }}
           style={{ padding: "8px 12px", borderRadius: 8, border: "1px solid #ddd", background: tab === "comments" ? "#eee" : "#fff" }}
         >
@@ -219,7 +242,10 @@ export function ConsolePage() {
           <div style={{ fontSize: 12, color: "#666" }}>Page size</div>
           <input
             value={String(pageSize)}
-            onChange={(e) => setPageSize(Math.max(1, Math.min(200, Number(e.target.value) || 20)))}
+            onChange={(e) => {
+              setPageSize(Math.max(1, Math.min(200, Number(e.target.value) || 20)));
+              resetPaging();
+            }}
             style={{ width: "100%" }}
           />
         </label>
@@ -341,7 +367,7 @@ export function ConsolePage() {
 
       <div style={{ marginTop: 12, display: "flex", alignItems: "center", gap: 12 }}>
         <div style={{ color: "#666" }}>
-          共 {tab === "incidents" ? incTotal : cTotal} 条，{totalPages} 页
+          {totalPages === null ? "按时间倒序" : `共 ${tab === "incidents" ? incTotal : cTotal} 条，${totalPages} 页`}
         </div>
         <button
           disabled={page <= 1}
@@ -352,8 +378,8 @@ export function ConsolePage() {
         </button>
         <div style={{ fontFamily: "monospace" }}>{page}</div>
         <button
-          disabled={page >= totalPages}
-          onClick={() => setPage((p) => Math.min(totalPages, p + 1))}
+          disabled={!hasNext}
+          onClick={() => setPage((p) => p + 1)}
           style={{ border: "1px solid #ddd", borderRadius: 8, padding: "6px 10px" }}
         >
           下一页
@@ -1,7 +1,8 @@
 import type { Incident, Comment } from "../../shared/types";
 import { consoleApiDelete, consoleApiGet, consoleApiPut } from "./apiClient";
 
-export type Paged<T> = { items: T[]; total: number; page: number; page_size: number };
+// 游标分页时 total 为 null，用 next_cursor 翻下一页
+export type Paged<T> = { items: T[]; total: number | null; page: number; page_size: number; next_cursor?: string | null };
 
 export type ConsoleCommentRow = Comment & {
   incident_lng: number;
@@ -19,6 +20,12 @@ function qp(params: Record<string, any>) {
   return s ? `?${s}` : "";
 }
 
+// cursor 即使是空字符串也要带上（空 = 游标模式的第一页）
+function withCursor(path: string, cursor?: string) {
+  if (cursor === undefined) return path;
+  return `${path}${path.includes("?") ? "&" : "?"}cursor=${encodeURIComponent(cursor)}`;
+}
+
 export function consoleListIncidents(input: {
   lat_min?: number;
   lat_max?: number;
@@ -29,8 +36,10 @@ export function consoleListIncidents(input: {
   q?: string;
   page: number;
   page_size: number;
+  cursor?: string;
 }) {
-  return consoleApiGet<Paged<Incident>>(`/console/incidents${qp(input)}`);
+  const { cursor, ...rest } = input;
+  return consoleApiGet<Paged<Incident>>(withCursor(`/console/incidents${qp(rest)}`, cursor));
 }
 
 export function consoleUpdateIncident(incident_id: string, body: { title: string }) {
@@ -51,8 +60,10 @@ export function consoleListComments(input: {
   q?: string;
   page: number;
   page_size: number;
+  cursor?: string;
 }) {
-  return consoleApiGet<Paged<ConsoleCommentRow>>(`/console/comments${qp(input)}`);
+  const { cursor, ...rest } = input;
+  return consoleApiGet<Paged<ConsoleCommentRow>>(withCursor(`/console/comments${qp(rest)}`, cursor));
 }
 
 export function consoleUpdateComment(input: { incident_id: string; created_at: string; content: string }) {
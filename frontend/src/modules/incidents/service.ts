@@ -1,8 +1,20 @@
 import { apiGet, apiPost } from "../api/client";
-import type { Incident } from "../../shared/types";
+import type { Incident, IncidentCluster } from "../../shared/types";
 
-export function listIncidents() {
-  return apiGet<Incident[]>("/incidents");
+export type BBox = { lat_min: number; lat_max: number; lng_min: number; lng_max: number };
+
+export function listIncidents(bbox?: BBox) {
+  if (!bbox) return apiGet<Incident[]>("/incidents");
+  const u = new URLSearchParams();
+  for (const [k, v] of Object.entries(bbox)) u.set(k, String(v));
+  return apiGet<Incident[]>(`/incidents?${u.toString()}`);
+}
+
+// bounds: map.getBounds().toArray().flat() → [lng_min, lat_min, lng_max, lat_max]
+export function listIncidentClusters(zoom: number, bounds?: [number, number, number, number]) {
+  const u = new URLSearchParams({ zoom: String(Math.floor(zoom)) });
+  if (bounds) u.set("bbox", bounds.join(","));
+  return apiGet<{ zoom: number; items: IncidentCluster[] }>(`/incidents/clusters?${u.toString()}`);
 }
 
 export function createIncident(input: { lng: number; lat: number; title: string }) {
@@ -4,6 +4,16 @@ export type Incident = {
   lat: number;
   title: string;
   created_at?: string;
+  comment_count?: number;
+  last_comment_at?: string | null;
+};
+
+export type IncidentCluster = {
+  count: number;
+  lat: number;
+  lng: number;
+  bounds: [number, number, number, number];
+  incident_id?: string | null;
 };
 
 export type Comment = {